@@ -1,53 +1,30 @@
 # backend/agents/evaluation_agent.py
+import asyncio
+import os
+from typing import List
+
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from .. import crud, schemas
+from .. import crud, review_scheduler, schemas
+from ..database import run_sync
+from . import llm_cache, llm_registry, llm_scheduler, local_grader, prompt_budget
 
-# Initialize LLM
-try:
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.2)
-except Exception as e:
-    print(f"Error initializing LLM: {e}")
-    llm = None
+# Submissions graded per LLM call by evaluate_batch.
+EVALUATION_BATCH_SIZE = int(os.getenv("EVALUATION_BATCH_SIZE", "10"))
 
 
-class EvaluationAgent:
-    def __init__(self, db: Session):
-        self.db = db
-        if not llm:
-            raise ImportError(
-                "Google Generative AI model could not be initialized. Please check your API key."
-            )
+class ItemEvaluation(schemas.EvaluationResult):
+    item: int
 
-    def evaluate_submission(
-        self, submission: schemas.Submission
-    ) -> schemas.EvaluationResult | None:
-        """
-        Orchestrates the evaluation of a user's submission using the model's structured output feature.
-        """
-        # 1. Fetch the original exercise
-        exercise = crud.get_exercise(self.db, submission.exercise_id)
-        if not exercise:
-            print(f"Error: Exercise with ID {submission.exercise_id} not found.")
-            return None
 
-        exercise_details = schemas.ExerciseDetails.model_validate(
-            exercise.question_data
-        )
-
-        # This is a simplification. In a real app, the target concept
-        # would be explicitly stored with the exercise.
-        target_concept = crud.get_weakest_grammar_pattern(self.db)
-        if not target_concept:
-            return None
+class EvaluationBatch(BaseModel):
+    evaluations: List[ItemEvaluation]
 
-        # 2. Use LLM's structured output for a reliable JSON response
-        structured_llm = llm.with_structured_output(schemas.EvaluationResult)
 
-        prompt = ChatPromptTemplate.from_template(
-            """You are an expert Korean language teacher and data analyst. Your task is to evaluate a user's exercise submission and generate a detailed, structured JSON response.
+EVALUATION_PROMPT = ChatPromptTemplate.from_template(
+    """You are an expert Korean language teacher and data analyst. Your task is to evaluate a user's exercise submission and generate a detailed, structured JSON response.
 
 **Context:**
 - **Exercise Question**: "{question_text}"
@@ -68,26 +45,299 @@ class EvaluationAgent:
 
 Produce a valid JSON object based on these instructions.
 """
+)
+
+
+BATCH_EVALUATION_PROMPT = ChatPromptTemplate.from_template(
+    """You are an expert Korean language teacher and data analyst. Your task is to evaluate a set of exercise submissions from one user and generate a detailed, structured JSON response.
+
+**Context:**
+- **Target Concept**: "{target_concept}"
+- **User's Current Mastery Score**: {current_mastery_score:.2f}
+- **User's Known Weakness Flags**: {current_weakness_flags}
+
+**Submissions (in the order the user answered them):**
+{items}
+
+**Your Tasks:**
+Return `evaluations`, a list with ONE object per submission above, each with:
+1.  **`item`**: The submission's item number.
+2.  **`grade`**: Assign an integer grade (0-100).
+3.  **`feedback_text`**: Write clear, constructive feedback.
+4.  **`mastery_updates`**: A list containing ONE update object for the `{target_concept}`.
+    -   `concept`: Must be the `target_concept` string: "{target_concept}".
+    -   `new_score`: Calculate a new mastery score (float between 0.0 and 1.0). Start from the current mastery score for item 1 and from the previous item's `new_score` after that. Increase for correct usage, decrease for incorrect usage. The change should be proportional to the performance.
+    -   `flags_added`: Analyze the user's errors. If you find a specific, new error type not listed in `current_weakness_flags`, add it to this list. Otherwise, return an empty list `[]`.
+
+Produce a valid JSON object based on these instructions.
+"""
+)
+
+
+def _chain_scores(target_concept, chunks: list[list[int]], graded_chunks: list[dict]):
+    """
+    Chains the chunks' target-concept scores, in submission order. Each chunk
+    is graded concurrently from the stored score, so its scores are rebased:
+    every item's change from the one before it is added to the running score,
+    and the set ends where grading it in one sequence would have.
+    """
+    if not target_concept:
+        return
+    score = target_concept.mastery_score
+    for chunk, graded_chunk in zip(chunks, graded_chunks):
+        previous = target_concept.mastery_score
+        for i in chunk:
+            evaluation = graded_chunk.get(i)
+            if not isinstance(evaluation, schemas.EvaluationResult):
+                continue
+            for update in evaluation.mastery_updates:
+                if update.concept != target_concept.pattern:
+                    continue
+                change = update.new_score - previous
+                previous = update.new_score
+                score = min(1.0, max(0.0, score + change))
+                update.new_score = score
+
+
+class EvaluationAgent:
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        llm_registry.get_llm("evaluation")
+
+    async def evaluate_submission(
+        self, submission: schemas.Submission
+    ) -> schemas.EvaluationResult | None:
+        """
+        Orchestrates the evaluation of a user's submission using the model's structured output feature.
+        """
+        # 1. Fetch the original exercise
+        exercise = await run_sync(
+            crud.get_exercise, self.db, self.user_id, submission.exercise_id
         )
+        if not exercise:
+            print(f"Error: Exercise with ID {submission.exercise_id} not found.")
+            return None
 
-        chain = prompt | structured_llm
+        exercise_details = schemas.ExerciseDetails.model_validate(
+            exercise.question_data
+        )
+
+        # Short answers are checked locally; only unclear ones reach the LLM.
+        local_grade = local_grader.grade_locally(
+            exercise_details, submission.user_response
+        )
+        if local_grade and local_grade.confident:
+            current_score = None
+            if exercise_details.target_concept:
+                current_score = await run_sync(
+                    crud.get_concept_mastery_score,
+                    self.db,
+                    self.user_id,
+                    exercise_details.target_concept,
+                )
+            evaluation_result = local_grader.build_evaluation(
+                exercise_details, local_grade, current_score
+            )
+            await self._save_evaluation(submission, evaluation_result)
+            return evaluation_result
+
+        # This is a simplification. In a real app, the target concept
+        # would be explicitly stored with the exercise.
+        target_concept = await run_sync(
+            review_scheduler.get_target_grammar, self.db, self.user_id
+        )
+        if not target_concept:
+            return None
+
+        # 2. Use LLM's structured output for a reliable JSON response
+        chain = llm_registry.structured_chain(
+            "evaluation", "evaluation", EVALUATION_PROMPT, schemas.EvaluationResult
+        )
 
         try:
-            evaluation_result = chain.invoke(
+            evaluation_result = await llm_cache.cached_ainvoke(
+                self.db,
+                "evaluation",
+                EVALUATION_PROMPT,
+                chain,
                 {
                     "question_text": exercise_details.question_text,
                     "target_concept": target_concept.pattern,
                     "current_mastery_score": target_concept.mastery_score,
-                    "current_weakness_flags": target_concept.weakness_flags or "None",
+                    "current_weakness_flags": prompt_budget.flags_section(
+                        target_concept.weakness_flags
+                    ),
                     "user_response": submission.user_response,
-                }
+                },
+                schemas.EvaluationResult,
+                cacheable=llm_cache.is_cacheable("evaluation", exercise_details.type),
+                priority=llm_scheduler.PRIORITY_GRADING,
             )
         except Exception as e:
             print(f"Error invoking structured LLM chain for evaluation: {e}")
             return None
 
         # 3. Persist results to the database
-        crud.update_exercise_with_submission(self.db, submission, evaluation_result)
-        crud.update_mastery_after_evaluation(self.db, evaluation_result)
+        await self._save_evaluation(submission, evaluation_result)
 
         return evaluation_result
+
+    async def evaluate_batch(
+        self, submissions: list[schemas.Submission]
+    ) -> list[schemas.BatchItemResult]:
+        """
+        Grades a set of submissions together: short answers locally, the rest
+        EVALUATION_BATCH_SIZE per LLM call, with the calls made concurrently.
+        Every graded item is saved in one transaction; the others come back
+        with an error instead of failing the batch.
+        """
+        exercises = await run_sync(
+            crud.get_exercises,
+            self.db,
+            self.user_id,
+            [submission.exercise_id for submission in submissions],
+        )
+        # Per submission: an EvaluationResult, or an error message.
+        outcomes: list[schemas.EvaluationResult | str | None] = [None] * len(
+            submissions
+        )
+        details = {}
+        for i, submission in enumerate(submissions):
+            exercise = exercises.get(submission.exercise_id)
+            if exercise:
+                details[i] = schemas.ExerciseDetails.model_validate(
+                    exercise.question_data
+                )
+            else:
+                outcomes[i] = f"Exercise with ID {submission.exercise_id} not found."
+
+        local_grades = {}
+        for i, exercise_details in details.items():
+            local_grade = local_grader.grade_locally(
+                exercise_details, submissions[i].user_response
+            )
+            if local_grade and local_grade.confident:
+                local_grades[i] = local_grade
+        scores = await run_sync(
+            crud.get_concept_mastery_scores,
+            self.db,
+            self.user_id,
+            [details[i].target_concept for i in local_grades],
+        )
+        for i, local_grade in local_grades.items():
+            evaluation_result = local_grader.build_evaluation(
+                details[i], local_grade, scores.get(details[i].target_concept)
+            )
+            # A later card on the same concept builds on this one's score.
+            for update in evaluation_result.mastery_updates:
+                scores[update.concept] = update.new_score
+            outcomes[i] = evaluation_result
+
+        pending = [i for i in details if i not in local_grades]
+        if pending:
+            target_concept = await run_sync(
+                review_scheduler.get_target_grammar, self.db, self.user_id
+            )
+            chunks = [
+                pending[start : start + EVALUATION_BATCH_SIZE]
+                for start in range(0, len(pending), EVALUATION_BATCH_SIZE)
+            ]
+            graded_chunks = await asyncio.gather(
+                *(
+                    self._evaluate_chunk(
+                        target_concept,
+                        [(i, details[i], submissions[i]) for i in chunk],
+                    )
+                    for chunk in chunks
+                )
+            )
+            _chain_scores(target_concept, chunks, graded_chunks)
+            for graded_chunk in graded_chunks:
+                for i, outcome in graded_chunk.items():
+                    outcomes[i] = outcome
+
+        graded = [
+            (submission, outcome)
+            for submission, outcome in zip(submissions, outcomes)
+            if isinstance(outcome, schemas.EvaluationResult)
+        ]
+        if graded:
+            await run_sync(crud.apply_evaluations, self.db, self.user_id, graded)
+            for _, evaluation_result in graded:
+                review_scheduler.note_evaluation(self.user_id, evaluation_result)
+
+        return [
+            schemas.BatchItemResult(exercise_id=submission.exercise_id, result=outcome)
+            if isinstance(outcome, schemas.EvaluationResult)
+            else schemas.BatchItemResult(
+                exercise_id=submission.exercise_id, error=outcome
+            )
+            for submission, outcome in zip(submissions, outcomes)
+        ]
+
+    async def _evaluate_chunk(
+        self, target_concept, items: list
+    ) -> dict[int, schemas.EvaluationResult | str]:
+        """
+        Grades `items` ((index, ExerciseDetails, Submission) triples) with one
+        structured LLM call, returning a result or error message per index.
+        """
+        if not target_concept:
+            return {i: "No grammar pattern to evaluate against." for i, _, _ in items}
+
+        chain = llm_registry.structured_chain(
+            "evaluation", "batch", BATCH_EVALUATION_PROMPT, EvaluationBatch
+        )
+
+        items_text = "\n".join(
+            f'Item {number}:\n- Exercise Question: "{exercise_details.question_text}"\n'
+            f'- `user_response`: "{submission.user_response}"'
+            for number, (_, exercise_details, submission) in enumerate(items, 1)
+        )
+        try:
+            batch = await llm_cache.cached_ainvoke(
+                self.db,
+                "evaluation",
+                BATCH_EVALUATION_PROMPT,
+                chain,
+                {
+                    "target_concept": target_concept.pattern,
+                    "current_mastery_score": target_concept.mastery_score,
+                    "current_weakness_flags": prompt_budget.flags_section(
+                        target_concept.weakness_flags
+                    ),
+                    "items": items_text,
+                },
+                EvaluationBatch,
+                # Whole sets rarely repeat, so they aren't worth caching.
+                cacheable=False,
+                priority=llm_scheduler.PRIORITY_GRADING,
+            )
+        except Exception as e:
+            print(f"Error invoking structured LLM chain for batch evaluation: {e}")
+            return {i: "The grader failed on this batch." for i, _, _ in items}
+
+        by_number = {evaluation.item: evaluation for evaluation in batch.evaluations}
+        graded = {}
+        for number, (i, _, _) in enumerate(items, 1):
+            evaluation = by_number.get(number)
+            if evaluation is None:
+                graded[i] = "The grader returned no result for this item."
+            else:
+                graded[i] = schemas.EvaluationResult(
+                    grade=evaluation.grade,
+                    feedback_text=evaluation.feedback_text,
+                    mastery_updates=evaluation.mastery_updates,
+                )
+        return graded
+
+    async def _save_evaluation(
+        self,
+        submission: schemas.Submission,
+        evaluation_result: schemas.EvaluationResult,
+    ):
+        await run_sync(
+            crud.apply_evaluation, self.db, self.user_id, submission, evaluation_result
+        )
+        review_scheduler.note_evaluation(self.user_id, evaluation_result)
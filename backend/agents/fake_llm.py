@@ -0,0 +1,247 @@
+# backend/agents/fake_llm.py
+"""
+An offline, deterministic chat model for running the backend without network
+access or an API key (LLM_PROVIDER=fake), e.g. for load tests and profiling.
+
+Responses are built from the requested schema (structured output) or from
+the JSON schema in the prompt's format instructions (plain text, as the
+lesson stream asks), with values taken from the prompt where it names them
+(grammar pattern, target concept, exercise types, item numbers, the words to
+drill for short-answer exercises) and the rest derived from a hash of the prompt, so the same prompt always gets the same
+answer. Latency and failures can be injected to exercise the scheduler.
+"""
+
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, PrivateAttr
+
+from .local_grader import LOCAL_GRADING_TYPES
+
+LLM_FAKE_LATENCY = float(os.getenv("LLM_FAKE_LATENCY", "0"))
+LLM_FAKE_FAILURE_RATE = float(os.getenv("LLM_FAKE_FAILURE_RATE", "0"))
+LLM_FAKE_SEED = int(os.getenv("LLM_FAKE_SEED", "0"))
+
+# Prompt fragments the agents' templates use for values the output must echo.
+_PROMPT_VALUES = {
+    "grammar_pattern": re.compile(r"Grammar Pattern to Learn:\*\* `([^`]*)`"),
+    "concept": re.compile(r'Target Concept\*\*: "([^"]*)"'),
+    "type": re.compile(r"\*\*Type\*\*: `([^`]*)`"),
+    "sub_type": re.compile(r"\*\*Sub-Type\*\*: `([^`]*)`"),
+}
+_MASTERY = re.compile(r"Mastery(?: Score)?\W*([01]\.\d+)")
+_EXERCISE_SLOT = re.compile(
+    r"^Exercise (\d+): type `([^`]*)`, sub_type `([^`]*)`", re.M
+)
+_ITEM_SLOT = re.compile(r"^Item (\d+):", re.M)
+_VOCAB = re.compile(r"Vocabulary to Drill\*\*: `(\[[^`]*\])`")
+_FORMAT_SCHEMA = re.compile(r"```\s*(\{.*\})\s*```", re.S)
+
+# Lists that should come back empty rather than filled in.
+_EMPTY_LISTS = {"flags_added", "new_vocabulary"}
+# Optional fields the practice prompts ask for on short-answer exercises.
+_ANSWER_KEY = {"expected_answer", "target_concept"}
+
+
+class FakeProviderError(Exception):
+    """An injected failure; looks like a 503 to the scheduler's retry logic."""
+
+    code = 503
+
+
+def _prompt_context(text: str) -> dict:
+    context = {}
+    for name, pattern in _PROMPT_VALUES.items():
+        match = pattern.search(text)
+        if match:
+            context[name] = match.group(1)
+    match = _MASTERY.search(text)
+    context["_mastery"] = float(match.group(1)) if match else 0.5
+    match = _VOCAB.search(text)
+    if match:
+        context["_vocab"] = ast.literal_eval(match.group(1))
+    slots = [
+        {"type": t, "sub_type": s, "_number": int(n)}
+        for n, t, s in _EXERCISE_SLOT.findall(text)
+    ] or [{"item": int(n)} for n in _ITEM_SLOT.findall(text)]
+    if slots:
+        context["_slots"] = slots
+    return context
+
+
+def _drilled_word(context: dict) -> str | None:
+    # The answer and concept are the word itself; a set spreads its slots
+    # across the words.
+    words = context.get("_vocab")
+    if not words or context.get("type") not in LOCAL_GRADING_TYPES:
+        return None
+    return words[(context.get("_number", 1) - 1) % len(words)]
+
+
+def _fill(node: dict, name: str, defs: dict, context: dict, rng: random.Random):
+    """A value for JSON-schema `node` (the field `name`)."""
+    if name in _EMPTY_LISTS:
+        return []
+    if "$ref" in node:
+        node = defs[node["$ref"].rsplit("/", 1)[-1]]
+    if "anyOf" in node:
+        options = [o for o in node["anyOf"] if o.get("type") != "null"]
+        if len(options) < len(node["anyOf"]):
+            # Optional fields are left out, bar a short-answer exercise's key.
+            return _drilled_word(context) if name in _ANSWER_KEY else None
+        node = options[0]
+    if name in context:
+        return context[name]
+
+    kind = node.get("type")
+    if kind == "object" or "properties" in node:
+        return {
+            field: _fill(sub, field, defs, context, rng)
+            for field, sub in node.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = node.get("items", {})
+        if "$ref" in items or items.get("type") == "object":
+            slots = context.get("_slots") or [{}]
+            return [
+                _fill(items, name, defs, {**context, **slot, "_slots": None}, rng)
+                for slot in slots
+            ]
+        return [_fill(items, f"{name} {i}", defs, context, rng) for i in range(1, 4)]
+    if "enum" in node:
+        return node["enum"][0]
+    if kind == "integer":
+        return rng.randint(40, 100) if name == "grade" else 0
+    if kind == "number":
+        return round(
+            min(1.0, max(0.0, context["_mastery"] + rng.uniform(-0.1, 0.15))), 2
+        )
+    if kind == "boolean":
+        return False
+    return f"Offline {name.replace('_', ' ')} {rng.randrange(1000)}."
+
+
+def fake_response(schema: dict, prompt_text: str) -> dict:
+    """A deterministic instance of JSON schema `schema` for this prompt."""
+    digest = hashlib.sha256(f"{LLM_FAKE_SEED}:{prompt_text}".encode("utf-8")).digest()
+    rng = random.Random(digest)
+    context = _prompt_context(prompt_text)
+    return _fill(schema, "", schema.get("$defs", {}), context, rng)
+
+
+def _text_response(prompt_text: str) -> str:
+    # Plain calls get JSON for the schema in the format instructions, if any.
+    match = _FORMAT_SCHEMA.search(prompt_text)
+    if not match:
+        return (
+            f"Offline response {hashlib.sha256(prompt_text.encode()).hexdigest()[:8]}."
+        )
+    return json.dumps(
+        fake_response(json.loads(match.group(1)), prompt_text), ensure_ascii=False
+    )
+
+
+def _usage(prompt_text: str, text: str) -> dict:
+    # Roughly four characters per token.
+    input_tokens, output_tokens = len(prompt_text) // 4, len(text) // 4
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+    }
+
+
+def _messages_text(messages: list[BaseMessage]) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = LLM_FAKE_LATENCY
+    failure_rate: float = LLM_FAKE_FAILURE_RATE
+    seed: int = LLM_FAKE_SEED
+    # Plain responses are streamed in pieces of this many characters.
+    chunk_size: int = 16
+
+    _failures: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any):
+        self._failures = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-fake"
+
+    def _maybe_fail(self):
+        if self.failure_rate and self._failures.random() < self.failure_rate:
+            raise FakeProviderError("Injected failure from the offline LLM provider.")
+
+    def _respond(self, messages, response_schema: dict | None) -> AIMessage:
+        prompt_text = _messages_text(messages)
+        if response_schema is not None:
+            text = json.dumps(
+                fake_response(response_schema, prompt_text), ensure_ascii=False
+            )
+        else:
+            text = _text_response(prompt_text)
+        return AIMessage(content=text, usage_metadata=_usage(prompt_text, text))
+
+    def _generate(
+        self, messages, stop=None, run_manager=None, response_schema=None, **kwargs
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        self._maybe_fail()
+        message = self._respond(messages, response_schema)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self, messages, stop=None, run_manager=None, response_schema=None, **kwargs
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        message = self._respond(messages, response_schema)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, messages) -> list[AIMessageChunk]:
+        message = self._respond(messages, None)
+        text = message.content
+        chunks = [
+            AIMessageChunk(content=text[i : i + self.chunk_size])
+            for i in range(0, len(text), self.chunk_size)
+        ]
+        # Usage comes with the last chunk, as providers report it.
+        chunks.append(AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+        return chunks
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        chunks = self._chunks(messages)
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        chunks = self._chunks(messages)
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=chunk)
+
+    def with_structured_output(self, schema: type[BaseModel], **kwargs):
+        return self.bind(response_schema=schema.model_json_schema()) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
@@ -0,0 +1,98 @@
+# backend/agents/gloss_agent.py
+import asyncio
+import os
+from typing import List
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from langchain_core.prompts import ChatPromptTemplate
+
+from .. import crud
+from ..database import run_sync
+from . import llm_cache, llm_registry, llm_scheduler
+
+# Words glossed per LLM call.
+GLOSS_BATCH_SIZE = int(os.getenv("GLOSS_BATCH_SIZE", "200"))
+
+
+class Gloss(BaseModel):
+    item: int
+    english: str
+
+
+class GlossBatch(BaseModel):
+    glosses: List[Gloss]
+
+
+GLOSS_PROMPT = ChatPromptTemplate.from_template(
+    """You are a Korean-English lexicographer. Give the English gloss of each Korean word below, as a learner's dictionary would: the most common meaning, a few words at most (e.g. "to eat", "school", "thank you").
+
+**Words:**
+{items}
+
+Return `glosses`, a list with ONE object per word above, each with its `item` number and its `english` gloss.
+"""
+)
+
+
+class GlossAgent:
+    def __init__(self, db: Session, priority: int = llm_scheduler.PRIORITY_PREFETCH):
+        self.db = db
+        self.priority = priority
+        llm_registry.get_llm("gloss")
+
+    async def translate(self, words: list[str]) -> dict[str, str]:
+        """
+        English glosses for `words`, GLOSS_BATCH_SIZE per LLM call with the
+        calls made concurrently. Words the model skipped, or whose batch
+        failed, are left out. Doesn't touch the database.
+        """
+        chunks = [
+            words[start : start + GLOSS_BATCH_SIZE]
+            for start in range(0, len(words), GLOSS_BATCH_SIZE)
+        ]
+        glosses = {}
+        for chunk_glosses in await asyncio.gather(
+            *(self._translate_chunk(chunk) for chunk in chunks)
+        ):
+            glosses.update(chunk_glosses)
+        return glosses
+
+    async def fill(self, words: list[str]) -> int:
+        """
+        Translates `words` and stores the glosses on every learner's rows for
+        them. Returns the number of words glossed.
+        """
+        glosses = await self.translate(words)
+        await run_sync(crud.save_vocabulary_glosses, self.db, glosses)
+        return len(glosses)
+
+    async def _translate_chunk(self, words: list[str]) -> dict[str, str]:
+        chain = llm_registry.structured_chain(
+            "gloss", "batch", GLOSS_PROMPT, GlossBatch
+        )
+        items_text = "\n".join(
+            f"Item {number}: {word}" for number, word in enumerate(words, 1)
+        )
+        try:
+            batch = await llm_cache.cached_ainvoke(
+                self.db,
+                "gloss",
+                GLOSS_PROMPT,
+                chain,
+                {"items": items_text},
+                GlossBatch,
+                # The glosses are stored, so a batch is never asked for twice.
+                cacheable=False,
+                priority=self.priority,
+            )
+        except Exception as e:
+            print(f"Error invoking structured LLM chain for glosses: {e}")
+            return {}
+
+        glosses = {}
+        for gloss in batch.glosses:
+            english = gloss.english.strip()
+            if 1 <= gloss.item <= len(words) and english:
+                glosses[words[gloss.item - 1]] = english
+        return glosses
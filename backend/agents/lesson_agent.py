@@ -1,46 +1,44 @@
 # backend/agents/lesson_agent.py
+import asyncio
+from typing import AsyncIterator, List
+
 from sqlalchemy.orm import Session
+from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel
 
-from .. import crud, schemas
+from .. import crud, models, review_scheduler, schemas
+from ..database import run_sync
+from . import llm_cache, llm_registry, llm_scheduler, prompt_budget
+from .gloss_agent import GlossAgent
 
-# Initialize LLM
-try:
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.7)
-except Exception as e:
-    print(f"Error initializing LLM: {e}")
-    llm = None
 
+class LessonBody(BaseModel):
+    """The part of a lesson the model writes; the rest comes from the database."""
 
-class LessonAgent:
-    def __init__(self, db: Session):
-        self.db = db
-        if not llm:
-            raise ImportError("Google Generative AI model could not be initialized.")
+    explanation_text: str
+    example_sentences: List[str]
 
-    def generate_lesson(self) -> schemas.LessonContent | None:
-        """
-        Generates the next personalized lesson using the model's structured output feature.
-        """
-        # 1. Get weakest grammar and new vocab from the database
-        weakest_grammar = crud.get_weakest_grammar_pattern(self.db)
-        if not weakest_grammar:
-            return None
 
-        new_vocabulary = crud.get_new_vocabulary(self.db, count=5)
-        new_vocab_schema = [
-            schemas.NewVocabularyItem(
-                korean=v.word_korean, english="<translation_needed>"
-            )
-            for v in new_vocabulary
-        ]
+LESSON_PROMPT = ChatPromptTemplate.from_template(
+    """You are an expert and friendly Korean language teacher. Your task is to create a concise, personalized lesson and return it as a JSON object.
+
+**User's Current Status:**
+- **Grammar Pattern to Learn:** `{grammar_pattern}`
+- **Current Mastery Score:** {mastery_score:.2f} (A score from 0.0 to 1.0)
+- **Known Issues/Weakness Flags:** `{weakness_flags}` (These are specific errors the user has made before. Address them in your explanation.)
+
+**Lesson Requirements:**
+1.  **`explanation_text`**: Write a clear and simple explanation of the grammar pattern. If there are weakness flags, provide examples that specifically correct those mistakes.
+2.  **`example_sentences`**: Create 3-4 diverse and practical example sentences that use the grammar pattern correctly.
+3.  **Integrate Vocabulary**: Naturally include some of these **new vocabulary words** (`{new_vocab_list}`) within your example sentences.
+"""
+)
 
-        # 2. Use LLM's structured output feature for a reliable JSON response
-        structured_llm = llm.with_structured_output(schemas.LessonContent)
+_STREAM_PARSER = JsonOutputParser(pydantic_object=LessonBody)
 
-        prompt = ChatPromptTemplate.from_template(
-            """You are an expert and friendly Korean language teacher. Your task is to create a concise, personalized lesson and return it as a JSON object.
+STREAM_LESSON_PROMPT = ChatPromptTemplate.from_template(
+    """You are an expert and friendly Korean language teacher. Write a concise, personalized lesson.
 
 **User's Current Status:**
 - **Grammar Pattern to Learn:** `{grammar_pattern}`
@@ -52,30 +50,244 @@ class LessonAgent:
 2.  **`example_sentences`**: Create 3-4 diverse and practical example sentences that use the grammar pattern correctly.
 3.  **Integrate Vocabulary**: Naturally include some of these **new vocabulary words** (`{new_vocab_list}`) within your example sentences.
 
-Fill the `grammar_pattern` and `new_vocabulary` fields in the output with the exact data provided. Set `lesson_id` to 0 as a placeholder.
+Write `explanation_text` before `example_sentences`.
+{format_instructions}
 """
+).partial(format_instructions=_STREAM_PARSER.get_format_instructions())
+
+
+class LessonAgent:
+    def __init__(
+        self,
+        db: Session,
+        user_id: int,
+        use_cache: bool = True,
+        priority: int = llm_scheduler.PRIORITY_INTERACTIVE,
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.use_cache = use_cache
+        self.priority = priority
+        llm_registry.get_llm("lesson")
+
+    async def generate_lesson(self) -> schemas.LessonContent | None:
+        """
+        Generates the next personalized lesson using the model's structured output feature.
+        """
+        lesson_data_from_llm = await self.compose_lesson()
+        if not lesson_data_from_llm:
+            return None
+
+        # 3. Save the complete lesson to the database
+        db_lesson = await run_sync(
+            crud.create_lesson, self.db, self.user_id, lesson_data=lesson_data_from_llm
         )
 
-        chain = prompt | structured_llm
+        # 4. Return the final, validated schema with the database ID
+        lesson_data_from_llm.lesson_id = db_lesson.lesson_id
+
+        return lesson_data_from_llm
+
+    async def compose_lesson(
+        self, weakest_grammar: models.GrammarMastery | None = None
+    ) -> schemas.LessonContent | None:
+        """
+        Asks the model for a lesson on `weakest_grammar` (looked up if not given)
+        without saving it. The returned lesson keeps the placeholder lesson_id of 0.
+        """
+        # 1. Get weakest grammar and new vocab from the database
+        if weakest_grammar is None:
+            weakest_grammar = await run_sync(
+                review_scheduler.get_target_grammar, self.db, self.user_id
+            )
+        if not weakest_grammar:
+            return None
+        # Read before saving glosses commits and expires the row, which would
+        # otherwise reload it here on the event loop.
+        pattern, mastery_score, weakness_flags = _grammar_fields(weakest_grammar)
+
+        new_vocabulary = await self._new_vocabulary()
+
+        # 2. Use LLM's structured output feature for the part only the model
+        # can write; the rest comes from the database.
+        chain = llm_registry.structured_chain(
+            "lesson", "lesson", LESSON_PROMPT, LessonBody
+        )
 
         try:
-            lesson_data_from_llm = chain.invoke(
-                {
-                    "grammar_pattern": weakest_grammar.pattern,
-                    "mastery_score": weakest_grammar.mastery_score,
-                    "weakness_flags": weakest_grammar.weakness_flags or "None",
-                    "new_vocab_list": [v.korean for v in new_vocab_schema],
-                    "new_vocabulary": [v.model_dump() for v in new_vocab_schema],
-                }
+            lesson_body, glosses = await asyncio.gather(
+                llm_cache.cached_ainvoke(
+                    self.db,
+                    "lesson",
+                    LESSON_PROMPT,
+                    chain,
+                    {
+                        "grammar_pattern": pattern,
+                        "mastery_score": mastery_score,
+                        "weakness_flags": prompt_budget.flags_section(weakness_flags),
+                        "new_vocab_list": prompt_budget.vocab_section(
+                            _vocab_list(new_vocabulary)
+                        ),
+                    },
+                    LessonBody,
+                    cacheable=self.use_cache and llm_cache.is_cacheable("lesson"),
+                    priority=self.priority,
+                ),
+                self._translate_missing(new_vocabulary),
             )
         except Exception as e:
             print(f"Error invoking structured LLM chain for lesson generation: {e}")
             return None
+        await self._save_glosses(glosses)
 
-        # 3. Save the complete lesson to the database
-        db_lesson = crud.create_lesson(self.db, lesson_data=lesson_data_from_llm)
+        return schemas.LessonContent(
+            lesson_id=0,
+            grammar_pattern=pattern,
+            explanation_text=lesson_body.explanation_text,
+            example_sentences=lesson_body.example_sentences,
+            new_vocabulary=_vocab_items(new_vocabulary, glosses),
+        )
 
-        # 4. Return the final, validated schema with the database ID
-        lesson_data_from_llm.lesson_id = db_lesson.lesson_id
+    async def stream_lesson(self) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Yields (event, data) pairs for a lesson as it is written: "meta" with the
+        grammar pattern and vocabulary straight from the database, then
+        "explanation" text deltas and one "example" per finished sentence, and
+        finally "done" with the saved lesson (or "error").
+        """
+        weakest_grammar = await run_sync(
+            review_scheduler.get_target_grammar, self.db, self.user_id
+        )
+        if not weakest_grammar:
+            yield "error", {"detail": "Could not generate a new lesson."}
+            return
+        pattern, mastery_score, weakness_flags = _grammar_fields(weakest_grammar)
 
-        return lesson_data_from_llm
+        new_vocabulary = await self._new_vocabulary()
+        # Words without a stored gloss are translated while the lesson streams;
+        # "meta" has an empty `english` for them, "done" has the gloss.
+        translating = asyncio.create_task(self._translate_missing(new_vocabulary))
+        try:
+            yield (
+                "meta",
+                {
+                    "grammar_pattern": pattern,
+                    "new_vocabulary": [
+                        v.model_dump() for v in _vocab_items(new_vocabulary, {})
+                    ],
+                },
+            )
+
+            chain = llm_registry.get_chain(
+                "lesson",
+                "stream",
+                lambda llm: STREAM_LESSON_PROMPT | llm | _STREAM_PARSER,
+            )
+
+            inputs = {
+                "grammar_pattern": pattern,
+                "mastery_score": mastery_score,
+                "weakness_flags": prompt_budget.flags_section(weakness_flags),
+                "new_vocab_list": prompt_budget.vocab_section(
+                    _vocab_list(new_vocabulary)
+                ),
+            }
+            prompt_budget.record("lesson", STREAM_LESSON_PROMPT, inputs)
+
+            explanation_sent = ""
+            examples_sent = 0
+            body = {}
+            try:
+                async for body in llm_scheduler.scheduler.stream(
+                    chain, inputs, self.priority
+                ):
+                    explanation = body.get("explanation_text") or ""
+                    if len(explanation) > len(
+                        explanation_sent
+                    ) and explanation.startswith(explanation_sent):
+                        yield (
+                            "explanation",
+                            {"delta": explanation[len(explanation_sent) :]},
+                        )
+                        explanation_sent = explanation
+
+                    # The last sentence may still be growing; emit it once the
+                    # next starts.
+                    sentences = body.get("example_sentences") or []
+                    while examples_sent < len(sentences) - 1:
+                        yield "example", {"sentence": sentences[examples_sent]}
+                        examples_sent += 1
+
+                lesson_body = LessonBody.model_validate(body)
+            except Exception as e:
+                print(f"Error streaming LLM chain for lesson generation: {e}")
+                yield "error", {"detail": "Could not generate a new lesson."}
+                return
+
+            if len(lesson_body.explanation_text) > len(explanation_sent):
+                yield (
+                    "explanation",
+                    {"delta": lesson_body.explanation_text[len(explanation_sent) :]},
+                )
+            for sentence in lesson_body.example_sentences[examples_sent:]:
+                yield "example", {"sentence": sentence}
+
+            glosses = await translating
+            await self._save_glosses(glosses)
+            lesson = schemas.LessonContent(
+                lesson_id=0,
+                grammar_pattern=pattern,
+                explanation_text=lesson_body.explanation_text,
+                example_sentences=lesson_body.example_sentences,
+                new_vocabulary=_vocab_items(new_vocabulary, glosses),
+            )
+            db_lesson = await run_sync(
+                crud.create_lesson, self.db, self.user_id, lesson_data=lesson
+            )
+            lesson.lesson_id = db_lesson.lesson_id
+            yield "done", lesson.model_dump()
+        finally:
+            # Also when the client goes away mid-stream.
+            translating.cancel()
+
+    async def _new_vocabulary(self) -> list[tuple[str, str | None]]:
+        # (word, stored gloss) pairs, read before saving glosses commits and
+        # expires the rows.
+        rows = await run_sync(crud.get_new_vocabulary, self.db, self.user_id, count=5)
+        return [(v.word_korean, v.english) for v in rows]
+
+    async def _translate_missing(
+        self, new_vocabulary: list[tuple[str, str | None]]
+    ) -> dict[str, str]:
+        # Glosses for words the gloss filler hasn't reached yet. Doesn't touch
+        # the session, so it can run alongside the lesson call.
+        missing = [korean for korean, english in new_vocabulary if not english]
+        if not missing:
+            return {}
+        return await GlossAgent(self.db, priority=self.priority).translate(missing)
+
+    async def _save_glosses(self, glosses: dict[str, str]):
+        if glosses:
+            await run_sync(crud.save_vocabulary_glosses, self.db, glosses)
+
+
+def _grammar_fields(grammar: models.GrammarMastery) -> tuple:
+    return grammar.pattern, grammar.mastery_score, grammar.weakness_flags
+
+
+def _vocab_list(new_vocabulary: list[tuple[str, str | None]]) -> list[str]:
+    return [
+        f"{korean} ({english})" if english else korean
+        for korean, english in new_vocabulary
+    ]
+
+
+def _vocab_items(
+    new_vocabulary: list[tuple[str, str | None]], glosses: dict[str, str]
+) -> list[schemas.NewVocabularyItem]:
+    return [
+        schemas.NewVocabularyItem(
+            korean=korean, english=english or glosses.get(korean, "")
+        )
+        for korean, english in new_vocabulary
+    ]
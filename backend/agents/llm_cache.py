@@ -0,0 +1,153 @@
+# backend/agents/llm_cache.py
+import hashlib
+import json
+import os
+import unicodedata
+from collections import defaultdict
+
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..database import run_sync
+from . import prompt_budget
+from .llm_scheduler import PRIORITY_INTERACTIVE, scheduler
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# Eviction runs after every this many writes rather than on each one.
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "50"))
+
+# Which responses each agent may cache:
+#   "always"       - every call
+#   "short_answer" - only when the exercise type has a short, repeatable answer
+#   "never"        - no caching (e.g. free-text evaluation)
+CACHE_POLICY = {
+    "lesson": "always",
+    # A practice request asks for a new question; a cached one would repeat the
+    # last question for the same pattern and words under a new exercise_id.
+    "practice": "never",
+    "evaluation": "short_answer",
+    # Glosses are stored on the vocabulary rows instead.
+    "gloss": "never",
+}
+SHORT_ANSWER_TYPES = {"Flashcards"}
+
+# In-process hit/miss counters per agent, since startup.
+stats = {
+    "hits": defaultdict(int),
+    "misses": defaultdict(int),
+    "bypassed": defaultdict(int),
+}
+_writes_since_eviction = 0
+
+
+def is_cacheable(agent: str, exercise_type: str | None = None) -> bool:
+    policy = CACHE_POLICY.get(agent, "never")
+    if policy == "always":
+        return True
+    if policy == "short_answer":
+        return exercise_type in SHORT_ANSWER_TYPES
+    return False
+
+
+def _normalize(value):
+    """
+    Canonicalizes prompt inputs so that trivially different calls share a key:
+    strings are NFC-normalized with whitespace collapsed, string lists are
+    treated as sets, and floats are rounded to the precision the prompts show.
+    """
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFC", value).split())
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [_normalize(v) for v in value]
+        if all(isinstance(v, str) for v in items):
+            return sorted(set(items))
+        return items
+    return value
+
+
+def _template_text(prompt: ChatPromptTemplate) -> str:
+    return "\n".join(
+        getattr(getattr(message, "prompt", None), "template", repr(message))
+        for message in prompt.messages
+    )
+
+
+def make_cache_key(
+    agent: str, prompt: ChatPromptTemplate, inputs: dict, schema: type[BaseModel]
+) -> str:
+    material = json.dumps(
+        {
+            "agent": agent,
+            "schema": schema.__name__,
+            "template": _template_text(prompt),
+            "inputs": _normalize(inputs),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+async def cached_ainvoke(
+    db: Session,
+    agent: str,
+    prompt: ChatPromptTemplate,
+    chain,
+    inputs: dict,
+    schema: type[BaseModel],
+    cacheable: bool = True,
+    priority: int = PRIORITY_INTERACTIVE,
+):
+    """
+    Returns the cached structured response for these prompt inputs, or invokes
+    `chain` through the LLM scheduler and stores its result when the agent's
+    policy allows it. Concurrent misses on the same key share one model call.
+    """
+    global _writes_since_eviction
+
+    if not (LLM_CACHE_ENABLED and cacheable):
+        stats["bypassed"][agent] += 1
+        prompt_budget.record(agent, prompt, inputs)
+        return await scheduler.run(lambda: chain.ainvoke(inputs), priority)
+
+    cache_key = make_cache_key(agent, prompt, inputs, schema)
+    cached = await run_sync(
+        crud.get_llm_cache_response, db, cache_key, LLM_CACHE_TTL_SECONDS
+    )
+    if cached is not None:
+        stats["hits"][agent] += 1
+        return schema.model_validate(cached)
+
+    stats["misses"][agent] += 1
+    if scheduler.is_inflight(cache_key):
+        # Another request is already fetching it and will store it.
+        result = await scheduler.run(
+            lambda: chain.ainvoke(inputs), priority, key=cache_key
+        )
+        return result.model_copy(deep=True) if result is not None else None
+    prompt_budget.record(agent, prompt, inputs)
+    result = await scheduler.run(lambda: chain.ainvoke(inputs), priority, key=cache_key)
+    if result is None:
+        # Structured output that failed to parse; nothing worth keeping.
+        return None
+    await run_sync(crud.put_llm_cache_entry, db, cache_key, agent, result.model_dump())
+
+    _writes_since_eviction += 1
+    if _writes_since_eviction >= LLM_CACHE_EVICT_EVERY:
+        _writes_since_eviction = 0
+        await run_sync(
+            crud.evict_llm_cache_entries,
+            db,
+            LLM_CACHE_TTL_SECONDS,
+            LLM_CACHE_MAX_ENTRIES,
+        )
+    return result
@@ -0,0 +1,128 @@
+# backend/agents/llm_registry.py
+"""
+Shared LLM clients and compiled chains for the agents.
+
+Each agent gets one chat client from LLM_PROVIDER, created on first use (so
+importing the app neither loads the provider SDK nor needs an API key) and
+reused by every request after that. Chains such as `prompt | llm.with_structured_output(...)`
+are compiled once per (agent, name) and reused as well; they are stateless,
+so concurrent requests can share them.
+"""
+
+import os
+import threading
+from typing import Callable
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+
+from .. import metrics
+
+# "google" for Gemini, or "fake" for the offline stand-in in fake_llm.py.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+
+# Sampling temperature for each agent's client.
+AGENT_TEMPERATURES = {
+    "lesson": 0.7,
+    "practice": 0.8,
+    "evaluation": 0.2,
+    "gloss": 0.0,
+}
+
+_clients: dict[str, object] = {}
+_chains: dict[tuple[str, str], Runnable] = {}
+_lock = threading.Lock()
+
+
+def _google_client(temperature: float, callbacks: list):
+    # Imported here: the SDK takes longer to import than the rest of the app.
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    # One attempt per call: llm_scheduler does the retrying, with backoff.
+    return ChatGoogleGenerativeAI(
+        model=LLM_MODEL, temperature=temperature, max_retries=1, callbacks=callbacks
+    )
+
+
+def _fake_client(temperature: float, callbacks: list):
+    from .fake_llm import FakeChatModel
+
+    return FakeChatModel(callbacks=callbacks)
+
+
+PROVIDERS = {
+    "google": _google_client,
+    "fake": _fake_client,
+}
+
+
+def _create_client(agent: str):
+    if LLM_PROVIDER not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'.")
+    return PROVIDERS[LLM_PROVIDER](
+        AGENT_TEMPERATURES[agent], [metrics.LLMMetricsCallback(agent)]
+    )
+
+
+def get_llm(agent: str):
+    """
+    The agent's chat client, created on first use. Raises ImportError if it
+    can't be created (e.g. no API key), as the agents' constructors expect.
+    """
+    client = _clients.get(agent)
+    if client is not None:
+        return client
+    with _lock:
+        if agent not in _clients:
+            try:
+                _clients[agent] = _create_client(agent)
+            except Exception as e:
+                print(f"Error initializing LLM: {e}")
+                raise ImportError(
+                    f"LLM provider '{LLM_PROVIDER}' could not be initialized."
+                ) from e
+        return _clients[agent]
+
+
+def get_chain(agent: str, name: str, build: Callable[[object], Runnable]) -> Runnable:
+    """
+    The chain `name` of `agent`, built by `build(llm)` on first use.
+    """
+    chain = _chains.get((agent, name))
+    if chain is not None:
+        return chain
+    llm = get_llm(agent)
+    with _lock:
+        if (agent, name) not in _chains:
+            _chains[(agent, name)] = build(llm)
+        return _chains[(agent, name)]
+
+
+def structured_chain(
+    agent: str, name: str, prompt: ChatPromptTemplate, schema: type[BaseModel]
+) -> Runnable:
+    """
+    `prompt | llm.with_structured_output(schema)` for `agent`, compiled once.
+    """
+    return get_chain(
+        agent, name, lambda llm: prompt | llm.with_structured_output(schema)
+    )
+
+
+def install(client, agents: list[str] | None = None):
+    """
+    Makes `agents` (all by default) use `client`, e.g. a stub model in the
+    benchmarks, and drops their compiled chains. Pass None to go back to
+    creating real clients on next use.
+    """
+    agents = agents or list(AGENT_TEMPERATURES)
+    with _lock:
+        for agent in agents:
+            if client is None:
+                _clients.pop(agent, None)
+            else:
+                _clients[agent] = client
+        for key in [key for key in _chains if key[0] in agents]:
+            del _chains[key]
@@ -0,0 +1,271 @@
+# backend/agents/llm_scheduler.py
+"""
+The gate every agent's model call goes through.
+
+Calls wait for a concurrency slot and a rate-limit token (a token bucket), and
+are admitted in priority order, so a grading request never queues behind pool
+prefetches. Transient failures (rate limiting, 5xx, timeouts) are retried with
+jittered exponential backoff, and each call has an overall deadline covering
+queueing and retries. Concurrent calls with the same key share one upstream
+call (single-flight).
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import defaultdict
+from typing import AsyncIterator
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Token bucket: sustained calls per second, and how many may go at once.
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "10"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "20"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Per attempt, and for the whole call including queueing and retries.
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "45"))
+LLM_CALL_DEADLINE = float(os.getenv("LLM_CALL_DEADLINE", "90"))
+
+# Lower runs first.
+PRIORITY_GRADING = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_PREFETCH = 2
+
+# HTTP statuses worth another attempt, and exception class names (anywhere in
+# the MRO) that mean the same when the provider doesn't expose a status.
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "ServerError",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "TimeoutError",
+    "ConnectionError",
+    "TransportError",
+}
+
+# In-process counters, since startup.
+stats = defaultdict(int)
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Takes a token and returns 0, or returns the seconds until one is due.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUSES
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _backoff(attempt: int) -> float:
+    # "Full jitter": spreads retries from a burst of failures over the window.
+    return random.uniform(
+        0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2**attempt)
+    )
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_per_second: float = LLM_RATE_PER_SECOND,
+        burst: int = LLM_RATE_BURST,
+    ):
+        self.max_concurrency = max_concurrency
+        self._bucket = _TokenBucket(rate_per_second, burst)
+        self._active = 0
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    # =================================================================
+    # Admission
+    # =================================================================
+
+    def _dispatch(self):
+        while self._waiting and self._active < self.max_concurrency:
+            if self._waiting[0][2].done():  # gave up (deadline or cancelled)
+                heapq.heappop(self._waiting)
+                continue
+            delay = self._bucket.take()
+            if delay:
+                if self._wakeup is None:
+                    self._wakeup = asyncio.get_running_loop().call_later(
+                        delay, self._wake
+                    )
+                return
+            _, _, waiter = heapq.heappop(self._waiting)
+            self._active += 1
+            waiter.set_result(None)
+
+    def _wake(self):
+        self._wakeup = None
+        self._dispatch()
+
+    async def _acquire(self, priority: int):
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._order), waiter))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # admitted just as it was cancelled
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    # =================================================================
+    # Calls
+    # =================================================================
+
+    async def _attempts(self, call, priority: int, deadline: float):
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            await self._acquire(priority)
+            stats["upstream_calls"] += 1
+            try:
+                remaining = deadline - time.monotonic()
+                return await asyncio.wait_for(
+                    call(), min(LLM_ATTEMPT_TIMEOUT, remaining)
+                )
+            except Exception as e:
+                delay = _backoff(attempt)
+                if (
+                    not _is_retryable(e)
+                    or attempt == LLM_MAX_ATTEMPTS - 1
+                    or time.monotonic() + delay >= deadline
+                ):
+                    raise
+                print(f"LLM call failed ({e!r}); retrying in {delay:.2f}s.")
+                stats["retries"] += 1
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    async def run(
+        self,
+        call,
+        priority: int = PRIORITY_INTERACTIVE,
+        key: str | None = None,
+        deadline: float = LLM_CALL_DEADLINE,
+    ):
+        """
+        Awaits `call()` (a coroutine factory, so it can be retried) under the
+        scheduler's limits, within `deadline` seconds. Concurrent calls with
+        the same `key` share the first one's result. Raises the last error,
+        or TimeoutError once the deadline passes.
+        """
+        stats["calls"] += 1
+        if key is not None and key in self._inflight:
+            stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        task = asyncio.ensure_future(
+            asyncio.wait_for(
+                self._attempts(call, priority, time.monotonic() + deadline),
+                deadline,
+            )
+        )
+        try:
+            if key is None:
+                return await task
+            # Shielded: one caller going away mustn't cancel the others' call.
+            self._inflight[key] = task
+            task.add_done_callback(self._finish_shared(key))
+            return await asyncio.shield(task)
+        except Exception as e:
+            stats[
+                "timeouts" if isinstance(e, asyncio.TimeoutError) else "failures"
+            ] += 1
+            raise
+
+    def _finish_shared(self, key: str):
+        def finish(task: asyncio.Future):
+            self._inflight.pop(key, None)
+            if not task.cancelled():
+                task.exception()  # retrieved even if every caller went away
+
+        return finish
+
+    async def stream(
+        self,
+        chain,
+        inputs: dict,
+        priority: int = PRIORITY_INTERACTIVE,
+        deadline: float = LLM_CALL_DEADLINE,
+    ) -> AsyncIterator:
+        """
+        Yields `chain.astream(inputs)` chunks while holding a slot. A failure
+        before the first chunk is retried like `run`; after it, it is raised.
+        """
+        stats["calls"] += 1
+        deadline = time.monotonic() + deadline
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            await asyncio.wait_for(
+                self._acquire(priority), max(0, deadline - time.monotonic())
+            )
+            stats["upstream_calls"] += 1
+            started = False
+            try:
+                async for chunk in chain.astream(inputs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                delay = _backoff(attempt)
+                if (
+                    started
+                    or not _is_retryable(e)
+                    or attempt == LLM_MAX_ATTEMPTS - 1
+                    or time.monotonic() + delay >= deadline
+                ):
+                    stats["failures"] += 1
+                    raise
+                print(f"LLM stream failed ({e!r}); retrying in {delay:.2f}s.")
+                stats["retries"] += 1
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def is_inflight(self, key: str) -> bool:
+        """Whether a call with `key` is running, i.e. `run` would join it."""
+        return key in self._inflight
+
+    def snapshot(self) -> dict:
+        return {
+            **stats,
+            "active": self._active,
+            "queued": sum(not waiter.done() for _, _, waiter in self._waiting),
+            "inflight_keys": len(self._inflight),
+        }
+
+
+scheduler = LLMScheduler()
@@ -0,0 +1,144 @@
+# backend/agents/local_grader.py
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from .. import schemas
+
+# Exercise types whose answers are short enough to check without the LLM.
+LOCAL_GRADING_TYPES = {"Flashcards"}
+
+# Similarity at or above which an answer is accepted (a typo at most)...
+ACCEPT_SIMILARITY = 0.8
+# ...and at or below which it is confidently wrong. Anything in between
+# (a near-synonym, a different conjugation) is left to the LLM.
+REJECT_SIMILARITY = 0.3
+
+# How far one graded attempt moves the concept's mastery score.
+MASTERY_LEARNING_RATE = 0.3
+
+_ALTERNATIVE_SEPARATORS = re.compile(r"\s*[/|;,]\s*")
+_ENGLISH_FILLERS = re.compile(r"^(?:to|a|an|the)\s+")
+
+
+@dataclass
+class LocalGrade:
+    grade: int
+    similarity: float
+    matched_answer: str
+    confident: bool
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Lowercases, drops leading English fillers ("to", "a", "the"), removes
+    punctuation and whitespace, and decomposes Hangul syllables into jamo so
+    that a wrong batchim costs one edit instead of a whole syllable.
+    """
+    text = unicodedata.normalize("NFKC", text).strip().casefold()
+    text = _ENGLISH_FILLERS.sub("", text)
+    text = "".join(
+        ch
+        for ch in text
+        if not unicodedata.category(ch).startswith(("P", "Z", "S", "C"))
+    )
+    return unicodedata.normalize("NFKD", text)
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return previous[-1]
+
+
+def similarity(response: str, answer: str) -> float:
+    if not response and not answer:
+        return 1.0
+    return 1.0 - edit_distance(response, answer) / max(len(response), len(answer))
+
+
+def grade_answer(user_response: str, expected_answer: str) -> LocalGrade:
+    """
+    Scores `user_response` against the best-matching alternative in
+    `expected_answer` (alternatives separated by "/", "|", ";" or ",").
+    """
+    response = normalize_answer(user_response)
+    best = LocalGrade(grade=0, similarity=0.0, matched_answer="", confident=False)
+    for alternative in _ALTERNATIVE_SEPARATORS.split(expected_answer.strip()):
+        if not alternative:
+            continue
+        score = similarity(response, normalize_answer(alternative))
+        if score > best.similarity or not best.matched_answer:
+            best = LocalGrade(
+                grade=round(score * 100),
+                similarity=score,
+                matched_answer=alternative,
+                confident=False,
+            )
+        if score == 1.0:
+            break
+
+    if best.similarity >= ACCEPT_SIMILARITY:
+        best.confident = True
+    elif best.similarity <= REJECT_SIMILARITY:
+        best.grade = 0
+        best.confident = True
+    return best
+
+
+def grade_locally(
+    exercise: schemas.ExerciseDetails, user_response: str
+) -> LocalGrade | None:
+    """
+    Grades a short-answer exercise without the LLM. Returns None when the
+    exercise can't be checked locally; check `confident` before trusting it.
+    """
+    if exercise.type not in LOCAL_GRADING_TYPES or not exercise.expected_answer:
+        return None
+    return grade_answer(user_response, exercise.expected_answer)
+
+
+def build_evaluation(
+    exercise: schemas.ExerciseDetails,
+    local_grade: LocalGrade,
+    current_score: float | None,
+) -> schemas.EvaluationResult:
+    """
+    Turns a confident local grade into the same EvaluationResult shape the
+    LLM produces, moving the target concept's mastery toward the grade.
+    """
+    if local_grade.grade == 100:
+        feedback = "Correct!"
+    elif local_grade.grade > 0:
+        feedback = (
+            f"Almost! Check the spelling: the answer is '{local_grade.matched_answer}'."
+        )
+    else:
+        feedback = f"Not quite. The answer is '{local_grade.matched_answer}'."
+
+    mastery_updates = []
+    if exercise.target_concept and current_score is not None:
+        new_score = current_score + MASTERY_LEARNING_RATE * (
+            local_grade.grade / 100 - current_score
+        )
+        mastery_updates.append(
+            schemas.MasteryUpdate(
+                concept=exercise.target_concept,
+                new_score=round(min(max(new_score, 0.0), 1.0), 4),
+                flags_added=[],
+            )
+        )
+
+    return schemas.EvaluationResult(
+        grade=local_grade.grade,
+        feedback_text=feedback,
+        mastery_updates=mastery_updates,
+    )
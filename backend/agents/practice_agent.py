@@ -1,58 +1,70 @@
 # backend/agents/practice_agent.py
+import math
+from typing import List
+
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from .. import crud, schemas
+from .. import crud, models, review_scheduler, schemas
+from ..database import run_sync
+from . import llm_cache, llm_registry, llm_scheduler, prompt_budget
 
-# Initialize LLM
-try:
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.8)
-except Exception as e:
-    print(f"Error initializing LLM: {e}")
-    llm = None
+# Default sub-type for each exercise type the agent knows how to pick on its own.
+DEFAULT_SUB_TYPES = {
+    "Writing": "Targeted Essay",
+    "Flashcards": "Translation Recall",
+    "Reading": "Short Story/Article Analysis",
+}
 
 
-class PracticeAgent:
-    def __init__(self, db: Session):
-        self.db = db
-        if not llm:
-            raise ImportError("Google Generative AI model could not be initialized.")
+def _pick_exercise_type(
+    request: schemas.ExerciseRequest,
+    weakest_grammar: models.GrammarMastery | None,
+    vocab_for_drilling: list,
+) -> tuple[str, str]:
+    exercise_type = request.type
+    sub_type = request.sub_type
 
-    def generate_exercise(
-        self, request: schemas.ExerciseRequest
-    ) -> schemas.ExerciseDetails | None:
-        """
-        Generates a personalized practice exercise using the model's structured output feature.
-        """
-        # 1. Fetch user's weak points
-        weakest_grammar = crud.get_weakest_grammar_pattern(self.db)
-        vocab_for_drilling = crud.get_vocab_for_drilling(self.db, count=5)
+    if not exercise_type:
+        if weakest_grammar and weakest_grammar.mastery_score < 0.6:
+            exercise_type, sub_type = "Writing", "Targeted Essay"
+        elif vocab_for_drilling:
+            exercise_type, sub_type = "Flashcards", "Translation Recall"
+        else:
+            exercise_type, sub_type = "Reading", "Short Story/Article Analysis"
 
-        # 2. Determine exercise type
-        exercise_type = request.type
-        sub_type = request.sub_type
-
-        if not exercise_type:
-            if weakest_grammar and weakest_grammar.mastery_score < 0.6:
-                exercise_type, sub_type = "Writing", "Targeted Essay"
-            elif vocab_for_drilling:
-                exercise_type, sub_type = "Flashcards", "Translation Recall"
-            else:
-                exercise_type, sub_type = "Reading", "Short Story/Article Analysis"
-
-        if not sub_type:
-            sub_type = {
-                "Writing": "Targeted Essay",
-                "Flashcards": "Translation Recall",
-                "Reading": "Short Story/Article Analysis",
-            }.get(exercise_type, "Targeted Essay")
+    if not sub_type:
+        sub_type = DEFAULT_SUB_TYPES.get(exercise_type, "Targeted Essay")
+
+    return exercise_type, sub_type
 
-        # 3. Use LLM's structured output for a reliable JSON response
-        structured_llm = llm.with_structured_output(schemas.ExerciseDetails)
 
-        prompt = ChatPromptTemplate.from_template(
-            """You are a creative Korean language teacher. Generate a single practice exercise as a JSON object.
+def _allocate_types(count: int, type_mix: dict[str, float]) -> list[tuple[str, str]]:
+    """
+    Splits `count` exercises across the types in `type_mix` in proportion to
+    their weights (largest remainder), returning one (type, sub_type) per slot.
+    """
+    weights = {t: w for t, w in type_mix.items() if w > 0}
+    total = sum(weights.values())
+    shares = {t: count * w / total for t, w in weights.items()}
+    counts = {t: math.floor(share) for t, share in shares.items()}
+    by_remainder = sorted(shares, key=lambda t: shares[t] - counts[t], reverse=True)
+    for t in by_remainder[: count - sum(counts.values())]:
+        counts[t] += 1
+    return [
+        (t, DEFAULT_SUB_TYPES.get(t, "Targeted Essay"))
+        for t, n in counts.items()
+        for _ in range(n)
+    ]
+
+
+class ExerciseBatch(BaseModel):
+    exercises: List[schemas.ExerciseDetails]
+
+
+EXERCISE_PROMPT = ChatPromptTemplate.from_template(
+    """You are a creative Korean language teacher. Generate a single practice exercise as a JSON object.
 
 **Exercise Goal:**
 - **Type**: `{type}`
@@ -67,35 +79,231 @@ class PracticeAgent:
 - Create a `question_text` for the exercise.
 - For a "Targeted Essay," the prompt MUST require using the `{grammar_pattern}` and should address the `{grammar_flags}`.
 - Determine a suitable `expected_format` (e.g., "essay", "single word").
+- For short-answer exercises such as "Translation Recall", set `expected_answer` to the correct answer (separate acceptable alternatives with " / ") and `target_concept` to the Korean word being drilled. Otherwise leave both null.
 - The `type` and `sub_type` in the output must match the goal. Set `exercise_id` to 0.
 """
+)
+
+
+EXERCISE_SET_PROMPT = ChatPromptTemplate.from_template(
+    """You are a creative Korean language teacher. Generate a set of practice exercises as a JSON object with an `exercises` list.
+
+**Exercises to Create (one per line, in this order):**
+{slots}
+
+**User's Weak Points:**
+- **Weakest Grammar Pattern**: `{grammar_pattern}` (Mastery: {grammar_mastery:.2f})
+- **Grammar Weakness Flags**: `{grammar_flags}`
+- **Vocabulary to Drill**: `{vocab_list}`
+
+**Instructions:**
+- Return exactly {count} exercises, in the order listed above, each with the listed `type` and `sub_type`.
+- Create a `question_text` for each exercise. Vary the questions; do not repeat one.
+- For a "Targeted Essay," the prompt MUST require using the `{grammar_pattern}` and should address the `{grammar_flags}`.
+- Determine a suitable `expected_format` (e.g., "essay", "single word").
+- For short-answer exercises such as "Translation Recall", set `expected_answer` to the correct answer (separate acceptable alternatives with " / ") and `target_concept` to the Korean word being drilled. Spread these across the vocabulary to drill. Otherwise leave both null.
+- Set every `exercise_id` to 0.
+"""
+)
+
+
+class PracticeAgent:
+    def __init__(
+        self,
+        db: Session,
+        user_id: int,
+        use_cache: bool = True,
+        priority: int = llm_scheduler.PRIORITY_INTERACTIVE,
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.use_cache = use_cache
+        self.priority = priority
+        llm_registry.get_llm("practice")
+
+    async def generate_exercise(
+        self, request: schemas.ExerciseRequest
+    ) -> schemas.ExerciseDetails | None:
+        """
+        Generates a personalized practice exercise using the model's structured output feature.
+        """
+        exercise_details = await self.compose_exercise(request)
+        if not exercise_details:
+            return None
+
+        # 4. Save the generated exercise
+        db_exercise = await run_sync(
+            crud.create_exercise, self.db, self.user_id, exercise_data=exercise_details
+        )
+        exercise_details.exercise_id = db_exercise.exercise_id
+
+        return exercise_details
+
+    async def generate_exercise_set(
+        self, request: schemas.ExerciseSetRequest
+    ) -> list[schemas.ExerciseDetails] | None:
+        """
+        Generates a whole practice set with one structured call and saves it
+        with one bulk insert.
+        """
+        exercises = await self.compose_exercise_set(request)
+        if not exercises:
+            return None
+
+        exercise_ids = await run_sync(
+            crud.create_exercises, self.db, self.user_id, exercises
+        )
+        for exercise, exercise_id in zip(exercises, exercise_ids):
+            exercise.exercise_id = exercise_id
+        return exercises
+
+    async def compose_exercise_set(
+        self, request: schemas.ExerciseSetRequest
+    ) -> list[schemas.ExerciseDetails] | None:
+        """
+        Asks the model for `request.count` exercises in the requested type mix
+        in a single call, without saving them.
+        """
+        weakest_grammar = await run_sync(
+            review_scheduler.get_target_grammar, self.db, self.user_id
+        )
+        vocab_for_drilling = await run_sync(
+            review_scheduler.get_due_vocabulary,
+            self.db,
+            self.user_id,
+            count=request.count,
         )
+        if any(weight > 0 for weight in request.type_mix.values()):
+            slots = _allocate_types(request.count, request.type_mix)
+        else:
+            slots = [
+                _pick_exercise_type(
+                    schemas.ExerciseRequest(), weakest_grammar, vocab_for_drilling
+                )
+            ] * request.count
 
-        chain = prompt | structured_llm
+        chain = llm_registry.structured_chain(
+            "practice", "exercise_set", EXERCISE_SET_PROMPT, ExerciseBatch
+        )
 
         try:
-            exercise_details = chain.invoke(
+            batch = await llm_cache.cached_ainvoke(
+                self.db,
+                "practice",
+                EXERCISE_SET_PROMPT,
+                chain,
                 {
-                    "type": exercise_type,
-                    "sub_type": sub_type,
+                    "slots": "\n".join(
+                        f"Exercise {number}: type `{exercise_type}`, sub_type `{sub_type}`"
+                        for number, (exercise_type, sub_type) in enumerate(slots, 1)
+                    ),
+                    "count": request.count,
                     "grammar_pattern": weakest_grammar.pattern
                     if weakest_grammar
                     else "None",
                     "grammar_mastery": weakest_grammar.mastery_score
                     if weakest_grammar
                     else 1.0,
-                    "grammar_flags": weakest_grammar.weakness_flags
+                    "grammar_flags": prompt_budget.flags_section(
+                        weakest_grammar.weakness_flags if weakest_grammar else None
+                    ),
+                    "vocab_list": prompt_budget.vocab_section(
+                        [v.word_korean for v in vocab_for_drilling]
+                    ),
+                },
+                ExerciseBatch,
+                cacheable=self.use_cache and llm_cache.is_cacheable("practice"),
+                priority=self.priority,
+            )
+        except Exception as e:
+            print(
+                f"Error invoking structured LLM chain for exercise set generation: {e}"
+            )
+            return None
+
+        if len(batch.exercises) != request.count:
+            print(
+                f"Exercise set: asked for {request.count}, got {len(batch.exercises)}."
+            )
+        # Keep the requested mix even if the model drifted from it.
+        exercises = batch.exercises[: request.count]
+        for exercise, (exercise_type, sub_type) in zip(exercises, slots):
+            exercise.type = exercise_type
+            exercise.sub_type = sub_type
+            exercise.exercise_id = 0
+        return exercises
+
+    async def resolve_exercise_type(
+        self,
+        request: schemas.ExerciseRequest,
+        weakest_grammar: models.GrammarMastery | None,
+    ) -> tuple[str, str]:
+        """
+        Returns the (type, sub_type) that `generate_exercise` would produce for `request`.
+        """
+        vocab_for_drilling = []
+        if not request.type:
+            vocab_for_drilling = await run_sync(
+                review_scheduler.get_due_vocabulary, self.db, self.user_id, count=5
+            )
+        return _pick_exercise_type(request, weakest_grammar, vocab_for_drilling)
+
+    async def compose_exercise(
+        self,
+        request: schemas.ExerciseRequest,
+        weakest_grammar: models.GrammarMastery | None = None,
+    ) -> schemas.ExerciseDetails | None:
+        """
+        Asks the model for an exercise without saving it. The returned exercise
+        keeps the placeholder exercise_id of 0.
+        """
+        # 1. Fetch user's weak points
+        if weakest_grammar is None:
+            weakest_grammar = await run_sync(
+                review_scheduler.get_target_grammar, self.db, self.user_id
+            )
+        vocab_for_drilling = await run_sync(
+            review_scheduler.get_due_vocabulary, self.db, self.user_id, count=5
+        )
+
+        # 2. Determine exercise type
+        exercise_type, sub_type = _pick_exercise_type(
+            request, weakest_grammar, vocab_for_drilling
+        )
+
+        # 3. Use LLM's structured output for a reliable JSON response
+        chain = llm_registry.structured_chain(
+            "practice", "exercise", EXERCISE_PROMPT, schemas.ExerciseDetails
+        )
+
+        try:
+            exercise_details = await llm_cache.cached_ainvoke(
+                self.db,
+                "practice",
+                EXERCISE_PROMPT,
+                chain,
+                {
+                    "type": exercise_type,
+                    "sub_type": sub_type,
+                    "grammar_pattern": weakest_grammar.pattern
                     if weakest_grammar
                     else "None",
-                    "vocab_list": [v.word_korean for v in vocab_for_drilling],
-                }
+                    "grammar_mastery": weakest_grammar.mastery_score
+                    if weakest_grammar
+                    else 1.0,
+                    "grammar_flags": prompt_budget.flags_section(
+                        weakest_grammar.weakness_flags if weakest_grammar else None
+                    ),
+                    "vocab_list": prompt_budget.vocab_section(
+                        [v.word_korean for v in vocab_for_drilling]
+                    ),
+                },
+                schemas.ExerciseDetails,
+                cacheable=self.use_cache and llm_cache.is_cacheable("practice"),
+                priority=self.priority,
             )
         except Exception as e:
             print(f"Error invoking structured LLM chain for exercise generation: {e}")
             return None
 
-        # 4. Save the generated exercise
-        db_exercise = crud.create_exercise(self.db, exercise_data=exercise_details)
-        exercise_details.exercise_id = db_exercise.exercise_id
-
         return exercise_details
@@ -0,0 +1,103 @@
+# backend/agents/prompt_budget.py
+"""
+Token accounting and context compaction for the agents' prompts.
+
+The variable parts of a prompt are built here under a token budget per
+section: weakness flags (deduplicated and ranked, since the stored list only
+ever grows) under PROMPT_FLAG_TOKENS, vocabulary lists under
+PROMPT_VOCAB_TOKENS. Whatever doesn't fit is summarized as "(+N more)".
+
+Every prompt sent to a model is measured with record(), which feeds the
+llm_prompt_tokens histogram at /metrics, split into the fixed instructions
+and the interpolated context, and logs prompts over PROMPT_TOKEN_WARNING.
+
+Token counts are estimates, so no tokenizer has to be loaded: about four
+characters per token for ASCII text and one token per character otherwise
+(Hangul syllables are one or two tokens each in the models we use).
+"""
+
+import math
+import os
+from collections import Counter
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from .. import metrics
+
+PROMPT_FLAG_TOKENS = int(os.getenv("PROMPT_FLAG_TOKENS", "120"))
+PROMPT_VOCAB_TOKENS = int(os.getenv("PROMPT_VOCAB_TOKENS", "300"))
+# Prompts estimated above this many tokens are logged.
+PROMPT_TOKEN_WARNING = int(os.getenv("PROMPT_TOKEN_WARNING", "4000"))
+
+
+def count_tokens(text: str) -> int:
+    """Estimated tokens in `text`."""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def normalize_flag(flag: str) -> str:
+    """The form two flags are compared in: case-folded, whitespace collapsed."""
+    return " ".join(str(flag).split()).casefold()
+
+
+def rank_flags(flags: list[str]) -> list[str]:
+    """
+    Distinct flags, most relevant first. Flags that differ only in case or
+    spacing count once, in their latest wording; those seen more often come
+    first, then the most recently added (the stored list is in the order
+    they were found).
+    """
+    counts = Counter(normalize_flag(flag) for flag in flags)
+    latest = {}
+    for position, flag in enumerate(flags):
+        latest[normalize_flag(flag)] = (position, flag.strip())
+    ranked = sorted(latest, key=lambda key: (counts[key], latest[key][0]), reverse=True)
+    return [latest[key][1] for key in ranked]
+
+
+def fit(items: list[str], max_tokens: int) -> list[str]:
+    """
+    The leading `items` that fit in `max_tokens` (always at least one),
+    followed by "(+N more)" if any were left out.
+    """
+    kept, used = [], 0
+    for item in items:
+        # Quotes and separator around each item.
+        cost = count_tokens(item) + 1
+        if kept and used + cost > max_tokens:
+            break
+        kept.append(item)
+        used += cost
+    if len(kept) < len(items):
+        kept.append(f"(+{len(items) - len(kept)} more)")
+    return kept
+
+
+def flags_section(flags: list[str] | None) -> list[str] | str:
+    """A grammar pattern's weakness flags for a prompt, or "None"."""
+    if not flags:
+        return "None"
+    return fit(rank_flags(flags), PROMPT_FLAG_TOKENS)
+
+
+def vocab_section(words: list[str]) -> list[str]:
+    """A vocabulary list for a prompt."""
+    return fit(words, PROMPT_VOCAB_TOKENS)
+
+
+def record(agent: str, prompt: ChatPromptTemplate, inputs: dict) -> int:
+    """
+    Measures the prompt `agent` is about to send and returns its estimated
+    tokens.
+    """
+    total = count_tokens(prompt.format(**inputs))
+    context = min(total, sum(count_tokens(str(value)) for value in inputs.values()))
+    metrics.LLM_PROMPT_TOKENS.observe(total - context, agent=agent, part="fixed")
+    metrics.LLM_PROMPT_TOKENS.observe(context, agent=agent, part="context")
+    if total > PROMPT_TOKEN_WARNING:
+        print(
+            f"[prompt-budget] {agent} prompt of ~{total} tokens "
+            f"({context} context), over PROMPT_TOKEN_WARNING={PROMPT_TOKEN_WARNING}."
+        )
+    return total
@@ -0,0 +1,162 @@
+# backend/benchmarks/bench_async_agents.py
+"""
+Concurrent-request throughput of the agent endpoints with a stubbed LLM.
+
+Runs /lessons/next, /exercises/generate and /exercises/submit at a fixed
+concurrency against a throwaway SQLite database, once with a model call that
+blocks the event loop (what a sync `chain.invoke` inside an async endpoint
+does) and once with a real awaitable call (`chain.ainvoke`).
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_async_agents --requests 200 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+# Removed, database and all, when the interpreter exits.
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_async_agents_")
+_DB_PATH = os.path.join(_DB_DIR.name, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+# Measure the generation path itself, not pool hits.
+os.environ["CONTENT_POOL_ENABLED"] = "false"
+os.environ["GLOSS_FILL_ENABLED"] = "false"
+os.environ["EXERCISE_ARCHIVE_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from .. import models, schemas  # noqa: E402, F401  (registers tables)
+from ..agents import llm_registry  # noqa: E402
+from ..database import init_db  # noqa: E402
+from ..main import app  # noqa: E402
+
+SEED_SQL = Path(__file__).resolve().parents[2] / "resources/db/insert_initial_data.sql"
+
+
+def _fake_output(schema):
+    if schema is schemas.LessonContent:
+        return schemas.LessonContent(
+            lesson_id=0,
+            grammar_pattern="-지만 (but)",
+            explanation_text="Stub explanation.",
+            example_sentences=["예문 하나.", "예문 둘."],
+            new_vocabulary=[],
+        )
+    if schema is schemas.ExerciseDetails:
+        return schemas.ExerciseDetails(
+            exercise_id=0,
+            type="Flashcards",
+            sub_type="Translation Recall",
+            question_text="Stub question.",
+            expected_format="single word",
+        )
+    return schemas.EvaluationResult(
+        grade=80,
+        feedback_text="Stub feedback.",
+        mastery_updates=[
+            schemas.MasteryUpdate(concept="-지만 (but)", new_score=0.6, flags_added=[])
+        ],
+    )
+
+
+class FakeLLM:
+    """Stands in for ChatGoogleGenerativeAI with a fixed per-call latency."""
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    def with_structured_output(self, schema):
+        def call(prompt_value):
+            time.sleep(self.latency)
+            return _fake_output(schema)
+
+        async def acall(prompt_value):
+            if self.blocking:
+                time.sleep(self.latency)
+            else:
+                await asyncio.sleep(self.latency)
+            return _fake_output(schema)
+
+        return RunnableLambda(call, afunc=acall)
+
+
+def _install_fake_llm(latency: float, blocking: bool):
+    llm_registry.install(FakeLLM(latency, blocking))
+
+
+def _seed():
+    init_db()
+    with sqlite3.connect(_DB_PATH) as conn:
+        conn.executescript(SEED_SQL.read_text())
+
+
+async def _run_endpoint(client, method, url, body, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            response = await client.request(method, url, json=body)
+            if response.status_code != 200:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    return total / elapsed, elapsed, failures
+
+
+async def _bench(mode: str, latency: float, total: int, concurrency: int):
+    _install_fake_llm(latency, blocking=(mode == "blocking"))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        exercise = (await client.post("/exercises/generate", json={})).json()
+        endpoints = [
+            ("GET", "/lessons/next", None),
+            ("POST", "/exercises/generate", {}),
+            (
+                "POST",
+                "/exercises/submit",
+                {"exercise_id": exercise["exercise_id"], "user_response": "먹다"},
+            ),
+        ]
+        for method, url, body in endpoints:
+            rps, elapsed, failures = await _run_endpoint(
+                client, method, url, body, total, concurrency
+            )
+            print(
+                f"{mode:<9} {method:<5}{url:<22} {rps:9.1f} req/s "
+                f"{elapsed:7.2f}s  failures={failures}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="Simulated LLM latency (s)."
+    )
+    args = parser.parse_args()
+
+    _seed()
+    print(
+        f"{args.requests} requests per endpoint, concurrency {args.concurrency}, "
+        f"LLM latency {args.latency}s"
+    )
+    for mode in ("blocking", "async"):
+        asyncio.run(_bench(mode, args.latency, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# backend/benchmarks/bench_batch_submit.py
+"""
+Grading a practice set one submission at a time vs. in one batch request.
+
+Creates a set of exercises (a share of them flashcards with a stored answer,
+which are graded locally either way), then grades them through sequential
+POST /exercises/submit calls and through one POST /exercises/submit/batch,
+with a stubbed LLM of fixed latency. Reports wall time and model calls.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_batch_submit --sizes 20 50 --latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_batch_submit_")
+_DB_PATH = os.path.join(_DB_DIR.name, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ["CONTENT_POOL_ENABLED"] = "false"
+os.environ["GLOSS_FILL_ENABLED"] = "false"
+os.environ["EXERCISE_ARCHIVE_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from .. import crud, review_scheduler, schemas  # noqa: E402
+from ..agents import evaluation_agent, llm_registry  # noqa: E402
+from ..database import SessionLocal, init_db  # noqa: E402
+from ..main import app  # noqa: E402
+
+SEED_SQL = Path(__file__).resolve().parents[2] / "resources/db/insert_initial_data.sql"
+_ITEM = re.compile(r"^Item (\d+):", re.MULTILINE)
+_CONCEPT = re.compile(r'Target Concept\*\*: "([^"]*)"')
+_SCORE = re.compile(r"Current Mastery Score\*\*: ([\d.]+)")
+SCORE_STEP = 0.01
+
+
+class CountingLLM:
+    """Stands in for ChatGoogleGenerativeAI; counts calls, sleeps `latency`."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def _output(self, schema, prompt_value):
+        # Each item raises the score the prompt shows by SCORE_STEP, chained
+        # from one item to the next as the prompt asks.
+        text = prompt_value.to_string()
+        concept = _CONCEPT.search(text).group(1)
+        score = float(_SCORE.search(text).group(1))
+
+        def update(n: int):
+            return schemas.MasteryUpdate(
+                concept=concept, new_score=score + SCORE_STEP * n, flags_added=[]
+            )
+
+        if schema is evaluation_agent.EvaluationBatch:
+            items = _ITEM.findall(text)
+            return schema(
+                evaluations=[
+                    evaluation_agent.ItemEvaluation(
+                        item=int(n),
+                        grade=70,
+                        feedback_text="Stub feedback.",
+                        mastery_updates=[update(int(n))],
+                    )
+                    for n in items
+                ]
+            )
+        return schemas.EvaluationResult(
+            grade=70, feedback_text="Stub feedback.", mastery_updates=[update(1)]
+        )
+
+    def with_structured_output(self, schema):
+        async def acall(prompt_value):
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+            return self._output(schema, prompt_value)
+
+        return RunnableLambda(lambda _: None, afunc=acall)
+
+
+def _create_set(size: int, flashcard_share: float) -> list[dict]:
+    db = SessionLocal()
+    submissions = []
+    try:
+        for i in range(size):
+            if i < size * flashcard_share:
+                details = schemas.ExerciseDetails(
+                    exercise_id=0,
+                    type="Flashcards",
+                    sub_type="Translation Recall",
+                    question_text="Translate 'to eat'.",
+                    expected_format="single word",
+                    expected_answer="먹다",
+                    target_concept="먹다",
+                )
+                response = "먹다"
+            else:
+                details = schemas.ExerciseDetails(
+                    exercise_id=0,
+                    type="Writing",
+                    sub_type="Sentence Building",
+                    question_text="Join two clauses with -지만.",
+                    expected_format="one sentence",
+                )
+                response = "비싸지만 좋아요."
+            exercise = crud.create_exercise(db, 1, exercise_data=details)
+            submissions.append(
+                {"exercise_id": exercise.exercise_id, "user_response": response}
+            )
+    finally:
+        db.close()
+    return submissions
+
+
+async def _bench(size: int, latency: float, flashcard_share: float):
+    fake = CountingLLM(latency)
+    llm_registry.install(fake, ["evaluation"])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        submissions = _create_set(size, flashcard_share)
+        started = time.perf_counter()
+        for submission in submissions:
+            response = await client.post("/exercises/submit", json=submission)
+            response.raise_for_status()
+        sequential = time.perf_counter() - started, fake.calls
+
+        submissions = _create_set(size, flashcard_share)
+        fake.calls = 0
+        started = time.perf_counter()
+        response = await client.post(
+            "/exercises/submit/batch", json={"submissions": submissions}
+        )
+        response.raise_for_status()
+        batch = time.perf_counter() - started, fake.calls
+        assert response.json()["graded"] == size, response.json()
+
+    for name, (elapsed, calls) in (("sequential", sequential), ("batch", batch)):
+        print(f"{size:>5} {name:<11} {elapsed:>8.2f}s {calls:>10}")
+
+
+async def _check_chaining(size: int = 25):
+    # The set is graded in concurrent chunks, but its score must end where
+    # grading it in one sequence would, not at the last chunk's own result.
+    llm_registry.install(CountingLLM(0), ["evaluation"])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        submissions = _create_set(size, flashcard_share=0)
+        db = SessionLocal()
+        try:
+            # A score the prompt shows exactly, with room for the whole set.
+            target = review_scheduler.get_target_grammar(db, 1)
+            pattern, target.mastery_score = target.pattern, 0.3
+            db.commit()
+        finally:
+            db.close()
+        response = await client.post(
+            "/exercises/submit/batch", json={"submissions": submissions}
+        )
+        response.raise_for_status()
+    db = SessionLocal()
+    try:
+        after = crud.get_concept_mastery_score(db, 1, pattern)
+    finally:
+        db.close()
+    expected = 0.3 + SCORE_STEP * size
+    assert abs(after - expected) < 1e-6, (after, expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50])
+    parser.add_argument(
+        "--latency", type=float, default=1.0, help="Simulated LLM latency (s)."
+    )
+    parser.add_argument(
+        "--flashcard-share",
+        type=float,
+        default=0.5,
+        help="Share of the set that is locally gradable flashcards.",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    with sqlite3.connect(_DB_PATH) as conn:
+        conn.executescript(SEED_SQL.read_text())
+    print(
+        f"batch size {evaluation_agent.EVALUATION_BATCH_SIZE}, "
+        f"LLM latency {args.latency}s, flashcard share {args.flashcard_share}"
+    )
+    asyncio.run(_check_chaining())
+    print(f"{'items':>5} {'mode':<11} {'wall':>9} {'LLM calls':>10}")
+    for size in args.sizes:
+        asyncio.run(_bench(size, args.latency, args.flashcard_share))
+
+
+if __name__ == "__main__":
+    main()
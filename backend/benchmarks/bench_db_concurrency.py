@@ -0,0 +1,233 @@
+# backend/benchmarks/bench_db_concurrency.py
+"""
+Concurrent submissions and dashboard reads against one SQLite file.
+
+Runs writer workers (crud.apply_evaluation, as /exercises/submit does) next to
+reader workers (dashboard status plus a review-history page) for a fixed
+number of operations each, and reports throughput, tail latency and
+"database is locked" failures for:
+
+  baseline  the previous engine: rollback journal, driver defaults, threads
+  tuned     database.create_db_engine (WAL, busy_timeout, synchronous=NORMAL,
+            mmap, sized pool), threads
+  async     database.create_async_db_engine on aiosqlite, asyncio tasks
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_db_concurrency --writers 16 --readers 16
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from .. import crud, models, schemas
+from ..database import Base, create_async_db_engine, create_db_engine
+
+LEARNERS = 20
+VOCAB_PER_LEARNER = 500
+EXERCISES_PER_LEARNER = 200
+
+
+def _seed(engine):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.UserStatus),
+            [
+                {
+                    "user_id": u,
+                    "current_level": "Beginner",
+                    "known_vocab_count": 0,
+                    "grammar_mastered_count": 0,
+                    "most_recent_weak_area": "N/A",
+                }
+                for u in range(1, LEARNERS + 1)
+            ],
+        )
+        conn.execute(
+            insert(models.VocabularyMastery),
+            [
+                {
+                    "user_id": u,
+                    "word_korean": f"단어{i}",
+                    "mastery_score": rng.random(),
+                    "times_correct": 0,
+                    "times_incorrect": 0,
+                }
+                for u in range(1, LEARNERS + 1)
+                for i in range(VOCAB_PER_LEARNER)
+            ],
+        )
+        conn.execute(
+            insert(models.Exercises),
+            [
+                {"user_id": u, "type": "Flashcards", "question_data": {}}
+                for u in range(1, LEARNERS + 1)
+                for _ in range(EXERCISES_PER_LEARNER)
+            ],
+        )
+
+
+def _write(db, rng):
+    user_id = rng.randint(1, LEARNERS)
+    exercise_id = (user_id - 1) * EXERCISES_PER_LEARNER + rng.randint(
+        1, EXERCISES_PER_LEARNER
+    )
+    crud.apply_evaluation(
+        db,
+        user_id,
+        schemas.Submission(exercise_id=exercise_id, user_response="답"),
+        schemas.EvaluationResult(
+            grade=rng.randint(0, 100),
+            feedback_text="",
+            mastery_updates=[
+                schemas.MasteryUpdate(
+                    concept=f"단어{rng.randrange(VOCAB_PER_LEARNER)}",
+                    new_score=rng.random(),
+                    flags_added=[],
+                )
+                for _ in range(3)
+            ],
+        ),
+    )
+
+
+def _read(db, rng):
+    user_id = rng.randint(1, LEARNERS)
+    crud.get_dashboard_status(db, user_id)
+    crud.get_review_history(db, user_id)
+
+
+class _Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {"write": [], "read": []}
+        self.locked = {"write": 0, "read": 0}
+        self.finished = {"write": 0.0, "read": 0.0}
+
+    def record(self, kind, started, error):
+        with self.lock:
+            now = time.perf_counter()
+            self.finished[kind] = max(self.finished[kind], now)
+            if error:
+                self.locked[kind] += 1
+            else:
+                self.latencies[kind].append(now - started)
+
+
+def _attempt(op, db, rng, kind, results):
+    started = time.perf_counter()
+    try:
+        op(db, rng)
+    except OperationalError as e:
+        if "locked" not in str(e):
+            raise
+        db.rollback()
+        results.record(kind, started, True)
+        return
+    results.record(kind, started, False)
+
+
+def _run_threads(engine, writers, readers, ops):
+    Session = sessionmaker(bind=engine, autoflush=False)
+    results = _Results()
+
+    def worker(op, kind, seed):
+        rng = random.Random(seed)
+        for _ in range(ops):
+            db = Session()
+            try:
+                _attempt(op, db, rng, kind, results)
+            finally:
+                db.close()
+
+    with ThreadPoolExecutor(max_workers=writers + readers) as pool:
+        jobs = [pool.submit(worker, _write, "write", i) for i in range(writers)]
+        jobs += [pool.submit(worker, _read, "read", -i - 1) for i in range(readers)]
+        for job in jobs:
+            job.result()
+    return results
+
+
+async def _run_async(url, writers, readers, ops):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine(url)
+    Session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    results = _Results()
+
+    async def worker(op, kind, seed):
+        rng = random.Random(seed)
+        for _ in range(ops):
+            async with Session() as db:
+                await db.run_sync(lambda s: _attempt(op, s, rng, kind, results))
+
+    await asyncio.gather(
+        *(worker(_write, "write", i) for i in range(writers)),
+        *(worker(_read, "read", -i - 1) for i in range(readers)),
+    )
+    await async_engine.dispose()
+    return results
+
+
+def _percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+def _report(mode, results, started):
+    for kind in ("write", "read"):
+        done = results.latencies[kind]
+        elapsed = results.finished[kind] - started
+        print(
+            f"{mode:<9} {kind:<6} {len(done) / elapsed:>8.1f} ops/s"
+            f" {_percentile(done, 0.5):>8.1f} {_percentile(done, 0.99):>8.1f}"
+            f" {results.locked[kind]:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=50, help="operations per worker")
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<9} {'op':<6} {'throughput':>14} {'p50 ms':>8} {'p99 ms':>8}"
+        f" {'locked':>7}"
+    )
+    for mode in ("baseline", "tuned", "async"):
+        with tempfile.TemporaryDirectory() as workdir:
+            url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+            if mode == "baseline":
+                engine = create_engine(url, connect_args={"check_same_thread": False})
+            else:
+                engine = create_db_engine(url)
+            _seed(engine)
+
+            started = time.perf_counter()
+            if mode == "async":
+                results = asyncio.run(
+                    _run_async(url, args.writers, args.readers, args.ops)
+                )
+            else:
+                results = _run_threads(engine, args.writers, args.readers, args.ops)
+            _report(mode, results, started)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# backend/benchmarks/bench_deck_import.py
+"""
+Rows per second and peak memory of the streaming deck importer.
+
+Writes synthetic decks (90% vocabulary rows, 10% grammar rows, every row
+unique) as CSV and JSONL, then imports each into a fresh SQLite database for
+one learner with deck_import.import_file, and imports it a second time, when
+every row already exists. Each import runs in its own interpreter, so peak
+RSS is that import's own; it should not grow with the deck size. Pages of
+the database file that SQLite has memory-mapped count towards RSS too; run
+with SQLITE_MMAP_SIZE=0 to see the importer's own footprint.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_deck_import --rows 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _write_deck(path: str, rows: int, deck_format: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if deck_format == "csv":
+            f.write("word_korean,pattern,english\n")
+        for i in range(rows):
+            if i % 10 == 9:
+                word, pattern = "", f"-패턴{i} (pattern {i})"
+            else:
+                word, pattern = f"단어{i}", ""
+            if deck_format == "csv":
+                f.write(f'{word},"{pattern}",word {i}\n')
+            else:
+                row = {"word_korean": word} if word else {"pattern": pattern}
+                f.write(json.dumps({**row, "english": f"word {i}"}) + "\n")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _child(path: str, deck_format: str, batch_size: int, passes: int):
+    # Imported here: the engine must be created on the child's own database.
+    from .. import deck_import
+    from ..database import SessionLocal, init_db
+
+    init_db()
+    for run in range(passes):
+        db = SessionLocal()
+        try:
+            with open(path, "rb") as file:
+                started = time.perf_counter()
+                result = deck_import.import_file(db, 1, file, deck_format, batch_size)
+                elapsed = time.perf_counter() - started
+        finally:
+            db.close()
+        print(
+            "RESULT "
+            + json.dumps(
+                {
+                    "pass": "first" if run == 0 else "again",
+                    "rows": result.rows,
+                    "added": result.vocabulary_added + result.grammar_added,
+                    "seconds": elapsed,
+                    "peak_rss_mb": _peak_rss_mb(),
+                }
+            ),
+            flush=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "jsonl"])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    # Internal: import one deck in this interpreter.
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child[0], args.child[1], args.batch_size, passes=2)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_deck_import_") as workdir:
+        print(
+            f"{'rows':>9} {'format':<6} {'pass':<6} {'seconds':>8} {'rows/s':>9}"
+            f" {'added':>9} {'RSS MB':>7} {'deck MB':>8}"
+        )
+        for rows in args.rows:
+            for deck_format in args.formats:
+                path = os.path.join(workdir, f"deck_{rows}.{deck_format}")
+                _write_deck(path, rows, deck_format)
+                size_mb = os.path.getsize(path) / (1024 * 1024)
+                database = os.path.join(workdir, f"deck_{rows}_{deck_format}.db")
+                child = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        __spec__.name,
+                        "--child",
+                        path,
+                        deck_format,
+                        "--batch-size",
+                        str(args.batch_size),
+                    ],
+                    env={
+                        **os.environ,
+                        "DATABASE_URL": f"sqlite:///{database}",
+                        "CONTENT_POOL_ENABLED": "false",
+                    },
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    check=True,
+                )
+                for line in child.stdout.splitlines():
+                    if not line.startswith("RESULT "):
+                        continue
+                    result = json.loads(line[len("RESULT ") :])
+                    print(
+                        f"{rows:>9} {deck_format:<6} {result['pass']:<6}"
+                        f" {result['seconds']:>8.2f}"
+                        f" {result['rows'] / result['seconds']:>9.0f}"
+                        f" {result['added']:>9} {result['peak_rss_mb']:>7.1f}"
+                        f" {size_mb:>8.1f}",
+                        flush=True,
+                    )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+# backend/benchmarks/bench_endpoints.py
+"""
+End-to-end benchmark of every API endpoint at several database scales.
+
+For each scale, seeds a fresh SQLite database (user 1 from
+resources/db/insert_initial_data.sql, plus synthetic learners with grammar,
+vocabulary and graded exercise history), then drives each endpoint in
+backend/main.py at a fixed concurrency through the ASGI app, with the
+offline model from agents/fake_llm.py standing in for Gemini. Reports
+throughput, p50/p95/p99 latency, SQL statements per request and peak RSS,
+and writes them to a JSON file; --compare prints the change against an
+earlier run.
+
+Each scale runs in its own interpreter, so module-level state (engine,
+caches, scheduler) starts clean. The LLM scheduler's limits are lifted unless
+set in the environment, so that its rate limit doesn't mask backend costs.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_endpoints --scales small medium \\
+        --requests 200 --concurrency 20 --output bench_endpoints.json
+    python -m backend.benchmarks.bench_endpoints --compare bench_endpoints.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import event, insert, text
+
+SEED_SQL = Path(__file__).resolve().parents[2] / "resources/db/insert_initial_data.sql"
+
+# learners, grammar patterns / vocabulary words / graded exercises per learner
+SCALES = {
+    "small": (10, 16, 100, 50),
+    "medium": (100, 32, 500, 200),
+    "large": (500, 64, 2000, 500),
+}
+# Ungraded exercises per learner for the submit endpoints to grade.
+OPEN_EXERCISES = 20
+
+
+# =================================================================
+# Seeding
+# =================================================================
+
+
+# The backend modules are imported inside functions: importing them creates
+# the engine, which must only happen in the child, on its own database.
+def _seed(engine, scale: str):
+    from .. import models
+    from ..database import Base
+
+    learners, grammar, vocab, history = SCALES[scale]
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    Base.metadata.create_all(bind=engine)
+    with sqlite3.connect(engine.url.database) as conn:
+        conn.executescript(SEED_SQL.read_text())
+
+    with engine.begin() as conn:
+        base_grammar = [
+            row.pattern
+            for row in conn.execute(text("SELECT pattern FROM grammar_mastery"))
+        ]
+        base_vocab = [
+            row.word_korean
+            for row in conn.execute(text("SELECT word_korean FROM vocabulary_mastery"))
+        ]
+        patterns = base_grammar + [
+            f"패턴 {i}" for i in range(max(0, grammar - len(base_grammar)))
+        ]
+        words = base_vocab + [
+            f"단어{i}" for i in range(max(0, vocab - len(base_vocab)))
+        ]
+
+        conn.execute(
+            insert(models.UserStatus),
+            [
+                {
+                    "user_id": u,
+                    "current_level": "Beginner",
+                    "known_vocab_count": 0,
+                    "grammar_mastered_count": 0,
+                    "most_recent_weak_area": "N/A",
+                }
+                for u in range(2, learners + 1)
+            ],
+        )
+        conn.execute(
+            insert(models.GrammarMastery),
+            [
+                {
+                    "user_id": u,
+                    "pattern": p,
+                    "mastery_score": rng.random(),
+                    "last_reviewed": now - timedelta(days=rng.randint(0, 30)),
+                    "weakness_flags": [],
+                    "times_incorrect": 0,
+                }
+                for u in range(1, learners + 1)
+                for p in patterns
+                if u > 1 or p not in base_grammar
+            ],
+        )
+        conn.execute(
+            insert(models.VocabularyMastery),
+            [
+                {
+                    "user_id": u,
+                    "word_korean": w,
+                    "mastery_score": rng.random(),
+                    "last_reviewed": now - timedelta(days=rng.randint(0, 30)),
+                    "times_correct": 0,
+                    "times_incorrect": 0,
+                }
+                for u in range(1, learners + 1)
+                for w in words
+                if u > 1 or w not in base_vocab
+            ],
+        )
+        conn.execute(
+            insert(models.Exercises),
+            [
+                {
+                    "user_id": u,
+                    "type": "Writing",
+                    "sub_type": "Targeted Essay",
+                    "question_data": _exercise(i),
+                    "user_response": "비싸지만 좋아요.",
+                    "grade": rng.randint(0, 100),
+                    "feedback": "Seeded.",
+                    "submitted_at": now - timedelta(minutes=i),
+                }
+                for u in range(1, learners + 1)
+                for i in range(history)
+            ],
+        )
+        conn.execute(
+            insert(models.Exercises),
+            [
+                {
+                    "user_id": u,
+                    "type": "Writing" if i % 2 else "Flashcards",
+                    "sub_type": "Targeted Essay" if i % 2 else "Translation Recall",
+                    "question_data": _exercise(i, flashcard=not i % 2),
+                }
+                for u in range(1, learners + 1)
+                for i in range(OPEN_EXERCISES)
+            ],
+        )
+        # Dashboard aggregates, as the seed script computes them for user 1.
+        conn.execute(
+            text(
+                """
+                UPDATE user_status SET
+                    known_vocab_count = (SELECT COUNT(*) FROM vocabulary_mastery v
+                        WHERE v.user_id = user_status.user_id AND v.mastery_score >= 0.8),
+                    grammar_mastered_count = (SELECT COUNT(*) FROM grammar_mastery g
+                        WHERE g.user_id = user_status.user_id AND g.mastery_score >= 0.8),
+                    most_recent_weak_area = (SELECT pattern FROM grammar_mastery g
+                        WHERE g.user_id = user_status.user_id
+                        ORDER BY mastery_score, last_reviewed LIMIT 1)
+                """
+            )
+        )
+
+
+def _exercise(i: int, flashcard: bool = False) -> dict:
+    if flashcard:
+        return {
+            "exercise_id": 0,
+            "type": "Flashcards",
+            "sub_type": "Translation Recall",
+            "question_text": "Translate 'to eat'.",
+            "expected_format": "single word",
+            "expected_answer": "먹다",
+            "target_concept": "먹다",
+        }
+    return {
+        "exercise_id": 0,
+        "type": "Writing",
+        "sub_type": "Targeted Essay",
+        "question_text": f"Write two sentences joined with -지만 ({i}).",
+        "expected_format": "essay",
+    }
+
+
+def _open_exercises(engine) -> dict[int, list[int]]:
+    by_learner: dict[int, list[int]] = {}
+    with engine.connect() as conn:
+        for row in conn.execute(
+            text("SELECT user_id, exercise_id FROM exercises WHERE grade IS NULL")
+        ):
+            by_learner.setdefault(row.user_id, []).append(row.exercise_id)
+    return by_learner
+
+
+# =================================================================
+# Driving the endpoints
+# =================================================================
+
+
+def _endpoints(open_exercises: dict[int, list[int]]):
+    """(name, method, url, body builder) for every endpoint in main.py."""
+
+    def submission(user_id, rng):
+        return {
+            "exercise_id": rng.choice(open_exercises[user_id]),
+            "user_response": "먹다" if rng.random() < 0.5 else "비싸지만 좋아요.",
+        }
+
+    return [
+        ("root", "GET", "/", None),
+        ("dashboard_status", "GET", "/dashboard/status", None),
+        ("lesson_next", "GET", "/lessons/next", None),
+        ("lesson_stream", "GET", "/lessons/next/stream", None),
+        ("exercise_generate", "POST", "/exercises/generate", lambda u, rng: {}),
+        (
+            "exercise_generate_set",
+            "POST",
+            "/exercises/generate/set",
+            lambda u, rng: {"count": 10, "type_mix": {"Writing": 1, "Flashcards": 1}},
+        ),
+        ("exercise_submit", "POST", "/exercises/submit", submission),
+        (
+            "exercise_submit_batch",
+            "POST",
+            "/exercises/submit/batch",
+            lambda u, rng: {"submissions": [submission(u, rng) for _ in range(10)]},
+        ),
+        ("review_history", "GET", "/review/history?limit=20", None),
+        ("mastery_grammar", "GET", "/mastery/grammar", None),
+        ("mastery_vocab", "GET", "/mastery/vocab", None),
+        ("progress", "GET", "/progress", None),
+        ("llm_cache_stats", "GET", "/llm-cache/stats", None),
+        ("llm_scheduler_stats", "GET", "/llm-scheduler/stats", None),
+        ("metrics", "GET", "/metrics", None),
+    ]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+async def _drive(client, learners, method, url, body, requests, concurrency, seed):
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        user_id = rng.randint(1, learners)
+        json_body = body(user_id, rng) if body else None
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(
+                method, url, json=json_body, headers={"X-User-Id": str(user_id)}
+            )
+            latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _run_scale(scale: str, args) -> dict:
+    import httpx
+
+    from ..agents import llm_registry
+    from ..agents.fake_llm import FakeChatModel
+    from ..database import engine
+    from ..main import app
+
+    started = time.perf_counter()
+    _seed(engine, scale)
+    seed_seconds = time.perf_counter() - started
+    learners = SCALES[scale][0]
+    open_exercises = _open_exercises(engine)
+    llm_registry.install(FakeChatModel(latency=args.latency))
+
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        for name, method, url, body in _endpoints(open_exercises):
+            if args.endpoints and name not in args.endpoints:
+                continue
+            # Warm-up (first-use costs, cache fill) isn't measured.
+            await _drive(client, learners, method, url, body, args.concurrency, 1, 0)
+            statements = 0
+            latencies, errors, elapsed = await _drive(
+                client,
+                learners,
+                method,
+                url,
+                body,
+                args.requests,
+                args.concurrency,
+                args.seed,
+            )
+            results[name] = {
+                "requests": args.requests,
+                "errors": errors,
+                "throughput_rps": round(args.requests / elapsed, 1),
+                "p50_ms": round(_percentile(latencies, 0.50), 2),
+                "p95_ms": round(_percentile(latencies, 0.95), 2),
+                "p99_ms": round(_percentile(latencies, 0.99), 2),
+                "sql_per_request": round(statements / args.requests, 2),
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+            }
+            _print_row(scale, name, results[name])
+    return {"seed_seconds": round(seed_seconds, 2), "endpoints": results}
+
+
+# =================================================================
+# Reporting
+# =================================================================
+
+_HEADER = (
+    f"{'scale':<7} {'endpoint':<22} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+    f" {'p99 ms':>8} {'SQL/req':>8} {'RSS MB':>7} {'errors':>6}"
+)
+
+
+def _print_row(scale: str, name: str, row: dict):
+    print(
+        f"{scale:<7} {name:<22} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.2f}"
+        f" {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['sql_per_request']:>8.2f}"
+        f" {row['peak_rss_mb']:>7.1f} {row['errors']:>6}",
+        flush=True,
+    )
+
+
+def _compare(baseline: dict, current: dict):
+    print(f"{'scale':<7} {'endpoint':<22} {'p95 ms':>19} {'SQL/req':>17}")
+    for scale, result in current["results"].items():
+        before = baseline["results"].get(scale, {}).get("endpoints", {})
+        for name, row in result["endpoints"].items():
+            if name not in before:
+                continue
+            old = before[name]
+            change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            print(
+                f"{scale:<7} {name:<22} {old['p95_ms']:>8.2f} -> {row['p95_ms']:>8.2f}"
+                f" ({change:+5.0f}%) {old['sql_per_request']:>6.2f} ->"
+                f" {row['sql_per_request']:>6.2f}"
+            )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=["small"])
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Simulated LLM latency (s)."
+    )
+    parser.add_argument("--endpoints", nargs="+", help="Only these endpoint names.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_endpoints.json")
+    parser.add_argument("--compare", help="An earlier --output file to diff against.")
+    # Internal: run one scale in this interpreter and print its JSON result.
+    parser.add_argument("--child", choices=SCALES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(_run_scale(args.child, args))
+        print("RESULT " + json.dumps(result))
+        return
+
+    if args.compare and not any(a.startswith("--scales") for a in sys.argv[1:]):
+        baseline = json.loads(Path(args.compare).read_text())
+        args.scales = list(baseline["results"])
+
+    print(_HEADER, flush=True)
+    results = {}
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                "CONTENT_POOL_ENABLED": "false",
+                "GLOSS_FILL_ENABLED": "false",
+                "EXERCISE_ARCHIVE_ENABLED": "false",
+                "LLM_PROVIDER": "fake",
+            }
+            env.setdefault("LLM_RATE_PER_SECOND", "1000000")
+            env.setdefault("LLM_RATE_BURST", "1000000")
+            env.setdefault("LLM_MAX_CONCURRENCY", "10000")
+            child = subprocess.run(
+                [sys.executable, "-m", __spec__.name, "--child", scale]
+                + [a for a in sys.argv[1:] if a != "--child"],
+                env=env,
+                stdout=subprocess.PIPE,
+                text=True,
+                check=True,
+            )
+            for line in child.stdout.splitlines():
+                if line.startswith("RESULT "):
+                    results[scale] = json.loads(line[len("RESULT ") :])
+                elif line.split(" ", 1)[0] in SCALES:
+                    print(line, flush=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency_s": args.latency,
+        },
+        "results": results,
+    }
+    if args.compare:
+        _compare(json.loads(Path(args.compare).read_text()), report)
+    Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
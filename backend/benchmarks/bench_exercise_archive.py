@@ -0,0 +1,161 @@
+# backend/benchmarks/bench_exercise_archive.py
+"""
+Database size and review-history latency before and after exercise archival.
+
+Seeds a throwaway SQLite database with a year of exercises for a few
+learners (one in five never submitted), each with a realistic question_data
+payload. It reports the file size and the cost of a history page near the
+start and deep into the history. Then it runs exercise_archive.archive_due
+and reports the same again. It then adds another month of exercises, to show
+the pages the archive freed being reused, and finally reports after VACUUM.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_exercise_archive --exercises 200000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_exercise_archive_")
+_DB_PATH = os.path.join(_DB_DIR.name, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from .. import crud, exercise_archive, models  # noqa: E402
+from ..database import Base, SessionLocal, engine  # noqa: E402
+
+LEARNERS = 5
+PAGE_SIZE = 10
+REPEATS = 200
+
+
+def _exercises(rng, first: int, count: int, start: datetime, span: timedelta):
+    rows = []
+    for i in range(first, first + count):
+        created = start + span * (i - first) / count
+        answered = i // LEARNERS % 5 != 0
+        rows.append(
+            {
+                "user_id": i % LEARNERS + 1,
+                "type": "Writing",
+                "sub_type": "Targeted Essay",
+                "question_data": {
+                    "exercise_id": 0,
+                    "type": "Writing",
+                    "sub_type": "Targeted Essay",
+                    "question_text": "다음 문법을 사용하여 주말 계획에 대해 세 문장으로 쓰세요: "
+                    f"-(으)려고 하다. Write three sentences about plan {i}.",
+                    "expected_format": "essay",
+                    "expected_answer": None,
+                    "target_concept": None,
+                },
+                "user_response": "이번 주말에 친구를 만나려고 해요. 영화를 보려고 해요."
+                if answered
+                else None,
+                "grade": rng.randint(40, 100) if answered else None,
+                "feedback": "Good use of -(으)려고 하다; watch the particle after 영화."
+                if answered
+                else None,
+                "created_at": created,
+                "submitted_at": created + timedelta(minutes=5) if answered else None,
+            }
+        )
+    return rows
+
+
+def _seed(db, rng, first: int, count: int, start: datetime, span: timedelta):
+    for batch in range(first, first + count, 20_000):
+        size = min(20_000, first + count - batch)
+        db.execute(insert(models.Exercises), _exercises(rng, batch, size, start, span))
+    db.commit()
+
+
+def _size_mb(db) -> float:
+    db.connection().exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(_DB_PATH) / (1024 * 1024)
+
+
+def _page_ms(db, skip: int) -> float:
+    cursor = None
+    while skip > 0:
+        rows, cursor = crud.get_review_history(db, 1, cursor, min(skip, 100))
+        skip -= len(rows)
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        crud.get_review_history(db, 1, cursor, PAGE_SIZE)
+    return (time.perf_counter() - started) / REPEATS * 1000
+
+
+def _report(db, label: str, deep: int):
+    hot = db.query(models.Exercises).count()
+    archived = db.query(models.ExerciseArchive).count()
+    print(
+        f"{label:<22} {_size_mb(db):>8.1f} {hot:>9} {archived:>9}"
+        f" {_page_ms(db, 0):>8.3f} {_page_ms(db, deep):>8.3f}",
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--exercises", type=int, default=200_000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    db.execute(
+        insert(models.UserStatus),
+        [{"user_id": u, "current_level": "Beginner"} for u in range(1, LEARNERS + 1)],
+    )
+    _seed(db, rng, 1, args.exercises, now - timedelta(days=365), timedelta(days=365))
+    # Deep enough to reach into the archive once it's there.
+    deep = args.exercises // LEARNERS // 2
+
+    print(
+        f"{'':<22} {'file MB':>8} {'hot rows':>9} {'archived':>9}"
+        f" {'page ms':>8} {f'@{deep} ms':>8}"
+    )
+    _report(db, "before", deep)
+
+    result = exercise_archive.archive_due(db, now)
+    archived = db.query(models.ExerciseArchive).order_by(
+        models.ExerciseArchive.exercise_id
+    )
+    payload_bytes = sum(len(row.payload) for row in archived)
+    print(
+        f"archived {result.graded} graded and {result.abandoned} abandoned"
+        f" in {result.seconds}s,"
+        f" {payload_bytes / (result.graded + result.abandoned):.0f} payload bytes"
+        " per exercise"
+    )
+    # The archive must give back what was seeded.
+    sample = archived.first()
+    expected = _exercises(random.Random(), sample.exercise_id, 1, now, timedelta())[0]
+    record = crud.unpack_archived_exercise(sample)
+    assert (
+        record["question_data"]["question_text"]
+        == (expected["question_data"]["question_text"])
+    )
+    assert record["user_response"] == expected["user_response"]
+    _report(db, "after archive", deep)
+
+    month = args.exercises // 12
+    _seed(db, rng, args.exercises + 1, month, now, timedelta(days=30))
+    _report(db, "after another month", deep)
+
+    db.close()
+    exercise_archive.vacuum()
+    db = SessionLocal()
+    _report(db, "after vacuum", deep)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_exercise_set.py
+"""
+Starting a practice session: N single-exercise requests vs. one set request.
+
+Generates a practice set through N sequential POST /exercises/generate calls
+and through one POST /exercises/generate/set, with a stubbed LLM of fixed
+latency, and reports wall time, model calls and SQL statements issued.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_exercise_set --sizes 10 30 --latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_exercise_set_")
+_DB_PATH = os.path.join(_DB_DIR.name, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ["CONTENT_POOL_ENABLED"] = "false"
+os.environ["GLOSS_FILL_ENABLED"] = "false"
+os.environ["EXERCISE_ARCHIVE_ENABLED"] = "false"
+# Every single-exercise call would otherwise be a cache hit after the first.
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from .. import schemas  # noqa: E402
+from ..agents import llm_registry, practice_agent  # noqa: E402
+from ..database import engine, init_db  # noqa: E402
+from ..main import app  # noqa: E402
+
+SEED_SQL = Path(__file__).resolve().parents[2] / "resources/db/insert_initial_data.sql"
+_SLOT = re.compile(r"^Exercise (\d+): type `([^`]*)`, sub_type `([^`]*)`", re.M)
+
+
+class CountingLLM:
+    """Stands in for ChatGoogleGenerativeAI; counts calls, sleeps `latency`."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    @staticmethod
+    def _exercise(exercise_type="Flashcards", sub_type="Translation Recall"):
+        return schemas.ExerciseDetails(
+            exercise_id=0,
+            type=exercise_type,
+            sub_type=sub_type,
+            question_text="Stub question.",
+            expected_format="single word",
+        )
+
+    def with_structured_output(self, schema):
+        async def acall(prompt_value):
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+            if schema is practice_agent.ExerciseBatch:
+                slots = _SLOT.findall(prompt_value.to_string())
+                return schema(exercises=[self._exercise(t, s) for _, t, s in slots])
+            return self._exercise()
+
+        return RunnableLambda(lambda _: None, afunc=acall)
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def _bench(size: int, latency: float, statements: StatementCounter):
+    fake = CountingLLM(latency)
+    llm_registry.install(fake, ["practice"])
+    request = {"type": "Flashcards", "sub_type": "Translation Recall"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        statements.count = 0
+        started = time.perf_counter()
+        for _ in range(size):
+            response = await client.post("/exercises/generate", json=request)
+            response.raise_for_status()
+        sequential = time.perf_counter() - started, fake.calls, statements.count
+
+        fake.calls = statements.count = 0
+        started = time.perf_counter()
+        response = await client.post(
+            "/exercises/generate/set",
+            json={"count": size, "type_mix": {"Flashcards": 1}},
+        )
+        response.raise_for_status()
+        batch = time.perf_counter() - started, fake.calls, statements.count
+        ids = [e["exercise_id"] for e in response.json()["exercises"]]
+        assert len(set(ids)) == size and 0 not in ids, ids
+
+    for name, (elapsed, calls, sql) in (("sequential", sequential), ("set", batch)):
+        print(f"{size:>5} {name:<11} {elapsed:>8.2f}s {calls:>10} {sql:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 30])
+    parser.add_argument(
+        "--latency", type=float, default=1.0, help="Simulated LLM latency (s)."
+    )
+    args = parser.parse_args()
+
+    init_db()
+    with sqlite3.connect(_DB_PATH) as conn:
+        conn.executescript(SEED_SQL.read_text())
+    statements = StatementCounter()
+    print(f"LLM latency {args.latency}s")
+    print(f"{'items':>5} {'mode':<11} {'wall':>9} {'LLM calls':>10} {'SQL':>6}")
+    for size in args.sizes:
+        asyncio.run(_bench(size, args.latency, statements))
+
+
+if __name__ == "__main__":
+    main()
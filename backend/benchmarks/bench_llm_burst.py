@@ -0,0 +1,193 @@
+# backend/benchmarks/bench_llm_burst.py
+"""
+A burst of agent requests against a rate-limited model, with and without the
+LLM scheduler.
+
+Fires N concurrent /lessons/next requests (identical prompts, empty cache)
+together with M concurrent /exercises/submit gradings of free-text answers.
+The stubbed model has a fixed latency and, like the real API, answers 429
+when more than --provider-limit calls are in flight. "direct" invokes the
+chains straight away, as the agents did before the scheduler; "scheduled"
+goes through llm_scheduler. Reports upstream calls, failed requests and
+latency.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_llm_burst --lessons 50 --submissions 50
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_llm_burst_")
+_DB_PATH = os.path.join(_DB_DIR.name, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ["CONTENT_POOL_ENABLED"] = "false"
+os.environ["GLOSS_FILL_ENABLED"] = "false"
+os.environ["EXERCISE_ARCHIVE_ENABLED"] = "false"
+# Each request keeps its session's connection while it waits on the model.
+os.environ["DB_MAX_OVERFLOW"] = "500"
+
+import httpx  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+
+from .. import crud, models, schemas  # noqa: E402
+from ..agents import llm_cache, llm_registry, llm_scheduler  # noqa: E402
+from ..database import SessionLocal, init_db  # noqa: E402
+from ..main import app  # noqa: E402
+
+SEED_SQL = Path(__file__).resolve().parents[2] / "resources/db/insert_initial_data.sql"
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+class LimitedLLM:
+    """Stands in for ChatGoogleGenerativeAI; 429s above `limit` in flight."""
+
+    def __init__(self, latency: float, limit: int):
+        self.latency = latency
+        self.limit = limit
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _output(schema):
+        if schema is schemas.LessonContent:
+            return schemas.LessonContent(
+                lesson_id=0,
+                grammar_pattern="-지만 (but)",
+                explanation_text="Stub explanation.",
+                example_sentences=["예문 하나."],
+                new_vocabulary=[],
+            )
+        return schemas.EvaluationResult(
+            grade=70,
+            feedback_text="Stub feedback.",
+            mastery_updates=[
+                schemas.MasteryUpdate(
+                    concept="-지만 (but)", new_score=0.5, flags_added=[]
+                )
+            ],
+        )
+
+    def with_structured_output(self, schema):
+        async def acall(prompt_value):
+            self.calls += 1
+            self.in_flight += 1
+            try:
+                if self.in_flight > self.limit:
+                    self.rejected += 1
+                    await asyncio.sleep(self.latency / 10)
+                    raise RateLimited("429 Resource has been exhausted")
+                await asyncio.sleep(self.latency)
+                return self._output(schema)
+            finally:
+                self.in_flight -= 1
+
+        return RunnableLambda(lambda _: None, afunc=acall)
+
+
+class _Direct:
+    """The call path without a scheduler: invoke straight away, no retries."""
+
+    async def run(self, call, priority=None, key=None, deadline=None):
+        return await call()
+
+    def is_inflight(self, key):
+        return False
+
+
+def _create_submissions(count: int) -> list[dict]:
+    db = SessionLocal()
+    try:
+        details = [
+            schemas.ExerciseDetails(
+                exercise_id=0,
+                type="Writing",
+                sub_type="Sentence Building",
+                question_text=f"Join two clauses with -지만 ({i}).",
+                expected_format="one sentence",
+            )
+            for i in range(count)
+        ]
+        ids = crud.create_exercises(db, 1, details)
+        db.query(models.LLMCacheEntry).delete()
+        db.commit()
+    finally:
+        db.close()
+    return [{"exercise_id": i, "user_response": "비싸지만 좋아요."} for i in ids]
+
+
+async def _bench(mode: str, args):
+    fake = LimitedLLM(args.latency, args.provider_limit)
+    llm_registry.install(fake)
+    llm_cache.scheduler = (
+        _Direct() if mode == "direct" else llm_scheduler.LLMScheduler()
+    )
+    submissions = _create_submissions(args.submissions)
+
+    async def one(client, method, url, body):
+        started = time.perf_counter()
+        response = await client.request(method, url, json=body)
+        return response.status_code, time.perf_counter() - started
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(one(client, "GET", "/lessons/next", None) for _ in range(args.lessons)),
+            *(one(client, "POST", "/exercises/submit", body) for body in submissions),
+        )
+        elapsed = time.perf_counter() - started
+
+    failed = sum(status != 200 for status, _ in results)
+    latencies = sorted(latency for _, latency in results)
+    p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+    print(
+        f"{mode:<10} {elapsed:>7.2f}s {fake.calls:>9} {fake.rejected:>9}"
+        f" {failed:>7} {p95:>8.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lessons", type=int, default=50)
+    parser.add_argument("--submissions", type=int, default=50)
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="Simulated LLM latency (s)."
+    )
+    parser.add_argument(
+        "--provider-limit",
+        type=int,
+        default=8,
+        help="Concurrent calls the stub accepts before answering 429.",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    with sqlite3.connect(_DB_PATH) as conn:
+        conn.executescript(SEED_SQL.read_text())
+    print(
+        f"{args.lessons} lessons + {args.submissions} gradings at once, "
+        f"LLM latency {args.latency}s, provider limit {args.provider_limit}; "
+        f"scheduler: {llm_scheduler.LLM_MAX_CONCURRENCY} concurrent, "
+        f"{llm_scheduler.LLM_RATE_PER_SECOND}/s (burst {llm_scheduler.LLM_RATE_BURST})"
+    )
+    print(
+        f"{'mode':<10} {'wall':>8} {'upstream':>9} {'429s':>9} {'failed':>7} {'p95':>9}"
+    )
+    for mode in ("direct", "scheduled"):
+        asyncio.run(_bench(mode, args))
+
+
+if __name__ == "__main__":
+    main()
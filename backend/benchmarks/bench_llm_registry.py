@@ -0,0 +1,104 @@
+# backend/benchmarks/bench_llm_registry.py
+"""
+Start-up and per-request cost of LLM client and chain setup.
+
+Measures, each in a fresh interpreter, how long `import backend.main` takes and
+how long the first llm_registry.get_llm call takes (the provider SDK import and
+client construction it defers). Then compares building a structured chain the
+way each request used to (template parse + with_structured_output + pipe)
+against fetching the compiled chain from the registry.
+
+Needs no network access: the client is constructed with a dummy API key and
+never called.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_llm_registry --runs 5 --requests 2000
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_llm_registry_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'bench.db')}"
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+
+_IMPORT_APP = """
+import time
+started = time.perf_counter()
+import backend.main
+print((time.perf_counter() - started) * 1000)
+"""
+
+_FIRST_CLIENT = """
+import time
+import backend.main
+from backend.agents import llm_registry
+started = time.perf_counter()
+llm_registry.get_llm("practice")
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def _subprocess_ms(code: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=os.environ,
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def _per_request_us(requests: int):
+    from langchain_core.prompts import ChatPromptTemplate
+
+    from .. import schemas
+    from ..agents import llm_registry, practice_agent
+
+    template = practice_agent.EXERCISE_PROMPT.messages[0].prompt.template
+    llm = llm_registry.get_llm("practice")
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        prompt = ChatPromptTemplate.from_template(template)
+        prompt | llm.with_structured_output(schemas.ExerciseDetails)
+    rebuilt = (time.perf_counter() - started) / requests * 1e6
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        llm_registry.structured_chain(
+            "practice",
+            "exercise",
+            practice_agent.EXERCISE_PROMPT,
+            schemas.ExerciseDetails,
+        )
+    cached = (time.perf_counter() - started) / requests * 1e6
+    return rebuilt, cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"import backend.main      {_subprocess_ms(_IMPORT_APP, args.runs):>9.0f} ms")
+    print(
+        f"first get_llm (lazy)     {_subprocess_ms(_FIRST_CLIENT, args.runs):>9.0f} ms"
+    )
+    rebuilt, cached = _per_request_us(args.requests)
+    print(f"chain per request, built {rebuilt:>9.1f} us")
+    print(f"chain per request, cached{cached:>9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# backend/benchmarks/bench_multi_user.py
+"""
+Per-learner query latency as the number of learners on one database grows.
+
+Seeds a throwaway SQLite database with U learners, each owning the same
+sized deck of vocabulary and grammar rows plus some graded exercises, then
+times the user-scoped crud and scheduler calls for randomly chosen learners.
+With the user_id-led composite indexes each call only touches one learner's
+rows, so the timings should stay flat as U grows.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_multi_user --users 10 100 1000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_multi_user_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'bench.db')}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from .. import crud, models, review_scheduler  # noqa: E402
+from ..database import Base, SessionLocal, engine  # noqa: E402
+
+
+def _seed(db, users: int, vocab: int, grammar: int, exercises: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    def reviewed():
+        return now - timedelta(minutes=rng.randint(0, 10**5))
+
+    db.execute(
+        insert(models.UserStatus),
+        [
+            {
+                "user_id": u,
+                "current_level": "Beginner",
+                "known_vocab_count": 0,
+                "grammar_mastered_count": 0,
+                "most_recent_weak_area": "N/A",
+            }
+            for u in range(1, users + 1)
+        ],
+    )
+    for u in range(1, users + 1):
+        db.execute(
+            insert(models.VocabularyMastery),
+            [
+                {
+                    "user_id": u,
+                    "word_korean": f"단어{i}",
+                    "mastery_score": rng.random(),
+                    "last_reviewed": reviewed(),
+                    "times_correct": 0,
+                    "times_incorrect": 0,
+                }
+                for i in range(vocab)
+            ],
+        )
+        db.execute(
+            insert(models.GrammarMastery),
+            [
+                {
+                    "user_id": u,
+                    "pattern": f"pattern {i}",
+                    "mastery_score": rng.random(),
+                    "last_reviewed": reviewed(),
+                    "weakness_flags": [],
+                    "times_incorrect": 0,
+                }
+                for i in range(grammar)
+            ],
+        )
+        db.execute(
+            insert(models.Exercises),
+            [
+                {
+                    "user_id": u,
+                    "type": "Flashcards",
+                    "question_data": {},
+                    "user_response": "답",
+                    "grade": rng.randint(0, 100),
+                    "feedback": "",
+                    "submitted_at": reviewed(),
+                }
+                for _ in range(exercises)
+            ],
+        )
+    db.commit()
+    db.connection().exec_driver_sql("ANALYZE")
+
+
+def _time(fn, users: int, repeat: int, rng) -> float:
+    picks = [rng.randint(1, users) for _ in range(repeat)]
+    started = time.perf_counter()
+    for user_id in picks:
+        fn(user_id)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--vocab", type=int, default=500)
+    parser.add_argument("--grammar", type=int, default=50)
+    parser.add_argument("--exercises", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    print(f"{'learners':>9} {'total rows':>11} {'query':<24} {'ms/call':>9}")
+    for users in args.users:
+        db = SessionLocal()
+        _seed(db, users, args.vocab, args.grammar, args.exercises)
+        total = users * (args.vocab + args.grammar + args.exercises)
+        # Start cold so scheduler snapshot loads are part of the timing.
+        review_scheduler.vocab_scheduler._snapshots.clear()
+        review_scheduler.grammar_scheduler._snapshots.clear()
+        cases = [
+            ("dashboard status", lambda u: crud.get_dashboard_status(db, u)),
+            (
+                "target grammar",
+                lambda u: review_scheduler.get_target_grammar(db, u),
+            ),
+            ("new vocab sample", lambda u: crud.get_new_vocabulary(db, u, 5)),
+            ("review history page", lambda u: crud.get_review_history(db, u)),
+            ("vocab mastery page", lambda u: crud.get_all_vocabulary_mastery(db, u)),
+            (
+                "due vocab (scheduler)",
+                lambda u: review_scheduler.get_due_vocabulary(db, u),
+            ),
+        ]
+        for name, fn in cases:
+            ms = _time(fn, users, args.repeat, rng)
+            print(f"{users:>9} {total:>11} {name:<24} {ms:>9.3f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# backend/benchmarks/bench_progress.py
+"""
+Cost of a progress time-series from the daily rollups versus the attempt log.
+
+Seeds a throwaway SQLite database with a year of attempts for a few learners
+across a set of concepts (some submissions moving two concepts, some none), then rebuilds daily_progress from them with
+crud.rebuild_daily_progress. For one learner it times the year's series for a
+single concept and for all concepts, read through crud.get_progress and
+computed with a GROUP BY over the attempts, and reports the rows each has to
+read. The two must agree.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_progress --attempts 500000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_progress_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'bench.db')}"
+
+from sqlalchemy import and_, func, insert, select  # noqa: E402
+
+from .. import crud, models  # noqa: E402
+from ..database import Base, SessionLocal, engine  # noqa: E402
+
+LEARNERS = 5
+CONCEPTS = [f"-pattern {i}" for i in range(40)]
+REPEATS = 50
+
+
+def _seed(db, rng, count: int, start: datetime):
+    # `count` submissions: one in ten moves two concepts, one in fifty none.
+    scores = {}
+    for batch in range(0, count, 20_000):
+        rows = []
+        for i in range(batch, min(batch + 20_000, count)):
+            user_id = i % LEARNERS + 1
+            grade = rng.randint(30, 100)
+            submission = {
+                "user_id": user_id,
+                "exercise_id": i + 1,
+                "grade": grade,
+                "attempted_at": start + timedelta(days=365) * i / count,
+            }
+            if i % 50 == 0:
+                rows.append({**submission, "concept": None, "kind": None})
+                continue
+            for concept in rng.sample(CONCEPTS, 2 if i % 10 == 0 else 1):
+                before = scores.get((user_id, concept), 0.0)
+                after = min(1.0, max(0.0, before + (grade - 65) / 1000))
+                scores[(user_id, concept)] = after
+                rows.append(
+                    {
+                        **submission,
+                        "concept": concept,
+                        "kind": "grammar",
+                        "score_before": before,
+                        "score_after": after,
+                    }
+                )
+        db.execute(insert(models.Attempts), rows)
+    db.commit()
+
+
+def _from_attempts(db, user_id: int, since: date, concept: str | None):
+    # The same series as crud.get_progress, computed from the raw log.
+    Attempts = models.Attempts
+    day = func.date(Attempts.attempted_at)
+    in_range = and_(
+        Attempts.user_id == user_id,
+        Attempts.attempted_at >= datetime.combine(since, datetime.min.time()),
+    )
+    deltas = (
+        select(
+            day.label("day"),
+            func.count().label("attempts"),
+            func.sum(Attempts.grade).label("grade_sum"),
+            func.sum(Attempts.score_after - Attempts.score_before).label("delta"),
+        )
+        .where(in_range, Attempts.concept.isnot(None))
+        .group_by(day)
+        .order_by(day)
+    )
+    if concept is not None:
+        deltas = deltas.where(Attempts.concept == concept)
+        rows = [
+            (row.day, row.attempts, row.grade_sum, row.delta)
+            for row in db.execute(deltas)
+        ]
+    else:
+        # Attempts are submissions, each once whatever concepts it moved.
+        submissions = (
+            select(day.label("day"), func.min(Attempts.grade).label("grade"))
+            .where(in_range)
+            .group_by(Attempts.exercise_id, Attempts.attempted_at)
+            .subquery()
+        )
+        totals = db.execute(
+            select(
+                submissions.c.day,
+                func.count().label("attempts"),
+                func.sum(submissions.c.grade).label("grade_sum"),
+            )
+            .group_by(submissions.c.day)
+            .order_by(submissions.c.day)
+        )
+        delta = {row.day: row.delta for row in db.execute(deltas)}
+        rows = [
+            (row.day, row.attempts, row.grade_sum, delta.get(row.day, 0.0))
+            for row in totals
+        ]
+    return [
+        (
+            date.fromisoformat(day),
+            attempts,
+            round(grade_sum / attempts, 2),
+            round(delta, 4),
+        )
+        for day, attempts, grade_sum, delta in rows
+    ]
+
+
+def _time(call) -> tuple[float, list]:
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        result = call()
+    return (time.perf_counter() - started) / REPEATS * 1000, result
+
+
+def _rows_read(db, model, user_id: int, concept: str | None) -> int:
+    query = select(func.count()).select_from(model).where(model.user_id == user_id)
+    if concept is not None:
+        query = query.where(model.concept == concept)
+    return db.execute(query).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--attempts", type=int, default=500_000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    db.execute(
+        insert(models.UserStatus),
+        [{"user_id": u, "current_level": "Beginner"} for u in range(1, LEARNERS + 1)],
+    )
+    _seed(db, rng, args.attempts, now - timedelta(days=365))
+
+    started = time.perf_counter()
+    rolled_up = crud.rebuild_daily_progress(db)
+    print(
+        f"rolled up {rolled_up} attempts into"
+        f" {db.query(models.DailyProgress).count()} rows"
+        f" in {time.perf_counter() - started:.2f}s"
+    )
+
+    since = now.date() - timedelta(days=365)
+    print(f"{'series':<14} {'source':<10} {'rows read':>10} {'ms':>8}")
+    for label, concept in (("one concept", CONCEPTS[0]), ("all concepts", None)):
+        rollup_ms, points = _time(lambda: crud.get_progress(db, 1, since, concept))
+        attempts_ms, expected = _time(lambda: _from_attempts(db, 1, since, concept))
+        assert [
+            (point.day, point.attempts, point.mean_grade, point.score_delta)
+            for point in points
+        ] == expected, label
+        for source, model, ms in (
+            ("rollups", models.DailyProgress, rollup_ms),
+            ("attempts", models.Attempts, attempts_ms),
+        ):
+            print(
+                f"{label:<14} {source:<10}"
+                f" {_rows_read(db, model, 1, concept):>10} {ms:>8.3f}"
+            )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# backend/benchmarks/bench_prompt_sizes.py
+"""
+Estimated prompt tokens per agent prompt as a pattern's weakness flags grow.
+
+For each flag count, formats every agent prompt twice with the same inputs:
+once with the raw stored flags and vocabulary list (as the agents did), once
+through prompt_budget's sections, and prints both sizes. The synthetic flags
+repeat some errors in a different case or spacing, as the model tends to.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_prompt_sizes --flags 0 10 100 1000
+"""
+
+import argparse
+
+from ..agents import prompt_budget
+from ..agents.evaluation_agent import BATCH_EVALUATION_PROMPT, EVALUATION_PROMPT
+from ..agents.lesson_agent import LESSON_PROMPT, STREAM_LESSON_PROMPT
+from ..agents.practice_agent import EXERCISE_PROMPT, EXERCISE_SET_PROMPT
+
+ERRORS = [
+    "confuses 은/는 with 이/가",
+    "drops the object particle 을/를",
+    "wrong honorific ending with -시-",
+    "uses 았/었 after a vowel-final stem without contraction",
+    "mixes formal -습니다 and polite -어요 endings",
+    "places the verb before the object",
+]
+
+
+def _flags(count: int) -> list[str]:
+    flags = []
+    for i in range(count):
+        error = ERRORS[i % len(ERRORS)]
+        if i % 3 == 1:
+            flags.append(error.upper())
+        elif i % 3 == 2:
+            flags.append(f"{error} (sentence {i})")
+        else:
+            flags.append(f"  {error}  ")
+    return flags
+
+
+def _prompts(flags, vocab: list[str]) -> dict:
+    items = "\n".join(
+        f'Item {n}:\n- Exercise Question: "Translate: I eat rice."\n'
+        f'- `user_response`: "나는 밥을 먹어요."'
+        for n in range(1, 11)
+    )
+    return {
+        "lesson": (
+            LESSON_PROMPT,
+            {
+                "grammar_pattern": "-아/어요 (polite present)",
+                "mastery_score": 0.31,
+                "weakness_flags": flags,
+                "new_vocab_list": vocab[:5],
+            },
+        ),
+        "lesson stream": (
+            STREAM_LESSON_PROMPT,
+            {
+                "grammar_pattern": "-아/어요 (polite present)",
+                "mastery_score": 0.31,
+                "weakness_flags": flags,
+                "new_vocab_list": vocab[:5],
+            },
+        ),
+        "exercise": (
+            EXERCISE_PROMPT,
+            {
+                "type": "Writing",
+                "sub_type": "Targeted Essay",
+                "grammar_pattern": "-아/어요 (polite present)",
+                "grammar_mastery": 0.31,
+                "grammar_flags": flags,
+                "vocab_list": vocab[:5],
+            },
+        ),
+        "exercise set": (
+            EXERCISE_SET_PROMPT,
+            {
+                "slots": "\n".join(
+                    f"Exercise {n}: type `Flashcards`, sub_type `Translation Recall`"
+                    for n in range(1, 51)
+                ),
+                "count": 50,
+                "grammar_pattern": "-아/어요 (polite present)",
+                "grammar_mastery": 0.31,
+                "grammar_flags": flags,
+                "vocab_list": vocab,
+            },
+        ),
+        "evaluation": (
+            EVALUATION_PROMPT,
+            {
+                "question_text": "Translate: I eat rice.",
+                "target_concept": "-아/어요 (polite present)",
+                "current_mastery_score": 0.31,
+                "current_weakness_flags": flags,
+                "user_response": "나는 밥을 먹어요.",
+            },
+        ),
+        "evaluation batch": (
+            BATCH_EVALUATION_PROMPT,
+            {
+                "target_concept": "-아/어요 (polite present)",
+                "current_mastery_score": 0.31,
+                "current_weakness_flags": flags,
+                "items": items,
+            },
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flags", type=int, nargs="+", default=[0, 10, 100, 1000])
+    args = parser.parse_args()
+
+    vocab = [f"단어{i} (word {i})" for i in range(50)]
+    print(f"{'flags':>6} {'prompt':<17} {'raw':>7} {'budgeted':>9} {'saved':>6}")
+    for count in args.flags:
+        flags = _flags(count)
+        raw = _prompts(flags or "None", vocab)
+        budgeted = _prompts(
+            prompt_budget.flags_section(flags), prompt_budget.vocab_section(vocab)
+        )
+        for name, (prompt, inputs) in raw.items():
+            before = prompt_budget.count_tokens(prompt.format(**inputs))
+            after_prompt, after_inputs = budgeted[name]
+            after = prompt_budget.count_tokens(after_prompt.format(**after_inputs))
+            print(
+                f"{count:>6} {name:<17} {before:>7} {after:>9}"
+                f" {1 - after / before:>6.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
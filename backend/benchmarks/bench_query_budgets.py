@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_query_budgets.py
+"""
+Checks every API endpoint against a SQL statement budget.
+
+Seeds a database as bench_endpoints does (--scale), then sends each endpoint
+--requests requests for random learners, each under
+sql_profiler.query_budget(). A request fails its budget if it runs more
+statements than QUERY_BUDGETS allows, or repeats any query shape
+SQL_PROFILE_REPEAT_THRESHOLD times (a per-item lookup). The first request of
+a learner also pays for first-use work (user_status row, scheduler
+snapshots, storing glosses for words the gloss filler hasn't reached), so
+budgets are for the worst case, not the steady state.
+
+Prints the worst request per endpoint, the report of every request over
+budget, and exits non-zero if any was.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_query_budgets --scale small --requests 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_query_budgets_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'bench.db')}"
+os.environ["CONTENT_POOL_ENABLED"] = "false"
+os.environ["GLOSS_FILL_ENABLED"] = "false"
+os.environ["EXERCISE_ARCHIVE_ENABLED"] = "false"
+os.environ["LLM_PROVIDER"] = "fake"
+
+import httpx  # noqa: E402
+
+from .. import sql_profiler  # noqa: E402
+from ..agents import llm_registry  # noqa: E402
+from ..agents.fake_llm import FakeChatModel  # noqa: E402
+from ..database import engine  # noqa: E402
+from ..main import app  # noqa: E402
+from .bench_endpoints import SCALES, _endpoints, _open_exercises, _seed  # noqa: E402
+
+# Most statements one request to each endpoint may run, counting first-use
+# work and the LLM cache's periodic eviction (two statements).
+QUERY_BUDGETS = {
+    "root": 0,
+    "dashboard_status": 2,
+    "lesson_next": 13,
+    "lesson_stream": 9,
+    "exercise_generate": 12,
+    "exercise_generate_set": 11,
+    "exercise_submit": 11,
+    "exercise_submit_batch": 13,
+    "review_history": 2,
+    "mastery_grammar": 2,
+    "mastery_vocab": 2,
+    "progress": 2,
+    "llm_cache_stats": 1,
+    "llm_scheduler_stats": 0,
+    "metrics": 0,
+}
+
+
+async def _check(args) -> bool:
+    learners = SCALES[args.scale][0]
+    open_exercises = _open_exercises(engine)
+    rng = random.Random(args.seed)
+    ok = True
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        for name, method, url, body in _endpoints(open_exercises):
+            if args.endpoints and name not in args.endpoints:
+                continue
+            budget = QUERY_BUDGETS[name]
+            worst = None
+            failures = []
+            for _ in range(args.requests):
+                user_id = rng.randint(1, learners)
+                try:
+                    with sql_profiler.query_budget(
+                        budget, max_repeats=0, label=f"{name} (user {user_id})"
+                    ) as query_profile:
+                        await client.request(
+                            method,
+                            url,
+                            json=body(user_id, rng) if body else None,
+                            headers={"X-User-Id": str(user_id)},
+                        )
+                except sql_profiler.QueryBudgetExceeded as e:
+                    failures.append(str(e))
+                if worst is None or query_profile.statements > worst.statements:
+                    worst = query_profile
+
+            status = "ok" if not failures else f"{len(failures)} over"
+            print(
+                f"{name:<22} {worst.statements:>5} {budget:>7}"
+                f" {len(worst.repeated()):>9}  {status}",
+                flush=True,
+            )
+            if args.verbose:
+                print(worst.report())
+            for failure in failures[:3]:
+                print(failure)
+            ok = ok and not failures
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--requests", type=int, default=20, help="per endpoint")
+    parser.add_argument("--endpoints", nargs="+", help="Only these endpoint names.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--verbose", action="store_true", help="Print each endpoint's worst profile."
+    )
+    args = parser.parse_args()
+
+    _seed(engine, args.scale)
+    llm_registry.install(FakeChatModel())
+    print(f"{'endpoint':<22} {'worst':>5} {'budget':>7} {'repeated':>9}")
+    if not asyncio.run(_check(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
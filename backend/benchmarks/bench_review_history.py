@@ -0,0 +1,116 @@
+# backend/benchmarks/bench_review_history.py
+"""
+Review-history page cost at increasing page depth.
+
+Seeds one learner with N graded attempts (alongside other learners' rows) in a
+throwaway SQLite database, then times fetching a page near the start, middle
+and end of their history with the old OFFSET query and with the keyset cursor
+used by crud.get_review_history.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_review_history --attempts 10000 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_review_history_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'bench.db')}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from .. import crud, models  # noqa: E402
+from ..database import Base, SessionLocal, engine  # noqa: E402
+
+LEARNERS = 5
+PAGE_SIZE = 10
+
+
+def _seed(db, attempts: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    start = datetime.utcnow() - timedelta(days=365)
+    db.execute(
+        insert(models.UserStatus),
+        [{"user_id": u, "current_level": "Beginner"} for u in range(1, LEARNERS + 1)],
+    )
+    for batch in range(0, attempts * LEARNERS, 50_000):
+        db.execute(
+            insert(models.Exercises),
+            [
+                {
+                    "user_id": i % LEARNERS + 1,
+                    "type": "Flashcards",
+                    "question_data": {},
+                    "user_response": "답",
+                    # Every tenth exercise was generated but never answered.
+                    "grade": None if i // LEARNERS % 10 == 0 else rng.randint(0, 100),
+                    "feedback": "",
+                    "submitted_at": None
+                    if i // LEARNERS % 10 == 0
+                    else start + timedelta(seconds=i * 10),
+                }
+                for i in range(batch, min(batch + 50_000, attempts * LEARNERS))
+            ],
+        )
+    db.commit()
+    db.connection().exec_driver_sql("ANALYZE")
+
+
+def _offset_page(db, skip: int):
+    Exercises = models.Exercises
+    return (
+        db.query(Exercises)
+        .filter(Exercises.user_id == 1, Exercises.grade.isnot(None))
+        .order_by(Exercises.submitted_at.desc(), Exercises.exercise_id.desc())
+        .offset(skip)
+        .limit(PAGE_SIZE)
+        .all()
+    )
+
+
+def _cursor_at(db, skip: int) -> str | None:
+    # The cursor a client would hold after paging down to `skip`.
+    if not skip:
+        return None
+    row = _offset_page(db, skip - 1)[0]
+    return crud._encode_cursor([row.submitted_at, row.exercise_id])
+
+
+def _time(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--attempts", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'attempts':>9} {'page at':>8} {'OFFSET':>10} {'keyset':>10}")
+    for attempts in args.attempts:
+        db = SessionLocal()
+        _seed(db, attempts)
+        graded = attempts * 9 // 10
+        for depth in (0.0, 0.5, 0.99):
+            skip = int(graded * depth) // PAGE_SIZE * PAGE_SIZE
+            cursor = _cursor_at(db, skip)
+            offset_ms = _time(lambda: _offset_page(db, skip), args.repeat)
+            keyset_ms = _time(
+                lambda: crud.get_review_history(db, 1, cursor, PAGE_SIZE),
+                args.repeat,
+            )
+            print(f"{attempts:>9} {skip:>8} {offset_ms:>7.2f} ms {keyset_ms:>7.2f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# backend/benchmarks/bench_review_scheduler.py
+"""
+Due-queue recomputation cost for the spaced-repetition scheduler.
+
+Times a full recall recomputation plus top-k selection over an in-memory
+snapshot with NumPy, against the same computation as a per-row Python loop,
+and the one-off snapshot load from a seeded SQLite table.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_review_scheduler --sizes 10000 100000 1000000
+"""
+
+import argparse
+import heapq
+import math
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_review_scheduler_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'bench.db')}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from .. import models, review_scheduler  # noqa: E402
+from ..database import Base, SessionLocal, engine  # noqa: E402
+
+
+def _python_loop(scores, reviewed_at, now, count):
+    ratio = review_scheduler.MAX_STABILITY_DAYS / review_scheduler.MIN_STABILITY_DAYS
+    urgencies = []
+    for i, (score, reviewed) in enumerate(zip(scores, reviewed_at)):
+        stability = review_scheduler.MIN_STABILITY_DAYS * ratio ** min(
+            max(score, 0.0), 1.0
+        )
+        recall = math.exp(-max(now - reviewed, 0.0) / 86400.0 / stability)
+        urgency = review_scheduler.TARGET_RECALL - recall
+        if urgency > 0:
+            urgencies.append((urgency, i))
+    return heapq.nlargest(count, urgencies)
+
+
+def _seed(db, size, rng):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    for start in range(0, size, 50_000):
+        db.execute(
+            insert(models.VocabularyMastery),
+            [
+                {
+                    "user_id": 1,
+                    "word_korean": f"단어{i}",
+                    "mastery_score": float(rng.random()),
+                    "last_reviewed": now - timedelta(minutes=int(rng.integers(10**5))),
+                    "times_correct": 0,
+                    "times_incorrect": 0,
+                }
+                for i in range(start, min(start + 50_000, size))
+            ],
+        )
+    db.commit()
+
+
+def _time(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    print(f"{'items':>9} {'snapshot load':>14} {'numpy queue':>12} {'python loop':>12}")
+    for size in args.sizes:
+        db = SessionLocal()
+        _seed(db, size, rng)
+        scheduler = review_scheduler.ReviewScheduler(
+            models.VocabularyMastery, models.VocabularyMastery.word_korean
+        )
+        load_ms = _time(lambda: scheduler.refresh(db, 1), 1)
+        snapshot = scheduler._snapshots[1]
+        now = datetime.utcnow().timestamp()
+
+        numpy_ms = _time(lambda: scheduler.due_queue(db, 1, 20), args.repeat)
+        scores = snapshot.scores.tolist()
+        reviewed_at = snapshot.reviewed_at.tolist()
+        loop_ms = _time(lambda: _python_loop(scores, reviewed_at, now, 20), 1)
+        print(f"{size:>9} {load_ms:>11.1f} ms {numpy_ms:>9.2f} ms {loop_ms:>9.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
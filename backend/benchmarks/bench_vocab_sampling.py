@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_vocab_sampling.py
+"""
+Vocabulary and grammar selection queries at increasing deck sizes.
+
+Compares the old ORDER BY random() band sampling of new words with the
+index-backed sampler in crud, and times the review scheduler's target grammar
+pattern (snapshot load included), on a throwaway SQLite database seeded with
+N vocabulary rows and N/100 grammar rows.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_vocab_sampling --sizes 1000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench_vocab_sampling_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR.name, 'bench.db')}"
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from .. import crud, models, review_scheduler  # noqa: E402
+from ..database import Base, SessionLocal, engine  # noqa: E402
+
+
+def _seed(db, size: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    def score():
+        # A quarter of a real deck has never been studied and sits at 0.0.
+        return 0.0 if rng.random() < 0.25 else rng.random()
+
+    for start in range(0, size, 50_000):
+        db.execute(
+            insert(models.VocabularyMastery),
+            [
+                {
+                    "user_id": 1,
+                    "word_korean": f"단어{i}",
+                    "mastery_score": score(),
+                    "last_reviewed": now - timedelta(minutes=rng.randint(0, 10**6)),
+                    "times_correct": 0,
+                    "times_incorrect": 0,
+                }
+                for i in range(start, min(start + 50_000, size))
+            ],
+        )
+    db.execute(
+        insert(models.GrammarMastery),
+        [
+            {
+                "user_id": 1,
+                "pattern": f"pattern {i}",
+                "mastery_score": score(),
+                "last_reviewed": now - timedelta(minutes=rng.randint(0, 10**6)),
+                "weakness_flags": [],
+                "times_incorrect": 0,
+            }
+            for i in range(max(size // 100, 1))
+        ],
+    )
+    db.commit()
+    db.connection().exec_driver_sql("ANALYZE")
+
+
+def _order_by_random(db, count, low, high):
+    Vocab = models.VocabularyMastery
+    return (
+        db.query(Vocab)
+        .filter(Vocab.user_id == 1, Vocab.mastery_score.between(low, high))
+        .order_by(func.random())
+        .limit(count)
+        .all()
+    )
+
+
+def _target_grammar(db):
+    review_scheduler.grammar_scheduler.invalidate(1)
+    return review_scheduler.get_target_grammar(db, 1)
+
+
+def _time(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'query':<28} {'ms/call':>10}")
+    for size in args.sizes:
+        db = SessionLocal()
+        _seed(db, size)
+        cases = [
+            ("new ORDER BY random()", lambda: _order_by_random(db, 5, 0.0, 0.2)),
+            ("new index sample", lambda: crud.get_new_vocabulary(db, 1, 5)),
+            ("target grammar", lambda: _target_grammar(db)),
+        ]
+        for name, fn in cases:
+            print(f"{size:>9} {name:<28} {_time(fn, args.repeat):>10.3f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
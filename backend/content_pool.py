@@ -0,0 +1,220 @@
+# backend/content_pool.py
+import asyncio
+import os
+import time
+
+from . import crud, review_scheduler, schemas
+from .agents.lesson_agent import LessonAgent
+from .agents.llm_scheduler import PRIORITY_PREFETCH
+from .agents.practice_agent import DEFAULT_SUB_TYPES, PracticeAgent
+from .database import db_session, run_sync
+
+POOL_ENABLED = os.getenv("CONTENT_POOL_ENABLED", "true").lower() == "true"
+# Refill a bucket once it holds fewer than this many items...
+POOL_LOW_WATERMARK = int(os.getenv("CONTENT_POOL_LOW_WATERMARK", "2"))
+# ...back up to this many.
+POOL_TARGET_SIZE = int(os.getenv("CONTENT_POOL_TARGET_SIZE", "5"))
+# Seconds between refill passes when nothing has asked for one.
+POOL_REFILL_INTERVAL = float(os.getenv("CONTENT_POOL_REFILL_INTERVAL", "60"))
+# Only learners who asked for content within this many seconds are kept warm.
+POOL_ACTIVE_WINDOW = float(os.getenv("CONTENT_POOL_ACTIVE_WINDOW", "3600"))
+
+# (kind, type, sub_type) buckets kept warm for the current target grammar pattern.
+POOL_BUCKETS = [("lesson", None, None)] + [
+    ("exercise", exercise_type, sub_type)
+    for exercise_type, sub_type in DEFAULT_SUB_TYPES.items()
+]
+
+
+class ContentPool:
+    """
+    Serves lessons and exercises generated ahead of time by a background task,
+    so the request path only pays for a database read. Each learner has their
+    own pool, kept warm while they are active.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # user_id -> monotonic time of their last pool request
+        self._active_learners: dict[int, float] = {}
+
+    async def take_lesson(self, db, user_id: int) -> schemas.LessonContent | None:
+        """
+        Returns a pooled lesson for the learner's current target pattern, saved
+        with a fresh lesson_id, or None if the pool has nothing suitable.
+        """
+        if not POOL_ENABLED:
+            return None
+        weakest_grammar = await run_sync(
+            review_scheduler.get_target_grammar, db, user_id
+        )
+        if not weakest_grammar:
+            return None
+
+        payload = await run_sync(
+            crud.take_pool_item, db, user_id, "lesson", weakest_grammar.pattern
+        )
+        self.request_refill(user_id)
+        if not payload:
+            return None
+
+        lesson = schemas.LessonContent.model_validate(payload)
+        db_lesson = await run_sync(crud.create_lesson, db, user_id, lesson_data=lesson)
+        lesson.lesson_id = db_lesson.lesson_id
+        return lesson
+
+    async def take_exercise(
+        self, db, practice_agent: PracticeAgent, request: schemas.ExerciseRequest
+    ) -> schemas.ExerciseDetails | None:
+        """
+        Returns a pooled exercise matching what `practice_agent` would generate
+        for `request` for its learner, saved with a fresh exercise_id, or None
+        on a miss.
+        """
+        if not POOL_ENABLED:
+            return None
+        user_id = practice_agent.user_id
+        weakest_grammar = await run_sync(
+            review_scheduler.get_target_grammar, db, user_id
+        )
+        if not weakest_grammar:
+            return None
+
+        exercise_type, sub_type = await practice_agent.resolve_exercise_type(
+            request, weakest_grammar
+        )
+        if ("exercise", exercise_type, sub_type) not in POOL_BUCKETS:
+            return None
+
+        payload = await run_sync(
+            crud.take_pool_item,
+            db,
+            user_id,
+            "exercise",
+            weakest_grammar.pattern,
+            exercise_type,
+            sub_type,
+        )
+        self.request_refill(user_id)
+        if not payload:
+            return None
+
+        exercise = schemas.ExerciseDetails.model_validate(payload)
+        db_exercise = await run_sync(
+            crud.create_exercise, db, user_id, exercise_data=exercise
+        )
+        exercise.exercise_id = db_exercise.exercise_id
+        return exercise
+
+    def request_refill(self, user_id: int):
+        """
+        Marks the learner active and wakes the refill task, e.g. after an item
+        was taken or their mastery changed.
+        """
+        self._active_learners[user_id] = time.monotonic()
+        self._wakeup.set()
+
+    async def refill_once(self):
+        """
+        Refills the pool of every learner active within POOL_ACTIVE_WINDOW.
+        """
+        cutoff = time.monotonic() - POOL_ACTIVE_WINDOW
+        for user_id, last_seen in list(self._active_learners.items()):
+            if last_seen < cutoff:
+                del self._active_learners[user_id]
+            else:
+                await self.refill_learner(user_id)
+
+    async def refill_learner(self, user_id: int):
+        """
+        Drops the learner's entries for a stale target pattern and tops up every
+        bucket that fell below the low watermark.
+        """
+        async with db_session() as db:
+            # Pooled items should differ from one another, so skip the LLM cache.
+            lesson_agent = LessonAgent(
+                db, user_id, use_cache=False, priority=PRIORITY_PREFETCH
+            )
+            practice_agent = PracticeAgent(
+                db, user_id, use_cache=False, priority=PRIORITY_PREFETCH
+            )
+
+            weakest_grammar = await run_sync(
+                review_scheduler.get_target_grammar, db, user_id
+            )
+            if not weakest_grammar:
+                return
+            # The agents' and the pool's commits below would expire the row, and
+            # each later read of its fields would lazy-load it on the event loop.
+            db.expunge(weakest_grammar)
+            pattern = weakest_grammar.pattern
+            await run_sync(crud.invalidate_pool_items, db, user_id, pattern)
+
+            for kind, exercise_type, sub_type in POOL_BUCKETS:
+                count = await run_sync(
+                    crud.count_pool_items,
+                    db,
+                    user_id,
+                    kind,
+                    pattern,
+                    exercise_type,
+                    sub_type,
+                )
+                if count >= POOL_LOW_WATERMARK:
+                    continue
+
+                for _ in range(POOL_TARGET_SIZE - count):
+                    if kind == "lesson":
+                        item = await lesson_agent.compose_lesson(weakest_grammar)
+                    else:
+                        item = await practice_agent.compose_exercise(
+                            schemas.ExerciseRequest(
+                                type=exercise_type, sub_type=sub_type
+                            ),
+                            weakest_grammar,
+                        )
+                    if not item:
+                        break
+                    await run_sync(
+                        crud.add_pool_item,
+                        db,
+                        user_id,
+                        kind,
+                        pattern,
+                        item,
+                        exercise_type,
+                        sub_type,
+                    )
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill_once()
+            except ImportError as e:
+                print(f"Content pool disabled, agents are unavailable: {e}")
+                return
+            except Exception as e:
+                print(f"Error refilling content pool: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POOL_REFILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self):
+        if POOL_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+content_pool = ContentPool()
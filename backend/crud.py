@@ -1,20 +1,51 @@
 # backend/crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from . import models, schemas
-from datetime import datetime
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import (
+    and_,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel
+from . import models, review_scheduler, schemas
+from .agents.prompt_budget import normalize_flag
+from datetime import date, datetime, timedelta
+import base64
+import binascii
+import json
+import random
+import zlib
 
 
 # =================
 # User Status
 # =================
-def get_user_status(db: Session, user_id: int = 1):
+
+# Scores at or above which a word counts as known / a pattern as mastered.
+KNOWN_VOCAB_THRESHOLD = 0.8
+MASTERED_GRAMMAR_THRESHOLD = 0.8
+# Weight of the newest grade in the recent average grade (an EWMA).
+RECENT_GRADE_WEIGHT = 0.2
+
+
+def get_user_status(db: Session, user_id: int):
     return (
         db.query(models.UserStatus).filter(models.UserStatus.user_id == user_id).first()
     )
 
 
-def get_dashboard_status(db: Session, user_id: int = 1) -> schemas.UserStatusSummary:
+def ensure_user_status(db: Session, user_id: int) -> models.UserStatus:
+    """
+    Returns the learner's status row, creating a default one for a new learner.
+    """
     status = get_user_status(db, user_id)
     if not status:
         # Create a default status if it doesn't exist
@@ -24,167 +55,661 @@ def get_dashboard_status(db: Session, user_id: int = 1) -> schemas.UserStatusSum
             known_vocab_count=0,
             grammar_mastered_count=0,
             most_recent_weak_area="N/A",
+            recent_average_grade=None,
         )
         db.add(status)
         db.commit()
         db.refresh(status)
+    return status
+
+
+def get_dashboard_status(db: Session, user_id: int) -> schemas.UserStatusSummary:
+    """
+    Reads the learner's dashboard aggregates, which _apply_mastery_updates keeps
+    current, from their status row.
+    """
+    status = ensure_user_status(db, user_id)
 
     return schemas.UserStatusSummary(
         level=status.current_level,
-        known_vocab=status.known_vocab_count,
+        known_vocab=status.known_vocab_count or 0,
+        grammar_mastered=status.grammar_mastered_count or 0,
         weak_focus=status.most_recent_weak_area,
+        recent_average_grade=status.recent_average_grade,
     )
 
 
+def recount_dashboard_aggregates(db: Session, user_id: int | None = None) -> int:
+    """
+    Recomputes the dashboard aggregates that _apply_mastery_updates otherwise
+    moves by deltas: known words and mastered patterns are counted from the
+    mastery rows, and the weak area is the review queue's target pattern. For
+    one learner or everyone; returns the number of status rows updated.
+    """
+    Status = models.UserStatus
+    Grammar = models.GrammarMastery
+    Vocab = models.VocabularyMastery
+    query = select(Status.user_id)
+    if user_id is not None:
+        query = query.where(Status.user_id == user_id)
+    params = [
+        {
+            "b_user": learner,
+            "b_weak": review_scheduler.get_target_grammar_pattern(db, learner),
+        }
+        for learner in db.execute(query).scalars().all()
+    ]
+    if not params:
+        return 0
+    table = Status.__table__
+    return db.execute(
+        update(table)
+        .where(table.c.user_id == bindparam("b_user"))
+        .values(
+            known_vocab_count=select(func.count())
+            .where(
+                Vocab.user_id == table.c.user_id,
+                Vocab.mastery_score >= KNOWN_VOCAB_THRESHOLD,
+            )
+            .scalar_subquery(),
+            grammar_mastered_count=select(func.count())
+            .where(
+                Grammar.user_id == table.c.user_id,
+                Grammar.mastery_score >= MASTERED_GRAMMAR_THRESHOLD,
+            )
+            .scalar_subquery(),
+            most_recent_weak_area=func.coalesce(
+                bindparam("b_weak", type_=table.c.most_recent_weak_area.type),
+                table.c.most_recent_weak_area,
+            ),
+        ),
+        params,
+    ).rowcount
+
+
+def _update_dashboard_aggregates(
+    db: Session,
+    user_id: int,
+    known_vocab_delta: int = 0,
+    grammar_mastered_delta: int = 0,
+    weak_area: str | None = None,
+    grades: list[int] = (),
+):
+    # Runs inside the caller's transaction, right after the mastery rows moved.
+    Status = models.UserStatus
+    values = {}
+    if known_vocab_delta:
+        values["known_vocab_count"] = (
+            func.coalesce(Status.known_vocab_count, 0) + known_vocab_delta
+        )
+    if grammar_mastered_delta:
+        values["grammar_mastered_count"] = (
+            func.coalesce(Status.grammar_mastered_count, 0) + grammar_mastered_delta
+        )
+    if weak_area is not None:
+        values["most_recent_weak_area"] = weak_area
+    if grades:
+        # The EWMA after folding in each grade in order:
+        # avg * (1 - w)^k + sum(w * (1 - w)^(k - 1 - i) * grade_i)
+        decay = 1 - RECENT_GRADE_WEIGHT
+        folded = sum(
+            RECENT_GRADE_WEIGHT * decay ** (len(grades) - 1 - i) * grade
+            for i, grade in enumerate(grades)
+        )
+        previous = func.coalesce(Status.recent_average_grade, grades[0])
+        values["recent_average_grade"] = previous * decay ** len(grades) + folded
+    if values:
+        db.execute(update(Status).where(Status.user_id == user_id).values(**values))
+
+
 # =================
 # Agent-Specific Queries
 # =================
-def get_weakest_grammar_pattern(db: Session):
+def get_new_vocabulary(db: Session, user_id: int, count: int = 5):
     """
-    Finds the grammar pattern with the lowest mastery_score.
-    Ties are broken by the oldest last_reviewed date.
+    Selects new vocabulary items (mastery score < 0.2).
     """
-    return (
-        db.query(models.GrammarMastery)
-        .order_by(
-            models.GrammarMastery.mastery_score.asc(),
-            models.GrammarMastery.last_reviewed.asc(),
-        )
-        .first()
+    return _sample_vocabulary(
+        db, user_id, count, low=0.0, high=0.2, high_inclusive=False
     )
 
 
-def get_vocab_for_drilling(db: Session, count: int = 5):
+def _sample_vocabulary(
+    db: Session,
+    user_id: int,
+    count: int,
+    low: float,
+    high: float,
+    high_inclusive: bool,
+):
     """
-    Selects vocabulary items with a mastery score suitable for drilling (0.4 - 0.7).
+    Picks up to `count` random items with low <= mastery_score < high (or <= high).
+
+    Instead of sorting the whole band with ORDER BY random(), this picks a
+    random row of the band as a pivot, by seeking a random mastery_id within
+    the learner's id range on (user_id, mastery_id), then reads forward from
+    it on the (user_id, mastery_score, mastery_id) index, wrapping to the start
+    of the band if it runs off the end. Rows with tied scores (the usual case:
+    every unstudied word sits at 0.0) are as likely as any to come first. Each
+    read is an index range scan, so the cost is O(log n + count) plus the
+    distance to the next id in the band.
     """
-    return (
-        db.query(models.VocabularyMastery)
-        .filter(models.VocabularyMastery.mastery_score.between(0.4, 0.7))
-        .order_by(func.random())
-        .limit(count)
-        .all()
+    Vocab = models.VocabularyMastery
+    upper = (
+        Vocab.mastery_score <= high if high_inclusive else Vocab.mastery_score < high
+    )
+    in_band = and_(Vocab.user_id == user_id, Vocab.mastery_score >= low, upper)
+    learner_ids = select(Vocab.mastery_id).where(Vocab.user_id == user_id)
+    first_id = learner_ids.order_by(Vocab.mastery_id).limit(1).scalar_subquery()
+    last_id = learner_ids.order_by(Vocab.mastery_id.desc()).limit(1).scalar_subquery()
+    # `+ 0` keeps the band test off the score indexes, which the planner would
+    # otherwise scan and sort instead of walking the learner's ids.
+    seek_score = Vocab.mastery_score + 0
+    seek = (
+        select(Vocab.mastery_score, Vocab.mastery_id)
+        .where(
+            Vocab.user_id == user_id,
+            seek_score >= low,
+            seek_score <= high if high_inclusive else seek_score < high,
+        )
+        .order_by(Vocab.mastery_id)
+        .limit(1)
+    )
+    pivot = db.execute(
+        seek.where(
+            Vocab.mastery_id >= first_id + (last_id - first_id) * random.random()
+        )
+    ).first()
+    if pivot is None:
+        # Past the band's last id: wrap to its first.
+        pivot = db.execute(seek).first()
+        if pivot is None:
+            return []
+
+    # Forward from the pivot: the rest of its tie, then higher scores. Two
+    # seeks rather than one (score, id) >= pivot comparison, which SQLite only
+    # bounds by score and so scans the whole tie.
+    score, pivot_id = pivot
+    forward = union_all(
+        select(Vocab).where(
+            Vocab.user_id == user_id,
+            Vocab.mastery_score == score,
+            Vocab.mastery_id >= pivot_id,
+        ),
+        select(Vocab).where(
+            Vocab.user_id == user_id, Vocab.mastery_score > score, upper
+        ),
     )
+    items = list(
+        db.execute(
+            select(Vocab).from_statement(
+                forward.order_by("mastery_score", "mastery_id").limit(count)
+            )
+        ).scalars()
+    )
+    key = tuple_(Vocab.mastery_score, Vocab.mastery_id)
+    if len(items) < count:
+        items += (
+            db.query(Vocab)
+            .filter(in_band, key < tuple(pivot))
+            .order_by(Vocab.mastery_score, Vocab.mastery_id)
+            .limit(count - len(items))
+            .all()
+        )
+    random.shuffle(items)
+    return items
 
 
-def get_new_vocabulary(db: Session, count: int = 5):
+def get_concept_mastery_score(db: Session, user_id: int, concept: str) -> float | None:
     """
-    Selects new vocabulary items (mastery score < 0.2).
+    Returns the learner's mastery score for a grammar pattern or vocabulary word,
+    if tracked.
     """
-    return (
-        db.query(models.VocabularyMastery)
-        .filter(models.VocabularyMastery.mastery_score < 0.2)
-        .order_by(func.random())
-        .limit(count)
-        .all()
+    score = (
+        db.query(models.GrammarMastery.mastery_score)
+        .filter(
+            models.GrammarMastery.user_id == user_id,
+            models.GrammarMastery.pattern == concept,
+        )
+        .scalar()
     )
+    if score is None:
+        score = (
+            db.query(models.VocabularyMastery.mastery_score)
+            .filter(
+                models.VocabularyMastery.user_id == user_id,
+                models.VocabularyMastery.word_korean == concept,
+            )
+            .scalar()
+        )
+    return score
+
+
+def get_concept_mastery_scores(
+    db: Session, user_id: int, concepts: list[str]
+) -> dict[str, float]:
+    """
+    get_concept_mastery_score for many concepts at once; untracked concepts
+    are left out.
+    """
+    concepts = set(concepts)
+    if not concepts:
+        return {}
+    Vocab, Grammar = models.VocabularyMastery, models.GrammarMastery
+    # Grammar goes second so it wins over a vocab word, as in the single lookup.
+    rows = db.execute(
+        select(Vocab.word_korean, Vocab.mastery_score).where(
+            Vocab.user_id == user_id, Vocab.word_korean.in_(concepts)
+        )
+    ).all()
+    rows += db.execute(
+        select(Grammar.pattern, Grammar.mastery_score).where(
+            Grammar.user_id == user_id, Grammar.pattern.in_(concepts)
+        )
+    ).all()
+    return {concept: score for concept, score in rows if score is not None}
 
 
 # =================
 # Mastery Updates
 # =================
-def update_mastery_after_evaluation(db: Session, evaluation: schemas.EvaluationResult):
+def apply_evaluation(
+    db: Session,
+    user_id: int,
+    submission: schemas.Submission,
+    evaluation: schemas.EvaluationResult,
+) -> int:
     """
-    Processes the mastery updates from an evaluation result.
+    Writes the exercise grade, every mastery update and the learner's dashboard
+    aggregates in a single transaction, using a constant number of statements
+    regardless of how many concepts the evaluation touches. Returns the number
+    of rows changed.
     """
-    for update in evaluation.mastery_updates:
-        # This is a simplified example. In a real app, you'd distinguish
-        # between grammar and vocab, possibly with a concept type field.
-        # For now, we'll try to find a match in either table.
+    return apply_evaluations(db, user_id, [(submission, evaluation)])
+
 
-        grammar_item = (
-            db.query(models.GrammarMastery)
-            .filter(models.GrammarMastery.pattern == update.concept)
-            .first()
+def apply_evaluations(
+    db: Session,
+    user_id: int,
+    graded: list[tuple[schemas.Submission, schemas.EvaluationResult]],
+) -> int:
+    """
+    apply_evaluation for a whole batch of graded submissions: still one
+    transaction and a constant number of statements. When several evaluations
+    update the same concept, the last score wins and their flags are merged.
+    Each graded submission is also logged in `attempts` and rolled up into
+    `daily_progress`.
+    """
+    if not graded:
+        return 0
+    now = datetime.utcnow()
+    table = models.Exercises.__table__
+    changed = db.execute(
+        update(table)
+        .where(
+            table.c.exercise_id == bindparam("b_id"),
+            table.c.user_id == user_id,
         )
-        if grammar_item:
-            grammar_item.mastery_score = update.new_score
-            grammar_item.last_reviewed = datetime.utcnow()
+        .values(
+            user_response=bindparam("b_response"),
+            grade=bindparam("b_grade"),
+            feedback=bindparam("b_feedback"),
+            submitted_at=now,
+        ),
+        [
+            {
+                "b_id": submission.exercise_id,
+                "b_response": submission.user_response,
+                "b_grade": evaluation.grade,
+                "b_feedback": evaluation.feedback_text,
+            }
+            for submission, evaluation in graded
+        ],
+    ).rowcount
+    # concept -> (kind, score before these updates), for the attempt log.
+    scores_before = {}
+    changed += _apply_mastery_updates(
+        db,
+        user_id,
+        [item for _, evaluation in graded for item in evaluation.mastery_updates],
+        grades=[evaluation.grade for _, evaluation in graded],
+        scores_before=scores_before,
+    )
+    _log_attempts(db, user_id, graded, scores_before, now)
+    db.commit()
+    return changed
 
-            if update.flags_added:
-                # Add new flags if they don't exist
-                existing_flags = set(grammar_item.weakness_flags or [])
-                for flag in update.flags_added:
-                    existing_flags.add(flag)
-                grammar_item.weakness_flags = list(existing_flags)
 
-            # If score decreased, increment times_incorrect
-            if update.new_score < grammar_item.mastery_score:
-                grammar_item.times_incorrect += 1
+def _apply_mastery_updates(
+    db: Session,
+    user_id: int,
+    mastery_updates: list,
+    grades: list[int],
+    scores_before: dict,
+) -> int:
+    # This is a simplified example. In a real app, you'd distinguish
+    # between grammar and vocab, possibly with a concept type field.
+    # For now, a concept matching a grammar pattern wins over a vocab word.
+    updates = {}
+    for update_item in mastery_updates:
+        previous = updates.get(update_item.concept)
+        if previous and previous.flags_added:
+            flags = list(previous.flags_added)
+            flags += [f for f in update_item.flags_added or [] if f not in flags]
+            update_item = update_item.model_copy(update={"flags_added": flags})
+        updates[update_item.concept] = update_item
+    now = datetime.utcnow()
+    changed, mastered_delta = _update_grammar_rows(
+        db, user_id, updates, now, scores_before
+    )
+    weak_area = None
+    if changed:
+        # The pattern the review queue targets from now on, as lessons and
+        # exercises pick it: the snapshot is patched with these scores first
+        # (or loaded, already seeing them, inside this transaction).
+        review_scheduler.grammar_scheduler.note_reviewed(user_id, mastery_updates, now)
+        weak_area = review_scheduler.get_target_grammar_pattern(db, user_id)
+    vocab_changed, known_delta = _update_vocab_rows(
+        db, user_id, updates, now, scores_before
+    )
+    changed += vocab_changed
+    _update_dashboard_aggregates(
+        db,
+        user_id,
+        known_vocab_delta=known_delta,
+        grammar_mastered_delta=mastered_delta,
+        weak_area=weak_area,
+        grades=grades,
+    )
+    return changed
 
-            continue  # Move to next update
 
-        vocab_item = (
-            db.query(models.VocabularyMastery)
-            .filter(models.VocabularyMastery.word_korean == update.concept)
-            .first()
-        )
-        if vocab_item:
-            # If score increased, increment times_correct
-            if update.new_score > vocab_item.mastery_score:
-                vocab_item.times_correct += 1
-            else:
-                vocab_item.times_incorrect += 1
+def _crossed(old_score: float | None, new_score: float, threshold: float) -> int:
+    # +1 when a score rises to the threshold, -1 when it falls below it.
+    return int(new_score >= threshold) - int((old_score or 0.0) >= threshold)
 
-            vocab_item.mastery_score = update.new_score
-            vocab_item.last_reviewed = datetime.utcnow()
 
-    db.commit()
+def _update_grammar_rows(
+    db: Session, user_id: int, updates: dict, now: datetime, scores_before: dict
+) -> tuple[int, int]:
+    # Pops the concepts it finds from `updates`; returns (rows changed,
+    # change in mastered patterns).
+    if not updates:
+        return 0, 0
+    changed = mastered_delta = 0
+
+    Grammar = models.GrammarMastery
+    grammar_rows = db.execute(
+        select(
+            Grammar.mastery_id,
+            Grammar.pattern,
+            Grammar.mastery_score,
+            Grammar.weakness_flags,
+        ).where(Grammar.user_id == user_id, Grammar.pattern.in_(updates))
+    ).all()
+    if grammar_rows:
+        grammar_params = []
+        for row in grammar_rows:
+            update_item = updates.pop(row.pattern)
+            scores_before[row.pattern] = ("grammar", row.mastery_score)
+            flags = list(row.weakness_flags or [])
+            # Flags differing only in case or spacing are the same error.
+            known = {normalize_flag(flag) for flag in flags}
+            for flag in update_item.flags_added or []:
+                if normalize_flag(flag) not in known:
+                    flags.append(flag.strip())
+                    known.add(normalize_flag(flag))
+            mastered_delta += _crossed(
+                row.mastery_score, update_item.new_score, MASTERED_GRAMMAR_THRESHOLD
+            )
+            grammar_params.append(
+                {
+                    "b_id": row.mastery_id,
+                    "b_score": update_item.new_score,
+                    "b_flags": flags,
+                    # If score decreased, increment times_incorrect
+                    "b_incorrect": int(update_item.new_score < row.mastery_score),
+                    "b_now": now,
+                }
+            )
+        table = Grammar.__table__
+        changed += db.execute(
+            update(table)
+            .where(table.c.mastery_id == bindparam("b_id"))
+            .values(
+                mastery_score=bindparam("b_score"),
+                weakness_flags=bindparam("b_flags"),
+                times_incorrect=table.c.times_incorrect + bindparam("b_incorrect"),
+                last_reviewed=bindparam("b_now"),
+            ),
+            grammar_params,
+        ).rowcount
+    return changed, mastered_delta
+
+
+def _update_vocab_rows(
+    db: Session, user_id: int, updates: dict, now: datetime, scores_before: dict
+) -> tuple[int, int]:
+    # Returns (rows changed, change in known words).
+    if not updates:
+        return 0, 0
+    changed = known_delta = 0
+
+    Vocab = models.VocabularyMastery
+    vocab_rows = db.execute(
+        select(Vocab.mastery_id, Vocab.word_korean, Vocab.mastery_score).where(
+            Vocab.user_id == user_id, Vocab.word_korean.in_(updates)
+        )
+    ).all()
+    if vocab_rows:
+        vocab_params = []
+        for row in vocab_rows:
+            update_item = updates.pop(row.word_korean)
+            scores_before[row.word_korean] = ("vocab", row.mastery_score)
+            # If score increased, increment times_correct
+            improved = update_item.new_score > row.mastery_score
+            known_delta += _crossed(
+                row.mastery_score, update_item.new_score, KNOWN_VOCAB_THRESHOLD
+            )
+            vocab_params.append(
+                {
+                    "b_id": row.mastery_id,
+                    "b_score": update_item.new_score,
+                    "b_correct": int(improved),
+                    "b_incorrect": int(not improved),
+                    "b_now": now,
+                }
+            )
+        table = Vocab.__table__
+        changed += db.execute(
+            update(table)
+            .where(table.c.mastery_id == bindparam("b_id"))
+            .values(
+                mastery_score=bindparam("b_score"),
+                times_correct=table.c.times_correct + bindparam("b_correct"),
+                times_incorrect=table.c.times_incorrect + bindparam("b_incorrect"),
+                last_reviewed=bindparam("b_now"),
+            ),
+            vocab_params,
+        ).rowcount
+    return changed, known_delta
 
 
 # =================
 # Generic Getters
 # =================
-def get_exercise(db: Session, exercise_id: int):
+def get_exercise(db: Session, user_id: int, exercise_id: int):
     return (
         db.query(models.Exercises)
-        .filter(models.Exercises.exercise_id == exercise_id)
+        .filter(
+            models.Exercises.exercise_id == exercise_id,
+            models.Exercises.user_id == user_id,
+        )
         .first()
     )
 
 
-def get_lesson(db: Session, lesson_id: int):
-    return (
-        db.query(models.Lessons).filter(models.Lessons.lesson_id == lesson_id).first()
+def get_exercises(
+    db: Session, user_id: int, exercise_ids: list[int]
+) -> dict[int, models.Exercises]:
+    """
+    The learner's exercises among `exercise_ids`, by id, in one query.
+    """
+    rows = (
+        db.query(models.Exercises)
+        .filter(
+            models.Exercises.user_id == user_id,
+            models.Exercises.exercise_id.in_(set(exercise_ids)),
+        )
+        .all()
     )
+    return {row.exercise_id: row for row in rows}
 
 
-def get_all_grammar_mastery(db: Session, skip: int = 0, limit: int = 100):
+def get_lesson(db: Session, user_id: int, lesson_id: int):
     return (
-        db.query(models.GrammarMastery)
-        .order_by(models.GrammarMastery.mastery_score.asc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+        db.query(models.Lessons)
+        .filter(
+            models.Lessons.lesson_id == lesson_id, models.Lessons.user_id == user_id
+        )
+        .first()
     )
 
 
-def get_all_vocabulary_mastery(db: Session, skip: int = 0, limit: int = 100):
-    return (
-        db.query(models.VocabularyMastery)
-        .order_by(models.VocabularyMastery.mastery_score.asc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+def get_all_grammar_mastery(
+    db: Session, user_id: int, cursor: str | None = None, limit: int = 100
+):
+    """
+    One page of the learner's grammar, weakest first, and the cursor of the
+    next page (None on the last one).
+    """
+    Grammar = models.GrammarMastery
+    return _keyset_page(
+        db.query(Grammar).filter(Grammar.user_id == user_id),
+        [(Grammar.mastery_score, float), (Grammar.mastery_id, int)],
+        cursor,
+        limit,
     )
 
 
-def get_review_history(db: Session, skip: int = 0, limit: int = 10):
-    return (
-        db.query(models.Exercises)
-        .filter(models.Exercises.grade is not None)
-        .order_by(models.Exercises.exercise_id.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+def get_all_vocabulary_mastery(
+    db: Session, user_id: int, cursor: str | None = None, limit: int = 100
+):
+    """
+    One page of the learner's vocabulary, weakest first, and the cursor of the
+    next page (None on the last one).
+    """
+    Vocab = models.VocabularyMastery
+    return _keyset_page(
+        db.query(Vocab).filter(Vocab.user_id == user_id),
+        [(Vocab.mastery_score, float), (Vocab.mastery_id, int)],
+        cursor,
+        limit,
+    )
+
+
+def get_review_history(
+    db: Session, user_id: int, cursor: str | None = None, limit: int = 10
+):
+    """
+    One page of the learner's graded exercises, most recent first, and the
+    cursor of the next page (None on the last one). History spans
+    `exercises` and exercise_archive: a page is read from both and merged by
+    (submitted_at, exercise_id), so it doesn't matter which side of an
+    archive pass, or how far into one, an exercise is.
+    """
+    Exercises, Archive = models.Exercises, models.ExerciseArchive
+    hot, hot_next = _keyset_page(
+        db.query(Exercises).filter(
+            Exercises.user_id == user_id, Exercises.grade.isnot(None)
+        ),
+        [
+            (Exercises.submitted_at, datetime.fromisoformat),
+            (Exercises.exercise_id, int),
+        ],
+        cursor,
+        limit,
+        descending=True,
+    )
+    archived, archived_next = _keyset_page(
+        db.query(Archive)
+        .options(defer(Archive.payload))
+        .filter(Archive.user_id == user_id, Archive.grade.isnot(None)),
+        [
+            (Archive.submitted_at, datetime.fromisoformat),
+            (Archive.exercise_id, int),
+        ],
+        cursor,
+        limit,
+        descending=True,
     )
+    merged = sorted(
+        hot + archived,
+        key=lambda row: (row.submitted_at, row.exercise_id),
+        reverse=True,
+    )
+    rows = merged[:limit]
+    if len(merged) <= limit and hot_next is None and archived_next is None:
+        return rows, None
+    return rows, _encode_cursor([rows[-1].submitted_at, rows[-1].exercise_id])
+
+
+# =================
+# Pagination
+# =================
+def _encode_cursor(values: list) -> str:
+    raw = json.dumps(values, default=lambda v: v.isoformat())
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error) as e:
+        raise ValueError("Invalid pagination cursor.") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid pagination cursor.")
+    return values
+
+
+def _keyset_page(query, keys: list, cursor: str | None, limit: int, descending=False):
+    """
+    Orders `query` by the `keys` columns (the last one unique) and returns the
+    rows after `cursor` plus the cursor of the following page. Each page is an
+    index seek, so deep pages cost the same as the first one.
+
+    `keys` is a list of (column, parse) pairs; parse rebuilds a cursor value.
+    Raises ValueError for a malformed cursor.
+    """
+    columns = [column for column, _ in keys]
+    if cursor is not None:
+        values = _decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise ValueError("Invalid pagination cursor.")
+        try:
+            bound = tuple_(*(parse(v) for (_, parse), v in zip(keys, values)))
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid pagination cursor.") from e
+        row_key = tuple_(*columns)
+        query = query.filter(row_key < bound if descending else row_key > bound)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode_cursor([getattr(rows[-1], column.key) for column in columns])
 
 
 # =================
 # Generic Creators / Updaters
 # =================
-def create_lesson(db: Session, lesson_data: schemas.LessonContent) -> models.Lessons:
+def create_lesson(
+    db: Session, user_id: int, lesson_data: schemas.LessonContent
+) -> models.Lessons:
     db_lesson = models.Lessons(
+        user_id=user_id,
         grammar_focus=lesson_data.grammar_pattern,
         content=lesson_data.explanation_text,  # Assuming explanation_text is main content
         new_vocabulary=[v.model_dump() for v in lesson_data.new_vocabulary],
@@ -196,9 +721,10 @@ def create_lesson(db: Session, lesson_data: schemas.LessonContent) -> models.Les
 
 
 def create_exercise(
-    db: Session, exercise_data: schemas.ExerciseDetails
+    db: Session, user_id: int, exercise_data: schemas.ExerciseDetails
 ) -> models.Exercises:
     db_exercise = models.Exercises(
+        user_id=user_id,
         type=exercise_data.type,
         sub_type=exercise_data.sub_type,
         question_data=exercise_data.model_dump(),  # Store the whole details object
@@ -209,14 +735,747 @@ def create_exercise(
     return db_exercise
 
 
-def update_exercise_with_submission(
-    db: Session, submission: schemas.Submission, evaluation: schemas.EvaluationResult
-) -> models.Exercises:
-    db_exercise = get_exercise(db, submission.exercise_id)
-    if db_exercise:
-        db_exercise.user_response = submission.user_response
-        db_exercise.grade = evaluation.grade
-        db_exercise.feedback = evaluation.feedback_text
+def create_exercises(
+    db: Session, user_id: int, exercises: list[schemas.ExerciseDetails]
+) -> list[int]:
+    """
+    Saves a set of exercises with one multi-row INSERT and returns their new
+    exercise_ids, in order.
+    """
+    if not exercises:
+        return []
+    # RETURNING order isn't guaranteed (and asking SQLAlchemy to guarantee it
+    # makes it insert row by row on SQLite), but the autoincrement ids of one
+    # INSERT are assigned in row order, so sorting them restores it.
+    exercise_ids = db.scalars(
+        insert(models.Exercises).returning(models.Exercises.exercise_id),
+        [
+            {
+                "user_id": user_id,
+                "type": exercise.type,
+                "sub_type": exercise.sub_type,
+                "question_data": exercise.model_dump(),
+            }
+            for exercise in exercises
+        ],
+    ).all()
+    db.commit()
+    return sorted(exercise_ids)
+
+
+# =================
+# Content Pool
+# =================
+def _pool_query(
+    db: Session,
+    user_id: int,
+    kind: str,
+    grammar_pattern: str,
+    exercise_type: str | None = None,
+    sub_type: str | None = None,
+):
+    return db.query(models.ContentPool).filter(
+        models.ContentPool.user_id == user_id,
+        models.ContentPool.kind == kind,
+        models.ContentPool.grammar_pattern == grammar_pattern,
+        models.ContentPool.type == exercise_type,
+        models.ContentPool.sub_type == sub_type,
+    )
+
+
+def count_pool_items(
+    db: Session,
+    user_id: int,
+    kind: str,
+    grammar_pattern: str,
+    exercise_type: str | None = None,
+    sub_type: str | None = None,
+) -> int:
+    return _pool_query(
+        db, user_id, kind, grammar_pattern, exercise_type, sub_type
+    ).count()
+
+
+def add_pool_item(
+    db: Session,
+    user_id: int,
+    kind: str,
+    grammar_pattern: str,
+    payload: BaseModel,
+    exercise_type: str | None = None,
+    sub_type: str | None = None,
+) -> models.ContentPool:
+    db_item = models.ContentPool(
+        user_id=user_id,
+        kind=kind,
+        type=exercise_type,
+        sub_type=sub_type,
+        grammar_pattern=grammar_pattern,
+        payload=payload.model_dump(),
+    )
+    db.add(db_item)
+    db.commit()
+    return db_item
+
+
+def take_pool_item(
+    db: Session,
+    user_id: int,
+    kind: str,
+    grammar_pattern: str,
+    exercise_type: str | None = None,
+    sub_type: str | None = None,
+) -> dict | None:
+    """
+    Removes the oldest matching pool entry and returns its payload.
+    """
+    Pool = models.ContentPool
+    oldest = (
+        _pool_query(db, user_id, kind, grammar_pattern, exercise_type, sub_type)
+        .with_entities(Pool.pool_id)
+        .order_by(Pool.pool_id.asc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    # Picked and deleted in one statement, so two concurrent requests can't
+    # both be served the same entry.
+    payload = db.execute(
+        delete(Pool).where(Pool.pool_id == oldest).returning(Pool.payload),
+        execution_options={"synchronize_session": False},
+    ).scalar()
+    db.commit()
+    return payload
+
+
+def invalidate_pool_items(db: Session, user_id: int, current_pattern: str) -> int:
+    """
+    Drops the learner's pool entries generated for a grammar pattern that is no
+    longer their target.
+    """
+    deleted = (
+        db.query(models.ContentPool)
+        .filter(
+            models.ContentPool.user_id == user_id,
+            models.ContentPool.grammar_pattern != current_pattern,
+        )
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+# =================
+# LLM Cache
+# =================
+def get_llm_cache_response(
+    db: Session, cache_key: str, ttl_seconds: int
+) -> dict | None:
+    """
+    Returns a live cached response and marks its entry as recently used.
+    Expired entries are deleted and reported as a miss.
+    """
+    entry = db.get(models.LLMCacheEntry, cache_key)
+    if not entry:
+        return None
+    now = datetime.utcnow()
+    if entry.created_at < now - timedelta(seconds=ttl_seconds):
+        db.delete(entry)
         db.commit()
-        db.refresh(db_exercise)
-    return db_exercise
+        return None
+    response = entry.response
+    entry.last_accessed = now
+    entry.hit_count += 1
+    db.commit()
+    return response
+
+
+def put_llm_cache_entry(db: Session, cache_key: str, agent: str, response: dict):
+    db.merge(
+        models.LLMCacheEntry(
+            cache_key=cache_key,
+            agent=agent,
+            response=response,
+            created_at=datetime.utcnow(),
+            last_accessed=datetime.utcnow(),
+            hit_count=0,
+        )
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent miss on the same key stored its response first.
+        db.rollback()
+
+
+def evict_llm_cache_entries(db: Session, ttl_seconds: int, max_entries: int) -> int:
+    """
+    Deletes expired entries, then the least recently used ones beyond `max_entries`.
+    """
+    Entry = models.LLMCacheEntry
+    deleted = (
+        db.query(Entry)
+        .filter(Entry.created_at < datetime.utcnow() - timedelta(seconds=ttl_seconds))
+        .delete(synchronize_session=False)
+    )
+    cutoff = (
+        db.query(Entry.last_accessed)
+        .order_by(Entry.last_accessed.desc())
+        .offset(max_entries)
+        .limit(1)
+        .scalar()
+    )
+    if cutoff is not None:
+        deleted += (
+            db.query(Entry)
+            .filter(Entry.last_accessed <= cutoff)
+            .delete(synchronize_session=False)
+        )
+    db.commit()
+    return deleted
+
+
+def count_llm_cache_entries(db: Session) -> dict[str, int]:
+    Entry = models.LLMCacheEntry
+    return dict(db.query(Entry.agent, func.count()).group_by(Entry.agent).all())
+
+
+# =================
+# Upserts
+# =================
+def _dialect_insert(db: Session, table):
+    # The backend's own INSERT, which has ON CONFLICT clauses.
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise ValueError(f"Upserts are not supported on '{dialect}' databases.")
+    return dialect_insert(table)
+
+
+# =================
+# Deck Import
+# =================
+def _insert_new(db: Session, model, key: str, rows: list[dict]) -> int:
+    # INSERT ... ON CONFLICT (user_id, key) DO NOTHING for a batch of rows, as
+    # one executemany; returns how many rows were new.
+    statement = _dialect_insert(db, model.__table__).on_conflict_do_nothing(
+        index_elements=["user_id", key]
+    )
+    return db.execute(statement, rows).rowcount
+
+
+def import_vocabulary(db: Session, user_id: int, words: dict[str, str | None]) -> int:
+    """
+    Adds the words (word -> English gloss, if known) the learner doesn't track
+    yet as new vocabulary (mastery 0.0), leaving existing rows and their
+    progress alone. Returns the number of words added.
+    """
+    if not words:
+        return 0
+    now = datetime.utcnow()
+    added = _insert_new(
+        db,
+        models.VocabularyMastery,
+        "word_korean",
+        [
+            {
+                "user_id": user_id,
+                "word_korean": word,
+                "mastery_score": 0.0,
+                "last_reviewed": now,
+                "times_correct": 0,
+                "times_incorrect": 0,
+                "english": english,
+            }
+            for word, english in words.items()
+        ],
+    )
+    db.commit()
+    return added
+
+
+def import_grammar(db: Session, user_id: int, patterns: list[str]) -> int:
+    """
+    import_vocabulary for grammar patterns. New patterns start at 0.0 and as
+    just reviewed; the dashboard's weak area moves with the next evaluation.
+    """
+    if not patterns:
+        return 0
+    now = datetime.utcnow()
+    added = _insert_new(
+        db,
+        models.GrammarMastery,
+        "pattern",
+        [
+            {
+                "user_id": user_id,
+                "pattern": pattern,
+                "mastery_score": 0.0,
+                "last_reviewed": now,
+                "weakness_flags": [],
+                "times_incorrect": 0,
+            }
+            for pattern in patterns
+        ],
+    )
+    db.commit()
+    return added
+
+
+# =================
+# Vocabulary Glosses
+# =================
+def get_unglossed_words(db: Session, limit: int) -> list[str]:
+    """
+    Up to `limit` distinct words that some learner has without an English
+    gloss, in word order (a scan of ix_vocabulary_mastery_unglossed).
+    """
+    Vocab = models.VocabularyMastery
+    return list(
+        db.scalars(
+            select(Vocab.word_korean)
+            .where(Vocab.english.is_(None))
+            .group_by(Vocab.word_korean)
+            .order_by(Vocab.word_korean)
+            .limit(limit)
+        )
+    )
+
+
+def save_vocabulary_glosses(db: Session, glosses: dict[str, str]) -> int:
+    """
+    Stores each word's gloss on every learner's row for it that has none yet,
+    in one executemany. Returns the number of rows updated.
+    """
+    if not glosses:
+        return 0
+    table = models.VocabularyMastery.__table__
+    updated = db.execute(
+        update(table)
+        .where(table.c.word_korean == bindparam("b_word"), table.c.english.is_(None))
+        # A gloss isn't a review: keep last_reviewed from its onupdate.
+        .values(english=bindparam("b_english"), last_reviewed=table.c.last_reviewed),
+        [{"b_word": word, "b_english": english} for word, english in glosses.items()],
+    ).rowcount
+    db.commit()
+    return updated
+
+
+# =================
+# Exercise Archive
+# =================
+def get_exercise_id_range(db: Session) -> tuple[int | None, int | None]:
+    """The lowest and highest exercise_id in `exercises`."""
+    Exercises = models.Exercises
+    return tuple(
+        db.execute(
+            select(func.min(Exercises.exercise_id), func.max(Exercises.exercise_id))
+        ).one()
+    )
+
+
+# Preset zlib dictionaries for archived exercise payloads, by format version
+# (the payload's first byte). A payload is one small record, too short for
+# zlib to find much to reuse within it, but most of it is the JSON skeleton
+# and phrases every exercise shares, so they are primed here. Never edit a
+# dictionary in place: add a version and keep the old ones for unpacking.
+_ARCHIVE_ZDICTS = {
+    1: (
+        '"Short Story/Article Analysis""Reading""Writing""Flashcards"'
+        '"sentence""paragraph""short answer""Translate the following into Korean: '
+        '""Write a short essay using ""Read the passage and answer"'
+        '"Good job! Your answer is correct. Remember to use the correct particle. '
+        'Try to use the grammar pattern "'
+        '{"sub_type":"Targeted Essay","question_data":{"question_text":"Write '
+        '","expected_format":"essay","expected_answer":null,"target_concept":null},'
+        '"user_response":"","feedback":"'
+        '{"sub_type":"Translation Recall","question_data":{"question_text":"'
+        'Translate into Korean: ","expected_format":"single word",'
+        '"expected_answer":"","target_concept":"'
+    ).encode("utf-8"),
+}
+_ARCHIVE_FORMAT = 1
+# Kept as columns of exercise_archive rather than in the payload.
+_ARCHIVE_COLUMN_KEYS = ("exercise_id", "type", "sub_type")
+
+
+def _pack_exercise(row) -> bytes:
+    record = {
+        "sub_type": row.sub_type,
+        "question_data": {
+            key: value
+            for key, value in (row.question_data or {}).items()
+            if key not in _ARCHIVE_COLUMN_KEYS
+        },
+        "user_response": row.user_response,
+        "feedback": row.feedback,
+    }
+    compressor = zlib.compressobj(9, zdict=_ARCHIVE_ZDICTS[_ARCHIVE_FORMAT])
+    data = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+    return (
+        bytes([_ARCHIVE_FORMAT])
+        + compressor.compress(data.encode("utf-8"))
+        + compressor.flush()
+    )
+
+
+def unpack_archived_exercise(archived: models.ExerciseArchive) -> dict:
+    """
+    The sub_type, question_data (as `exercises` stored it), user_response and
+    feedback of an archived exercise.
+    """
+    payload = archived.payload
+    decompressor = zlib.decompressobj(zdict=_ARCHIVE_ZDICTS[payload[0]])
+    record = json.loads(decompressor.decompress(payload[1:]) + decompressor.flush())
+    record["question_data"] = {
+        "exercise_id": archived.exercise_id,
+        "type": archived.type,
+        "sub_type": record["sub_type"],
+        **record["question_data"],
+    }
+    return record
+
+
+def archive_exercises(
+    db: Session,
+    first_id: int,
+    last_id: int,
+    graded_before: datetime,
+    abandoned_before: datetime,
+) -> tuple[int, int]:
+    """
+    Moves the exercises with ids from `first_id` to `last_id` that are due
+    into exercise_archive, in one transaction: graded ones submitted before
+    `graded_before`, and never-submitted ones created before
+    `abandoned_before`. The DELETE
+    returns the rows it removes, so an exercise graded meanwhile is either
+    moved as graded or left alone. Returns (graded, abandoned) moved.
+    """
+    table = models.Exercises.__table__
+    rows = db.execute(
+        delete(table)
+        .where(
+            table.c.exercise_id.between(first_id, last_id),
+            or_(
+                and_(
+                    table.c.grade.isnot(None),
+                    table.c.submitted_at < graded_before,
+                ),
+                and_(
+                    table.c.grade.is_(None),
+                    table.c.created_at < abandoned_before,
+                ),
+            ),
+        )
+        .returning(*table.c)
+    ).all()
+    if not rows:
+        db.commit()
+        return 0, 0
+
+    now = datetime.utcnow()
+    db.execute(
+        insert(models.ExerciseArchive.__table__),
+        [
+            {
+                "exercise_id": row.exercise_id,
+                "user_id": row.user_id,
+                "type": row.type,
+                "grade": row.grade,
+                "submitted_at": row.submitted_at,
+                "created_at": row.created_at,
+                "archived_at": now,
+                "payload": _pack_exercise(row),
+            }
+            for row in rows
+        ],
+    )
+    db.commit()
+    graded = sum(row.grade is not None for row in rows)
+    return graded, len(rows) - graded
+
+
+def purge_archived_exercises(db: Session, archived_before: datetime, limit: int) -> int:
+    """
+    Deletes up to `limit` archived exercises archived before
+    `archived_before`. Returns the number deleted.
+    """
+    Archive = models.ExerciseArchive
+    purged = db.execute(
+        delete(Archive).where(
+            Archive.exercise_id.in_(
+                select(Archive.exercise_id)
+                .where(Archive.archived_at < archived_before)
+                .limit(limit)
+                .scalar_subquery()
+            )
+        )
+    ).rowcount
+    db.commit()
+    return purged
+
+
+# =================
+# Progress
+# =================
+# daily_progress's concept for a day's graded submissions as a whole, each
+# counted once however many concepts it moved (none included).
+ALL_CONCEPTS = "*"
+
+
+def _log_attempts(
+    db: Session,
+    user_id: int,
+    graded: list[tuple[schemas.Submission, schemas.EvaluationResult]],
+    scores_before: dict,
+    now: datetime,
+):
+    # Runs inside apply_evaluations' transaction. A concept graded twice in
+    # one batch chains: the second attempt starts from the first one's score.
+    scores = {concept: score for concept, (_, score) in scores_before.items()}
+    attempts = []
+    for submission, evaluation in graded:
+        logged = False
+        for update_item in evaluation.mastery_updates:
+            concept = update_item.concept
+            if concept not in scores:
+                continue
+            attempts.append(
+                {
+                    "user_id": user_id,
+                    "exercise_id": submission.exercise_id,
+                    "concept": concept,
+                    "kind": scores_before[concept][0],
+                    "grade": evaluation.grade,
+                    "score_before": scores[concept],
+                    "score_after": update_item.new_score,
+                    "attempted_at": now,
+                }
+            )
+            scores[concept] = update_item.new_score
+            logged = True
+        if not logged:
+            attempts.append(
+                {
+                    "user_id": user_id,
+                    "exercise_id": submission.exercise_id,
+                    "concept": None,
+                    "kind": None,
+                    "grade": evaluation.grade,
+                    "score_before": None,
+                    "score_after": None,
+                    "attempted_at": now,
+                }
+            )
+    db.execute(insert(models.Attempts.__table__), attempts)
+    _upsert_daily_progress(db, _roll_up(attempts) + _roll_up_submissions(attempts))
+
+
+def _roll_up(attempts) -> list[dict]:
+    # Folds attempts (mappings, in time order) into daily_progress rows, one
+    # per (user, concept, day). Attempts without a concept only count towards
+    # the day's ALL_CONCEPTS row (_roll_up_submissions).
+    rollups = {}
+    for attempt in attempts:
+        if attempt["concept"] is None:
+            continue
+        day = attempt["attempted_at"].date()
+        key = (attempt["user_id"], attempt["concept"], day)
+        rollup = _rollup_row(rollups, key, attempt["kind"])
+        rollup["attempts"] += 1
+        rollup["grade_sum"] += attempt["grade"]
+        rollup["score_delta"] += attempt["score_after"] - attempt["score_before"]
+        rollup["score_end"] = attempt["score_after"]
+    return list(rollups.values())
+
+
+def _roll_up_submissions(attempts) -> list[dict]:
+    # The ALL_CONCEPTS rows for `attempts`: a submission's attempts share its
+    # exercise_id and time, and count once, with its grade.
+    rollups = {}
+    seen = set()
+    for attempt in attempts:
+        submission = (
+            attempt["user_id"],
+            attempt["exercise_id"],
+            attempt["attempted_at"],
+        )
+        if submission in seen:
+            continue
+        seen.add(submission)
+        key = (attempt["user_id"], ALL_CONCEPTS, attempt["attempted_at"].date())
+        rollup = _rollup_row(rollups, key, None)
+        rollup["attempts"] += 1
+        rollup["grade_sum"] += attempt["grade"]
+    return list(rollups.values())
+
+
+def _rollup_row(rollups: dict, key: tuple, kind: str | None) -> dict:
+    rollup = rollups.get(key)
+    if rollup is None:
+        user_id, concept, day = key
+        rollup = rollups[key] = {
+            "user_id": user_id,
+            "concept": concept,
+            "kind": kind,
+            "day": day,
+            "attempts": 0,
+            "grade_sum": 0,
+            "score_delta": 0.0,
+            "score_end": None,
+        }
+    return rollup
+
+
+def _upsert_daily_progress(db: Session, rollups: list[dict]):
+    # Adds `rollups` to the rows already there, as one executemany. They must
+    # be later than what those rows hold, as score_end is replaced.
+    if not rollups:
+        return
+    table = models.DailyProgress.__table__
+    statement = _dialect_insert(db, table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "concept", "day"],
+        set_={
+            "kind": statement.excluded.kind,
+            "attempts": table.c.attempts + statement.excluded.attempts,
+            "grade_sum": table.c.grade_sum + statement.excluded.grade_sum,
+            "score_delta": table.c.score_delta + statement.excluded.score_delta,
+            "score_end": statement.excluded.score_end,
+        },
+    )
+    db.execute(statement, rollups)
+
+
+def get_progress(
+    db: Session, user_id: int, since: date, concept: str | None = None
+) -> list[schemas.ProgressPoint]:
+    """
+    The learner's daily progress from `since` on, oldest first: for one
+    `concept`, or over all of them, where attempts are graded submissions
+    (ALL_CONCEPTS) and the score change is summed over the concepts. Reads one
+    daily_progress row per day (and concept), never the attempts themselves.
+    """
+    Progress = models.DailyProgress
+    if concept is not None:
+        rows = db.execute(
+            select(
+                Progress.day,
+                Progress.attempts,
+                Progress.grade_sum,
+                Progress.score_delta,
+                Progress.score_end,
+            )
+            .where(
+                Progress.user_id == user_id,
+                Progress.concept == concept,
+                Progress.day >= since,
+            )
+            .order_by(Progress.day)
+        ).all()
+    else:
+        total = Progress.concept == ALL_CONCEPTS
+        submissions = func.sum(case((total, Progress.attempts), else_=0))
+        # Days rolled up before ALL_CONCEPTS rows existed fall back to the
+        # per-concept sums until rebuild_daily_progress is run.
+        has_total = submissions > 0
+        rows = db.execute(
+            select(
+                Progress.day,
+                case((has_total, submissions), else_=func.sum(Progress.attempts)).label(
+                    "attempts"
+                ),
+                case(
+                    (has_total, func.sum(case((total, Progress.grade_sum), else_=0))),
+                    else_=func.sum(Progress.grade_sum),
+                ).label("grade_sum"),
+                func.sum(Progress.score_delta).label("score_delta"),
+            )
+            .where(Progress.user_id == user_id, Progress.day >= since)
+            .group_by(Progress.day)
+            .order_by(Progress.day)
+        ).all()
+    return [
+        schemas.ProgressPoint(
+            day=row.day,
+            attempts=row.attempts,
+            mean_grade=round(row.grade_sum / row.attempts, 2),
+            score_delta=round(row.score_delta, 4),
+            score=row.score_end if concept is not None else None,
+        )
+        for row in rows
+    ]
+
+
+def rebuild_daily_progress(
+    db: Session, user_id: int | None = None, batch_size: int = 5000
+) -> int:
+    """
+    Recomputes daily_progress from the attempt log, for one learner or all
+    of them, e.g. after changing how attempts roll up. Streams the attempts in
+    (user, concept, time) order, then the graded submissions in time order,
+    writing every `batch_size` rows; one transaction. Returns the number of
+    attempts rolled up.
+    """
+    Attempts = models.Attempts
+    Progress = models.DailyProgress
+    clear = delete(Progress)
+    query = (
+        select(
+            Attempts.user_id,
+            Attempts.concept,
+            Attempts.kind,
+            Attempts.grade,
+            Attempts.score_before,
+            Attempts.score_after,
+            Attempts.attempted_at,
+        )
+        .where(Attempts.concept.isnot(None))
+        .order_by(
+            Attempts.user_id,
+            Attempts.concept,
+            Attempts.attempted_at,
+            Attempts.attempt_id,
+        )
+    )
+    if user_id is not None:
+        clear = clear.where(Progress.user_id == user_id)
+        query = query.where(Attempts.user_id == user_id)
+    db.execute(clear)
+
+    rolled_up = 0
+    batch = []
+    for attempt in db.execute(query.execution_options(yield_per=batch_size)):
+        batch.append(attempt._mapping)
+        if len(batch) >= batch_size:
+            # A day split across batches is summed by the upsert.
+            _upsert_daily_progress(db, _roll_up(batch))
+            rolled_up += len(batch)
+            batch = []
+    _upsert_daily_progress(db, _roll_up(batch))
+    rolled_up += len(batch)
+
+    # One row per submission, whichever concepts it moved, for ALL_CONCEPTS.
+    submissions = (
+        select(
+            Attempts.user_id,
+            Attempts.exercise_id,
+            Attempts.attempted_at,
+            func.min(Attempts.grade).label("grade"),
+        )
+        .group_by(Attempts.user_id, Attempts.exercise_id, Attempts.attempted_at)
+        .order_by(Attempts.user_id, Attempts.attempted_at)
+    )
+    if user_id is not None:
+        submissions = submissions.where(Attempts.user_id == user_id)
+    batch = []
+    for submission in db.execute(submissions.execution_options(yield_per=batch_size)):
+        batch.append(submission._mapping)
+        if len(batch) >= batch_size:
+            _upsert_daily_progress(db, _roll_up_submissions(batch))
+            batch = []
+    _upsert_daily_progress(db, _roll_up_submissions(batch))
+    db.commit()
+    return rolled_up
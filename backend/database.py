@@ -1,5 +1,8 @@
 # backend/database.py
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, create_engine, event, inspect, text, update
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 import os
@@ -7,13 +10,100 @@ import os
 load_dotenv()  # Load environment variables from .env
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+# Serve requests from an asyncio engine (aiosqlite / asyncpg) instead of
+# running the sync engine in the threadpool.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Needed for SQLite
-)
+# Connection pool sizing (ignored for in-memory SQLite).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite connection settings: WAL lets readers run alongside the single
+# writer, and writers wait up to busy_timeout for the lock instead of failing.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _engine_options(url) -> dict:
+    options = {"pool_pre_ping": True}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}  # Needed for SQLite
+        if url.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _configure_sqlite(engine):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+
+def create_db_engine(database_url: str = DATABASE_URL):
+    """
+    Builds the sync engine for `database_url` with the pool and SQLite
+    settings above.
+    """
+    url = make_url(database_url)
+    engine = create_engine(url, **_engine_options(url))
+    if url.get_backend_name() == "sqlite":
+        _configure_sqlite(engine)
+    return engine
+
+
+def create_async_db_engine(database_url: str = DATABASE_URL):
+    """
+    Builds an asyncio engine for `database_url`, swapping in the async driver
+    for its backend. Needs `aiosqlite` or `asyncpg` installed.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases.")
+    url = url.set(drivername=_ASYNC_DRIVERS[backend])
+    engine = create_async_engine(url, **_engine_options(url))
+    if backend == "sqlite":
+        _configure_sqlite(engine.sync_engine)
+    return engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine()
+    # Attributes are read after commits on the event loop, where an expired
+    # attribute can't be lazy-loaded.
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
 
@@ -22,12 +112,157 @@ def init_db():
     # from . import models
 
     Base.metadata.create_all(bind=engine)
+    _upgrade_schema()
 
 
-# Dependency to get the DB session
-def get_db():
+# Values for NOT NULL columns added since a table was created, given to its
+# existing rows when it is rebuilt: everything from before learners existed
+# belongs to learner 1.
+_LEGACY_VALUES = {"user_id": 1}
+
+
+def _upgrade_schema():
+    # create_all skips tables that already exist, so add the columns and the
+    # indexes defined since an existing database was created.
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    upgraded = set()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns if column.name not in columns]
+            if any(not column.nullable for column in missing):
+                _rebuild_table(conn, table, columns, inspector)
+            else:
+                for column in missing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE {table.name} "
+                            f"ADD COLUMN {column.name} {column_type}"
+                        )
+                    )
+                    _backfill_default(conn, table, column)
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+            _backfill_legacy(conn, table, {column.name for column in missing})
+            if missing:
+                upgraded.add(table.name)
+        if "user_status" in upgraded:
+            # The dashboard aggregates predate being kept current by each
+            # evaluation; recount them once from the (now upgraded) mastery rows.
+            from . import crud
+
+            crud.recount_dashboard_aggregates(conn)
+
+
+def _default_value(column):
+    # The column's default as of now, or None if it has no simple one.
+    default = column.default
+    if default is None or not (default.is_scalar or default.is_callable):
+        return None
+    return default.arg(None) if default.is_callable else default.arg
+
+
+def _backfill_default(conn, table, column):
+    # Existing rows get the new column's default as of now, e.g. a created_at
+    # so that they start aging at the upgrade rather than look infinitely old.
+    value = _default_value(column)
+    if value is None:
+        return
+    conn.execute(
+        text(
+            f"UPDATE {table.name} SET {column.name} = :value "
+            f"WHERE {column.name} IS NULL"
+        ).bindparams(bindparam("value", type_=column.type)),
+        {"value": value},
+    )
+
+
+def _backfill_legacy(conn, table, added: set):
+    # Exercises graded before submitted_at was recorded are listed in the
+    # history as of the upgrade (their created_at is the upgrade time too).
+    if table.name == "exercises" and "submitted_at" in added:
+        conn.execute(
+            update(table)
+            .where(table.c.grade.isnot(None), table.c.submitted_at.is_(None))
+            .values(submitted_at=table.c.created_at)
+        )
+
+
+def _rebuild_table(conn, table, old_columns: set, inspector):
+    # A NOT NULL column can't be added with ALTER TABLE, and the unique keys
+    # that now include it replace column-level UNIQUEs SQLite can't drop: so
+    # the table is recreated in its current shape and its rows copied over.
+    # New columns get _LEGACY_VALUES, their default, or NULL.
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError(
+            f"Table {table.name} predates columns that can't be added in place; "
+            f"migrate it by hand or recreate the database."
+        )
+    values, params = [], {}
+    for column in table.columns:
+        if column.name in old_columns:
+            values.append(column.name)
+            continue
+        value = _LEGACY_VALUES.get(column.name, _default_value(column))
+        if value is None and not column.nullable:
+            raise RuntimeError(
+                f"Table {table.name} predates its column {column.name}, which "
+                f"existing rows have no value for; recreate the database."
+            )
+        values.append(f":{column.name}")
+        params[column.name] = value
+
+    legacy = f"{table.name}_legacy"
+    # The new table's indexes may reuse the old ones' names.
+    for index in inspector.get_indexes(table.name):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy}"))
+    table.create(conn)
+    conn.execute(
+        text(
+            f"INSERT INTO {table.name} ({', '.join(table.columns.keys())}) "
+            f"SELECT {', '.join(values)} FROM {legacy}"
+        ).bindparams(*(bindparam(name, type_=table.c[name].type) for name in params)),
+        params,
+    )
+    conn.execute(text(f"DROP TABLE {legacy}"))
+
+
+@asynccontextmanager
+async def db_session():
+    """
+    A session on the async engine when DATABASE_ASYNC is set, otherwise a
+    sync Session that is closed off the event loop.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
+
+
+# Dependency to get the DB session
+async def get_db():
+    async with db_session() as db:
+        yield db
+
+
+async def run_sync(fn, db, *args, **kwargs):
+    """
+    Runs a blocking crud call against `db` without stalling the event loop:
+    in the worker threadpool for a Session, or on the AsyncSession's own
+    connection for the async engine. crud functions take a sync Session
+    either way.
+    """
+    if hasattr(db, "sync_session"):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
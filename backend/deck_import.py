@@ -0,0 +1,198 @@
+# backend/deck_import.py
+"""
+Streaming import of vocabulary and grammar decks into a learner's mastery
+tables.
+
+A deck is CSV (with a header row) or JSONL (one object per line). Each row
+adds its `word_korean`, with its `english` gloss if given, and/or its
+`pattern`; other columns are ignored, and a row with neither is counted as
+invalid. Words imported without a gloss get one from gloss_filler.py.
+
+Rows are read one at a time and written DECK_IMPORT_BATCH_SIZE at a time with
+one INSERT ... ON CONFLICT DO NOTHING per table (crud.import_vocabulary /
+crud.import_grammar), so memory stays bounded by the batch size whatever the
+size of the deck. Words and patterns the learner already has keep their
+progress, so a deck can be imported again, e.g. after a failure part-way,
+since each batch is committed on its own.
+
+Usage (from the repository root):
+    python -m backend.deck_import deck.csv --user-id 1
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy.orm import Session
+
+from . import crud, review_scheduler, schemas
+from .database import SessionLocal, init_db
+
+DECK_IMPORT_BATCH_SIZE = int(os.getenv("DECK_IMPORT_BATCH_SIZE", "5000"))
+# Uploaded decks are kept in memory up to this size, then spooled to disk.
+DECK_IMPORT_SPOOL_BYTES = int(
+    os.getenv("DECK_IMPORT_SPOOL_BYTES", str(8 * 1024 * 1024))
+)
+
+FORMATS = ("csv", "jsonl")
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/jsonl": "jsonl",
+    "application/x-ndjson": "jsonl",
+    "application/jsonlines": "jsonl",
+}
+
+
+def format_for(filename: str = "", content_type: str = "") -> str:
+    """The deck format implied by a file name or a Content-Type header."""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in _CONTENT_TYPES:
+        return _CONTENT_TYPES[media_type]
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in _EXTENSIONS:
+        return _EXTENSIONS[extension]
+    raise ValueError(
+        f"Unknown deck format for '{filename or content_type}'; use csv or jsonl."
+    )
+
+
+def read_rows(lines: Iterable[str], deck_format: str) -> Iterator[dict]:
+    """Parses deck rows lazily from an iterable of text lines."""
+    if deck_format == "csv":
+        try:
+            yield from csv.DictReader(lines)
+        except csv.Error as e:
+            raise ValueError(f"Malformed CSV: {e}") from e
+    elif deck_format == "jsonl":
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number} is not valid JSON: {e}") from e
+            yield row if isinstance(row, dict) else {}
+    else:
+        raise ValueError(f"Unknown deck format '{deck_format}'; use csv or jsonl.")
+
+
+def _value(row: dict, column: str) -> str | None:
+    value = row.get(column)
+    if not isinstance(value, str):
+        return None
+    return value.strip() or None
+
+
+def import_deck(
+    db: Session,
+    user_id: int,
+    rows: Iterable[dict],
+    batch_size: int = DECK_IMPORT_BATCH_SIZE,
+    on_progress: Callable[[schemas.DeckImportResult], None] | None = None,
+) -> schemas.DeckImportResult:
+    """
+    Imports deck `rows` for the learner, calling `on_progress` with the
+    running totals after each batch is written.
+    """
+    crud.ensure_user_status(db, user_id)
+    result = schemas.DeckImportResult()
+    started = time.perf_counter()
+    # Duplicates within a batch are dropped here; across batches, the
+    # conflict clause skips them.
+    words: dict[str, str | None] = {}
+    patterns: dict[str, None] = {}
+
+    def flush():
+        result.vocabulary_added += crud.import_vocabulary(db, user_id, words)
+        result.grammar_added += crud.import_grammar(db, user_id, list(patterns))
+        words.clear()
+        patterns.clear()
+        result.seconds = round(time.perf_counter() - started, 3)
+        if on_progress:
+            on_progress(result)
+
+    for row in rows:
+        result.rows += 1
+        word, pattern = _value(row, "word_korean"), _value(row, "pattern")
+        if word is None and pattern is None:
+            result.invalid += 1
+            continue
+        if word is not None:
+            words[word] = words.get(word) or _value(row, "english")
+        if pattern is not None:
+            patterns[pattern] = None
+        if len(words) >= batch_size or len(patterns) >= batch_size:
+            flush()
+    flush()
+
+    # The review queues must see the new items.
+    review_scheduler.grammar_scheduler.invalidate(user_id)
+    review_scheduler.vocab_scheduler.invalidate(user_id)
+    return result
+
+
+def import_file(
+    db: Session,
+    user_id: int,
+    file: io.IOBase,
+    deck_format: str,
+    batch_size: int = DECK_IMPORT_BATCH_SIZE,
+    on_progress: Callable[[schemas.DeckImportResult], None] | None = None,
+) -> schemas.DeckImportResult:
+    """import_deck for a binary file holding a UTF-8 deck."""
+    lines = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        return import_deck(
+            db, user_id, read_rows(lines, deck_format), batch_size, on_progress
+        )
+    finally:
+        # Leave `file` for its owner to close.
+        lines.detach()
+
+
+def _print_progress(result: schemas.DeckImportResult):
+    rate = result.rows / result.seconds if result.seconds else 0.0
+    print(
+        f"{result.rows:>10} rows  {result.vocabulary_added:>9} words"
+        f"  {result.grammar_added:>7} patterns  {result.invalid:>6} invalid"
+        f"  {rate:>9.0f} rows/s",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="A .csv or .jsonl deck.")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--format", choices=FORMATS, help="Default: from the path.")
+    parser.add_argument("--batch-size", type=int, default=DECK_IMPORT_BATCH_SIZE)
+    parser.add_argument("--quiet", action="store_true", help="No progress lines.")
+    args = parser.parse_args()
+
+    init_db()
+    deck_format = args.format or format_for(args.path)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as file:
+            result = import_file(
+                db,
+                args.user_id,
+                file,
+                deck_format,
+                args.batch_size,
+                None if args.quiet else _print_progress,
+            )
+    finally:
+        db.close()
+    print(result.model_dump_json())
+
+
+if __name__ == "__main__":
+    main()
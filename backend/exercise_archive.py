@@ -0,0 +1,172 @@
+# backend/exercise_archive.py
+"""
+Archival of old and abandoned exercises, and compaction of the database.
+
+The exercises table gains a row per generated exercise whether or not it is
+ever submitted. Graded exercises submitted more than
+EXERCISE_ARCHIVE_AFTER_DAYS ago, and exercises never submitted within
+EXERCISE_ABANDON_AFTER_DAYS of being created, are moved to exercise_archive.
+Only the columns history is listed by stay columns there; question_data, the
+response and the feedback are compressed into one blob
+(crud.archive_exercises). /review/history reads
+through to the archive, so the learner's history is unchanged, while
+`exercises` keeps only recent rows and its indexes stay small. An abandoned
+exercise can no longer be submitted.
+
+The move runs in a background task every EXERCISE_ARCHIVE_INTERVAL seconds,
+EXERCISE_ARCHIVE_BATCH_SIZE exercise ids per transaction so the write lock is
+held briefly. Pages freed by the move are reused by new rows, so the
+exercises table stops growing and the file grows only by the archived rows,
+a fraction of their former size. With EXERCISE_ARCHIVE_RETENTION_DAYS set,
+archived exercises are deleted after that many days, which bounds the file
+too. `--vacuum` also gives free pages back to the filesystem.
+
+Usage (from the repository root), to archive what is due and exit:
+    python -m backend.exercise_archive --vacuum
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import crud
+from .database import SessionLocal, db_session, engine, init_db, run_sync
+
+EXERCISE_ARCHIVE_ENABLED = (
+    os.getenv("EXERCISE_ARCHIVE_ENABLED", "true").lower() == "true"
+)
+EXERCISE_ARCHIVE_AFTER_DAYS = float(os.getenv("EXERCISE_ARCHIVE_AFTER_DAYS", "30"))
+EXERCISE_ABANDON_AFTER_DAYS = float(os.getenv("EXERCISE_ABANDON_AFTER_DAYS", "7"))
+EXERCISE_ARCHIVE_BATCH_SIZE = int(os.getenv("EXERCISE_ARCHIVE_BATCH_SIZE", "1000"))
+# Archived exercises are deleted this many days after being archived; 0
+# keeps them for good.
+EXERCISE_ARCHIVE_RETENTION_DAYS = float(
+    os.getenv("EXERCISE_ARCHIVE_RETENTION_DAYS", "0")
+)
+# Seconds between archive passes.
+EXERCISE_ARCHIVE_INTERVAL = float(os.getenv("EXERCISE_ARCHIVE_INTERVAL", "86400"))
+
+
+@dataclass
+class ArchiveResult:
+    graded: int = 0
+    abandoned: int = 0
+    purged: int = 0
+    seconds: float = 0.0
+
+
+def archive_due(db: Session, now: datetime | None = None) -> ArchiveResult:
+    """Moves every exercise that is due into the archive."""
+    now = now or datetime.utcnow()
+    graded_before = now - timedelta(days=EXERCISE_ARCHIVE_AFTER_DAYS)
+    abandoned_before = now - timedelta(days=EXERCISE_ABANDON_AFTER_DAYS)
+    result = ArchiveResult()
+    started = time.perf_counter()
+
+    first_id, last_id = crud.get_exercise_id_range(db)
+    if first_id is not None:
+        # Windows of ids rather than LIMITed scans: each id is looked at once,
+        # however many recent rows stay behind.
+        for start in range(first_id, last_id + 1, EXERCISE_ARCHIVE_BATCH_SIZE):
+            graded, abandoned = crud.archive_exercises(
+                db,
+                start,
+                start + EXERCISE_ARCHIVE_BATCH_SIZE - 1,
+                graded_before,
+                abandoned_before,
+            )
+            result.graded += graded
+            result.abandoned += abandoned
+
+    if EXERCISE_ARCHIVE_RETENTION_DAYS > 0:
+        archived_before = now - timedelta(days=EXERCISE_ARCHIVE_RETENTION_DAYS)
+        while purged := crud.purge_archived_exercises(
+            db, archived_before, EXERCISE_ARCHIVE_BATCH_SIZE
+        ):
+            result.purged += purged
+
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+def vacuum():
+    """Returns free pages to the filesystem (SQLite) or marks them reusable."""
+    backend = engine.dialect.name
+    if backend == "sqlite":
+        statements = ["VACUUM"]
+    elif backend == "postgresql":
+        statements = ["VACUUM (ANALYZE) exercises", "VACUUM (ANALYZE) exercise_archive"]
+    else:
+        print(f"No vacuum for '{backend}' databases.")
+        return
+    # VACUUM can't run inside a transaction.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+def _summary(result: ArchiveResult) -> str:
+    return (
+        f"Archived {result.graded} graded and {result.abandoned} abandoned"
+        f" exercises, purged {result.purged}, in {result.seconds}s."
+    )
+
+
+class ExerciseArchiver:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with db_session() as db:
+                    result = await run_sync(archive_due, db)
+                if result.graded or result.abandoned or result.purged:
+                    print(_summary(result))
+            except Exception as e:
+                print(f"Error archiving exercises: {e}")
+            await asyncio.sleep(EXERCISE_ARCHIVE_INTERVAL)
+
+    def start(self):
+        if EXERCISE_ARCHIVE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+exercise_archiver = ExerciseArchiver()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--vacuum", action="store_true", help="Shrink the database file afterwards."
+    )
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        result = archive_due(db)
+    finally:
+        db.close()
+    print(_summary(result))
+    if args.vacuum:
+        vacuum()
+
+
+if __name__ == "__main__":
+    main()
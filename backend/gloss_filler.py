@@ -0,0 +1,100 @@
+# backend/gloss_filler.py
+"""
+Background job that gives every vocabulary word an English gloss.
+
+Words arrive without one from decks that don't carry glosses and from older
+databases. The job asks the gloss agent for GLOSS_BATCH_SIZE words per LLM
+call, GLOSS_FILL_CONCURRENCY calls at a time, at prefetch priority, and
+stores each gloss once on every learner's row for the word; lessons then
+show stored glosses instead of having the model translate the same words
+again each time.
+
+Usage (from the repository root), to fill every missing gloss and exit:
+    python -m backend.gloss_filler
+"""
+
+import asyncio
+import os
+
+from . import crud
+from .agents.gloss_agent import GLOSS_BATCH_SIZE, GlossAgent
+from .database import db_session, init_db, run_sync
+
+GLOSS_FILL_ENABLED = os.getenv("GLOSS_FILL_ENABLED", "true").lower() == "true"
+# Gloss calls in flight at once.
+GLOSS_FILL_CONCURRENCY = int(os.getenv("GLOSS_FILL_CONCURRENCY", "4"))
+# Seconds between passes when nothing has asked for one.
+GLOSS_FILL_INTERVAL = float(os.getenv("GLOSS_FILL_INTERVAL", "600"))
+
+
+class GlossFiller:
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def request_fill(self):
+        """Wakes the job, e.g. after words without glosses were imported."""
+        self._wakeup.set()
+
+    async def fill_once(self) -> int:
+        """
+        Glosses unglossed words until none are left or a pass makes no
+        progress (the model is failing). Returns the number of words glossed.
+        """
+        glossed = 0
+        async with db_session() as db:
+            agent = GlossAgent(db)
+            while True:
+                words = await run_sync(
+                    crud.get_unglossed_words,
+                    db,
+                    GLOSS_BATCH_SIZE * GLOSS_FILL_CONCURRENCY,
+                )
+                if not words:
+                    break
+                filled = await agent.fill(words)
+                glossed += filled
+                if not filled:
+                    break
+        return glossed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.fill_once()
+            except ImportError as e:
+                print(f"Gloss filler disabled, agents are unavailable: {e}")
+                return
+            except Exception as e:
+                print(f"Error filling vocabulary glosses: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), GLOSS_FILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self):
+        if GLOSS_FILL_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+gloss_filler = GlossFiller()
+
+
+def main():
+    init_db()
+    print(f"Glossed {asyncio.run(gloss_filler.fill_once())} words.")
+
+
+if __name__ == "__main__":
+    main()
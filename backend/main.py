@@ -1,21 +1,31 @@
 # backend/main.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from datetime import datetime, timedelta
+import hashlib
+import json
+import tempfile
 
-from . import crud, schemas
-from .database import init_db, get_db
+from . import crud, deck_import, metrics, schemas, sql_profiler
+from .database import async_engine, engine, init_db, get_db, run_sync
+from .content_pool import content_pool
+from .exercise_archive import exercise_archiver
+from .gloss_filler import gloss_filler
 from .agents.lesson_agent import LessonAgent
 from .agents.practice_agent import PracticeAgent
 from .agents.evaluation_agent import EvaluationAgent
+from .agents import llm_cache, llm_scheduler
 
 app = FastAPI(
     title="Personalized Korean Learning Agent API",
     description="API for a personalized language learning system using AI agents.",
     version="1.0.0",
 )
+# Times each endpoint apart from validation and serialization (see metrics.py).
+app.router.route_class = metrics.TimedRoute
 
 # CORS (Cross-Origin Resource Sharing)
 origins = [
@@ -30,13 +40,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+if sql_profiler.SQL_PROFILE_ENABLED:
+    app.add_middleware(sql_profiler.SQLProfilerMiddleware)
+
+for instrumented in (engine, async_engine and async_engine.sync_engine):
+    if instrumented is not None:
+        metrics.instrument_engine(instrumented)
+        sql_profiler.instrument_engine(instrumented)
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     # This will create the database tables if they don't exist.
     init_db()
+    # Keep pre-generated lessons and exercises warm in the background.
+    content_pool.start()
+    # Give words imported without an English gloss one.
+    gloss_filler.start()
+    # Move old and abandoned exercises out of the exercises table.
+    exercise_archiver.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await content_pool.stop()
+    await gloss_filler.stop()
+    await exercise_archiver.stop()
+
+
+# =================
+# Learner Identity
+# =================
+
+DEFAULT_USER_ID = 1
+
+# Learners whose user_status row is known to exist in this process.
+_known_learners: set[int] = set()
+
+
+async def get_user_id(
+    db: Session = Depends(get_db),
+    x_user_id: Optional[int] = Header(default=None),
+    user_id: Optional[int] = Query(default=None),
+) -> int:
+    """
+    The learner a request acts for, from the X-User-Id header or, for clients
+    that can't set headers (EventSource), the user_id query parameter.
+    """
+    learner = x_user_id or user_id or DEFAULT_USER_ID
+    if learner not in _known_learners:
+        await run_sync(crud.ensure_user_status, db, learner)
+        _known_learners.add(learner)
+    return learner
 
 
 # =================
@@ -52,37 +110,112 @@ async def root():
 @app.get(
     "/dashboard/status", response_model=schemas.UserStatusSummary, tags=["Dashboard"]
 )
-async def get_dashboard_status(db: Session = Depends(get_db)):
+async def get_dashboard_status(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
     """
     Get aggregated user level and mastery counts.
+
+    Carries an ETag of the summary, so pollers sending If-None-Match get an
+    empty 304 until an evaluation changes it.
     """
-    return crud.get_dashboard_status(db)
+    status = await run_sync(crud.get_dashboard_status, db, user_id)
+    etag = '"' + hashlib.sha1(status.model_dump_json().encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return status
 
 
 @app.get("/lessons/next", response_model=schemas.LessonContent, tags=["Lessons"])
-async def get_next_lesson(db: Session = Depends(get_db)):
+async def get_next_lesson(
+    db: Session = Depends(get_db), user_id: int = Depends(get_user_id)
+):
     """
     Generate and retrieve the next personalized lesson.
     """
-    lesson_agent = LessonAgent(db)
-    lesson_content = lesson_agent.generate_lesson()
+    lesson_content = await content_pool.take_lesson(db, user_id)
+    if not lesson_content:
+        lesson_agent = LessonAgent(db, user_id)
+        lesson_content = await lesson_agent.generate_lesson()
     if not lesson_content:
         raise HTTPException(status_code=404, detail="Could not generate a new lesson.")
     # The agent should return data that fits the schema, but Pydantic will validate.
     return lesson_content
 
 
+@app.get("/lessons/next/stream", tags=["Lessons"])
+async def stream_next_lesson(
+    db: Session = Depends(get_db), user_id: int = Depends(get_user_id)
+):
+    """
+    Stream the next personalized lesson as server-sent events.
+
+    `meta` (grammar_pattern, new_vocabulary) is sent as soon as the database
+    has answered, followed by `explanation` text deltas and one `example` per
+    sentence while the model writes them. `done` carries the saved lesson;
+    `error` is sent instead if generation fails.
+    """
+    lesson_content = await content_pool.take_lesson(db, user_id)
+    if lesson_content:
+        events = _lesson_events(lesson_content)
+    else:
+        lesson_agent = LessonAgent(db, user_id)
+        events = lesson_agent.stream_lesson()
+    return StreamingResponse(
+        _to_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _lesson_events(
+    lesson: schemas.LessonContent,
+) -> AsyncIterator[tuple[str, dict]]:
+    # A lesson that is already complete, replayed in the streaming event format.
+    yield (
+        "meta",
+        {
+            "grammar_pattern": lesson.grammar_pattern,
+            "new_vocabulary": [v.model_dump() for v in lesson.new_vocabulary],
+        },
+    )
+    yield "explanation", {"delta": lesson.explanation_text}
+    for sentence in lesson.example_sentences:
+        yield "example", {"sentence": sentence}
+    yield "done", lesson.model_dump()
+
+
+async def _to_sse(events: AsyncIterator[tuple[str, dict]]) -> AsyncIterator[str]:
+    async for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @app.post(
-    "/exercises/generate", response_model=schemas.ExerciseDetails, tags=["Exercises"]
+    "/exercises/generate",
+    response_model=schemas.ExerciseDetails,
+    # The answer key stays on the server for grading.
+    response_model_exclude={"expected_answer"},
+    tags=["Exercises"],
 )
 async def generate_exercise(
-    exercise_request: schemas.ExerciseRequest, db: Session = Depends(get_db)
+    exercise_request: schemas.ExerciseRequest,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
 ):
     """
     Generate a new exercise, optionally specifying a type and sub-type.
     """
-    practice_agent = PracticeAgent(db)
-    exercise_details = practice_agent.generate_exercise(exercise_request)
+    practice_agent = PracticeAgent(db, user_id)
+    exercise_details = await content_pool.take_exercise(
+        db, practice_agent, exercise_request
+    )
+    if not exercise_details:
+        exercise_details = await practice_agent.generate_exercise(exercise_request)
     if not exercise_details:
         raise HTTPException(
             status_code=500, detail="Could not generate a new exercise."
@@ -90,43 +223,113 @@ async def generate_exercise(
     return exercise_details
 
 
+@app.post(
+    "/exercises/generate/set",
+    response_model=schemas.ExerciseSet,
+    response_model_exclude={"exercises": {"__all__": {"expected_answer"}}},
+    tags=["Exercises"],
+)
+async def generate_exercise_set(
+    set_request: schemas.ExerciseSetRequest,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    """
+    Generate a whole practice set (`count` exercises in the given type mix)
+    in one model call, saved with their exercise_ids.
+    """
+    practice_agent = PracticeAgent(db, user_id)
+    exercises = await practice_agent.generate_exercise_set(set_request)
+    if not exercises:
+        raise HTTPException(
+            status_code=500, detail="Could not generate an exercise set."
+        )
+    return schemas.ExerciseSet(exercises=exercises)
+
+
 @app.post(
     "/exercises/submit", response_model=schemas.EvaluationResult, tags=["Exercises"]
 )
 async def submit_exercise(
-    submission: schemas.Submission, db: Session = Depends(get_db)
+    submission: schemas.Submission,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
 ):
     """
     Submit a response for grading and trigger Mastery DB updates.
     """
-    evaluation_agent = EvaluationAgent(db)
-    evaluation_result = evaluation_agent.evaluate_submission(submission)
+    evaluation_agent = EvaluationAgent(db, user_id)
+    evaluation_result = await evaluation_agent.evaluate_submission(submission)
     if not evaluation_result:
         raise HTTPException(
             status_code=500, detail="Failed to evaluate the submission."
         )
+    # Mastery moved, so the pool may now be targeting the wrong pattern.
+    content_pool.request_refill(user_id)
     return evaluation_result
 
 
+@app.post(
+    "/exercises/submit/batch",
+    response_model=schemas.BatchEvaluationResult,
+    tags=["Exercises"],
+)
+async def submit_exercise_batch(
+    batch: schemas.BatchSubmission,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    """
+    Submit a whole set of responses (e.g. a flashcard deck) for grading in a
+    few LLM calls. Items that couldn't be graded carry an error instead of
+    failing the request.
+    """
+    evaluation_agent = EvaluationAgent(db, user_id)
+    results = await evaluation_agent.evaluate_batch(batch.submissions)
+    graded = sum(item.result is not None for item in results)
+    if graded:
+        content_pool.request_refill(user_id)
+    return schemas.BatchEvaluationResult(
+        results=results, graded=graded, failed=len(results) - graded
+    )
+
+
+async def _paginate(fn, db: Session, user_id: int, cursor, limit, response: Response):
+    # Runs a keyset-paginated crud getter; the next page's cursor, if any, goes
+    # in the X-Next-Cursor header so the body keeps its list shape.
+    try:
+        items, next_cursor = await run_sync(fn, db, user_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
 @app.get(
     "/review/history", response_model=List[schemas.ExerciseListItem], tags=["Review"]
 )
 async def list_review_history(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
 ):
     """
-    List all completed lessons and exercises.
+    List graded exercises, most recent first. Pass the X-Next-Cursor response
+    header back as `cursor` for the next page.
     """
-    history = crud.get_review_history(db, skip=skip, limit=limit)
+    history = await _paginate(
+        crud.get_review_history, db, user_id, cursor, limit, response
+    )
     # Convert DB models to Pydantic schemas
     return [
         schemas.ExerciseListItem(
             exercise_id=item.exercise_id,
             grade=item.grade,
             type=item.type,
-            date=item.question_data.get(
-                "timestamp", datetime.utcnow()
-            ),  # Approximation
+            date=item.submitted_at,
         )
         for item in history
     ]
@@ -138,13 +341,19 @@ async def list_review_history(
     tags=["Mastery"],
 )
 async def get_grammar_mastery(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
 ):
     """
-    Retrieve the full GrammarMastery table.
+    Retrieve the learner's GrammarMastery rows, weakest first, one page at a
+    time (see X-Next-Cursor).
     """
-    mastery_items = crud.get_all_grammar_mastery(db, skip=skip, limit=limit)
-    return mastery_items
+    return await _paginate(
+        crud.get_all_grammar_mastery, db, user_id, cursor, limit, response
+    )
 
 
 @app.get(
@@ -153,10 +362,122 @@ async def get_grammar_mastery(
     tags=["Mastery"],
 )
 async def get_vocabulary_mastery(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
 ):
     """
-    Retrieve the full VocabularyMastery table.
+    Retrieve the learner's VocabularyMastery rows, weakest first, one page at a
+    time (see X-Next-Cursor).
+    """
+    return await _paginate(
+        crud.get_all_vocabulary_mastery, db, user_id, cursor, limit, response
+    )
+
+
+@app.get("/progress", response_model=List[schemas.ProgressPoint], tags=["Mastery"])
+async def get_progress(
+    concept: Optional[str] = None,
+    days: int = Query(default=365, ge=1, le=3650),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    """
+    The learner's progress over the last `days` days (UTC), one point per day
+    with attempts, oldest first: attempts, mean grade and change in mastery
+    score, for one `concept` (with its score at the end of the day) or over
+    every concept, counting each graded submission once. Served from the daily
+    rollups.
+    """
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    return await run_sync(crud.get_progress, db, user_id, since, concept)
+
+
+@app.post("/decks/import", response_model=schemas.DeckImportResult, tags=["Decks"])
+async def import_deck(
+    request: Request,
+    deck_format: Optional[str] = Query(
+        default=None, alias="format", pattern="^(csv|jsonl)$"
+    ),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    """
+    Import a vocabulary/grammar deck sent as the request body: CSV with a
+    header row or JSONL, per `format` or the Content-Type. Rows add their
+    `word_korean` and/or `pattern` as new items; ones the learner already has
+    are kept as they are. The body is spooled to disk past
+    DECK_IMPORT_SPOOL_BYTES and imported in batches (see deck_import.py).
+    """
+    try:
+        deck_format = deck_format or deck_import.format_for(
+            content_type=request.headers.get("content-type", "")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    with tempfile.SpooledTemporaryFile(
+        max_size=deck_import.DECK_IMPORT_SPOOL_BYTES
+    ) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            result = await run_sync(
+                deck_import.import_file, db, user_id, spool, deck_format
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if result.grammar_added:
+        # The new patterns may change what the pool should target.
+        content_pool.request_refill(user_id)
+    if result.vocabulary_added:
+        gloss_filler.request_fill()
+    return result
+
+
+@app.get(
+    "/llm-cache/stats",
+    response_model=List[schemas.LLMCacheAgentStats],
+    tags=["Cache"],
+)
+async def get_llm_cache_stats(db: Session = Depends(get_db)):
+    """
+    Per-agent LLM cache hit/miss counters since startup and stored entry counts.
+    """
+    entries = await run_sync(crud.count_llm_cache_entries, db)
+    return [
+        schemas.LLMCacheAgentStats(
+            agent=agent,
+            hits=llm_cache.stats["hits"][agent],
+            misses=llm_cache.stats["misses"][agent],
+            bypassed=llm_cache.stats["bypassed"][agent],
+            entries=entries.get(agent, 0),
+        )
+        for agent in llm_cache.CACHE_POLICY
+    ]
+
+
+@app.get(
+    "/llm-scheduler/stats",
+    response_model=schemas.LLMSchedulerStats,
+    tags=["Cache"],
+)
+async def get_llm_scheduler_stats():
+    """
+    LLM scheduler counters since startup (calls, upstream calls, coalesced
+    calls, retries, failures) and its current load.
+    """
+    return llm_scheduler.scheduler.snapshot()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["General"])
+async def get_metrics():
+    """
+    Request, database and model timings in the Prometheus text format.
     """
-    mastery_items = crud.get_all_vocabulary_mastery(db, skip=skip, limit=limit)
-    return mastery_items
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,392 @@
+# backend/metrics.py
+"""
+Per-request timing breakdown and Prometheus metrics.
+
+MetricsMiddleware gives each HTTP request a RequestTimings that the hooks
+below fill in as it runs: database time and statement count (SQLAlchemy
+engine events), model latency and tokens per agent (a LangChain callback on
+the agents' clients), and time spent in the endpoint function itself
+(TimedRoute). Whatever the route handler spends outside the endpoint is
+request validation, dependencies and response serialization. Prompt sizes
+are recorded by agents/prompt_budget.py.
+
+When the request finishes the totals go into histograms served at /metrics
+in the Prometheus text format, and, with SERVER_TIMING_ENABLED, into a
+Server-Timing response header.
+"""
+
+import contextvars
+import inspect
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+
+from fastapi.routing import APIRoute
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import event
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+# =================================================================
+# Metric types (Prometheus text exposition format)
+# =================================================================
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # Per label set: [count per bucket..., +Inf count], sum.
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            counts, total = self._series.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    labels = _label_text((*self.labels, "le"), (*key, bound))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _label_text(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {total[0]}")
+                lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, until the response is sent.",
+    ("method", "route", "status"),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time a request spent executing SQL statements.",
+    ("route",),
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed per request.",
+    ("route",),
+    COUNT_BUCKETS,
+)
+REQUEST_LLM_SECONDS = Histogram(
+    "http_request_llm_seconds",
+    "Time a request spent waiting on model calls it made.",
+    ("route",),
+    LLM_BUCKETS,
+)
+REQUEST_SERIALIZATION_SECONDS = Histogram(
+    "http_request_serialization_seconds",
+    "Route handler time outside the endpoint: request validation, "
+    "dependencies and response serialization.",
+    ("route",),
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds",
+    "Latency of each model call (one attempt).",
+    ("agent", "outcome"),
+    LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by the model provider.",
+    ("agent", "kind"),
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens",
+    "Estimated tokens per prompt sent to a model: the fixed instructions and "
+    "the interpolated context.",
+    ("agent", "part"),
+    TOKEN_BUCKETS,
+)
+
+METRICS = [
+    REQUEST_SECONDS,
+    REQUEST_DB_SECONDS,
+    REQUEST_DB_STATEMENTS,
+    REQUEST_LLM_SECONDS,
+    REQUEST_SERIALIZATION_SECONDS,
+    LLM_CALL_SECONDS,
+    LLM_TOKENS,
+    LLM_PROMPT_TOKENS,
+]
+
+
+def render() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+# =================================================================
+# Per-request timings
+# =================================================================
+
+
+@dataclass
+class RequestTimings:
+    db_seconds: float = 0.0
+    db_statements: int = 0
+    llm_seconds: float = 0.0
+    llm_calls: int = 0
+    handler_seconds: float = 0.0
+    endpoint_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_db(self, seconds: float):
+        # Statements run in worker threads, possibly several at once.
+        with self._lock:
+            self.db_seconds += seconds
+            self.db_statements += 1
+
+    @property
+    def serialization_seconds(self) -> float:
+        return max(0.0, self.handler_seconds - self.endpoint_seconds)
+
+
+_current: contextvars.ContextVar[RequestTimings | None] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def current() -> RequestTimings | None:
+    """The timings of the request being handled, if any."""
+    return _current.get()
+
+
+def instrument_engine(engine):
+    """Adds every statement `engine` executes to the current request's timings."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        timings = _current.get()
+        if timings is not None:
+            timings.add_db(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            pending = context.connection.info.get("metrics_started")
+            if pending:
+                pending.pop()
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records each model call's latency and token usage for `agent`."""
+
+    run_inline = True
+
+    def __init__(self, agent: str):
+        self.agent = agent
+        self._started: dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id, outcome: str):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        LLM_CALL_SECONDS.observe(seconds, agent=self.agent, outcome=outcome)
+        timings = _current.get()
+        if timings is not None:
+            timings.llm_seconds += seconds
+            timings.llm_calls += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, "ok")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    LLM_TOKENS.inc(
+                        usage.get("input_tokens", 0), agent=self.agent, kind="prompt"
+                    )
+                    LLM_TOKENS.inc(
+                        usage.get("output_tokens", 0),
+                        agent=self.agent,
+                        kind="completion",
+                    )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+
+# =================================================================
+# Request hooks
+# =================================================================
+
+
+def _timed_endpoint(endpoint):
+    @wraps(endpoint)
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings = _current.get()
+            if timings is not None:
+                timings.endpoint_seconds += time.perf_counter() - started
+
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    An APIRoute that times its endpoint function and its whole handler, so
+    the difference (validation and serialization) can be reported.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                timings = _current.get()
+                if timings is not None:
+                    timings.handler_seconds += time.perf_counter() - started
+
+        return timed_handler
+
+
+def _server_timing(timings: RequestTimings, total: float) -> bytes:
+    return (
+        f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_statements} statements", '
+        f'llm;dur={timings.llm_seconds * 1000:.1f};desc="{timings.llm_calls} calls", '
+        f"serialize;dur={timings.serialization_seconds * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    ).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """ASGI middleware that collects a RequestTimings per HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (
+                            b"server-timing",
+                            _server_timing(timings, time.perf_counter() - started),
+                        )
+                    )
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=path,
+                status=status,
+            )
+            REQUEST_DB_SECONDS.observe(timings.db_seconds, route=path)
+            REQUEST_DB_STATEMENTS.observe(timings.db_statements, route=path)
+            REQUEST_LLM_SECONDS.observe(timings.llm_seconds, route=path)
+            REQUEST_SERIALIZATION_SECONDS.observe(
+                timings.serialization_seconds, route=path
+            )
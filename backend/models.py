@@ -1,52 +1,250 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, JSON
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    Date,
+    DateTime,
+    Text,
+    JSON,
+    LargeBinary,
+    Index,
+    ForeignKey,
+    UniqueConstraint,
+    text,
+)
 from .database import Base
 from datetime import datetime
 
 
 class UserStatus(Base):
     __tablename__ = "user_status"
-    user_id = Column(Integer, primary_key=True, default=1)
+    user_id = Column(Integer, primary_key=True, autoincrement=True)
     current_level = Column(String)
     known_vocab_count = Column(Integer)
     grammar_mastered_count = Column(Integer)
     most_recent_weak_area = Column(Text)
+    recent_average_grade = Column(Float)
 
 
 class GrammarMastery(Base):
     __tablename__ = "grammar_mastery"
     mastery_id = Column(Integer, primary_key=True, autoincrement=True)
-    pattern = Column(String, unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
+    pattern = Column(String, nullable=False)
     mastery_score = Column(Float, default=0.0)
     last_reviewed = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     weakness_flags = Column(JSON, default=list)
     times_incorrect = Column(Integer, default=0)
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "pattern", name="uq_grammar_mastery_user_pattern"),
+        # Keyset pagination of /mastery/grammar (crud.get_all_grammar_mastery).
+        Index(
+            "ix_grammar_mastery_user_score_id", "user_id", "mastery_score", "mastery_id"
+        ),
+    )
+
 
 class VocabularyMastery(Base):
     __tablename__ = "vocabulary_mastery"
     mastery_id = Column(Integer, primary_key=True, autoincrement=True)
-    word_korean = Column(String, unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
+    word_korean = Column(String, nullable=False)
     mastery_score = Column(Float, default=0.0)
     last_reviewed = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     times_correct = Column(Integer, default=0)
     times_incorrect = Column(Integer, default=0)
+    # English gloss, filled from imported decks or by gloss_filler.py.
+    english = Column(Text)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "word_korean", name="uq_vocabulary_mastery_user_word"
+        ),
+        # Words still waiting for a gloss, for crud.get_unglossed_words and
+        # crud.save_vocabulary_glosses.
+        Index(
+            "ix_vocabulary_mastery_unglossed",
+            "word_korean",
+            sqlite_where=text("english IS NULL"),
+            postgresql_where=text("english IS NULL"),
+        ),
+        # Keyset for random sampling within a score band, and the learner's
+        # ids to seek its random pivot in (crud._sample_vocabulary).
+        Index(
+            "ix_vocabulary_mastery_user_score_id",
+            "user_id",
+            "mastery_score",
+            "mastery_id",
+        ),
+        Index(
+            "ix_vocabulary_mastery_user_id_score",
+            "user_id",
+            "mastery_id",
+            "mastery_score",
+        ),
+    )
 
 
 class Lessons(Base):
     __tablename__ = "lessons"
     lesson_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
     grammar_focus = Column(String)
     content = Column(Text)
     new_vocabulary = Column(JSON, default=list)
 
+    __table_args__ = (Index("ix_lessons_user_lesson", "user_id", "lesson_id"),)
+
 
 class Exercises(Base):
     __tablename__ = "exercises"
     exercise_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
     type = Column(String)
     sub_type = Column(String)
     question_data = Column(JSON)
     user_response = Column(Text)
     grade = Column(Integer)
     feedback = Column(Text)
+    # Set together with grade when the learner's response is evaluated.
+    submitted_at = Column(DateTime)
+    # Exercises from before the column existed were given the upgrade time.
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_exercises_user_exercise", "user_id", "exercise_id"),
+        # Keyset pagination of /review/history (crud.get_review_history).
+        Index("ix_exercises_user_submitted", "user_id", "submitted_at", "exercise_id"),
+    )
+
+
+class ExerciseArchive(Base):
+    """
+    Exercises moved out of `exercises` by exercise_archive.py: graded ones
+    once their history is old, never-submitted ones once abandoned. Only the
+    columns history is listed by stay columns; question_data, the response
+    and the feedback are in `payload`, zlib-compressed JSON.
+    """
+
+    __tablename__ = "exercise_archive"
+    exercise_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
+    type = Column(String)
+    grade = Column(Integer)
+    submitted_at = Column(DateTime)
+    created_at = Column(DateTime)
+    # Indexed for EXERCISE_ARCHIVE_RETENTION_DAYS.
+    archived_at = Column(DateTime, default=datetime.utcnow, index=True)
+    payload = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        # crud.get_review_history continues here past the hot rows.
+        Index(
+            "ix_exercise_archive_user_submitted",
+            "user_id",
+            "submitted_at",
+            "exercise_id",
+        ),
+    )
+
+
+class Attempts(Base):
+    """
+    Append-only log of graded submissions: one row per concept an evaluation
+    moved, with the mastery score before and after, or one row without a
+    concept if it moved none. Written with the evaluation
+    (crud.apply_evaluations); never updated.
+    """
+
+    __tablename__ = "attempts"
+    attempt_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
+    # No foreign key: the exercise may since have moved to exercise_archive.
+    exercise_id = Column(Integer)
+    concept = Column(String)
+    kind = Column(String)  # "grammar" or "vocab"
+    grade = Column(Integer, nullable=False)
+    score_before = Column(Float)
+    score_after = Column(Float)
+    attempted_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Rebuilding a learner's rollups (crud.rebuild_daily_progress).
+        Index("ix_attempts_user_concept_time", "user_id", "concept", "attempted_at"),
+    )
+
+
+class DailyProgress(Base):
+    """
+    Per learner, concept and UTC day: the attempts logged in `attempts`,
+    rolled up as they are written, so a year of progress is a few hundred
+    rows however many attempts it took.
+    """
+
+    __tablename__ = "daily_progress"
+    progress_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
+    concept = Column(String, nullable=False)
+    kind = Column(String)
+    day = Column(Date, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    grade_sum = Column(Integer, nullable=False, default=0)
+    # Sum of (score_after - score_before), and the score after the last attempt.
+    score_delta = Column(Float, nullable=False, default=0.0)
+    score_end = Column(Float)
+
+    __table_args__ = (
+        # One concept's series (crud.get_progress), and the upsert's conflict target.
+        UniqueConstraint(
+            "user_id", "concept", "day", name="uq_daily_progress_user_concept_day"
+        ),
+        # All concepts' series, summed per day.
+        Index("ix_daily_progress_user_day", "user_id", "day"),
+    )
+
+
+class ContentPool(Base):
+    """
+    Pre-generated lessons and exercises waiting to be served, keyed by the
+    grammar pattern they target (and type/sub_type for exercises).
+    """
+
+    __tablename__ = "content_pool"
+    pool_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user_status.user_id"), nullable=False)
+    kind = Column(String, nullable=False)  # "lesson" or "exercise"
+    type = Column(String)
+    sub_type = Column(String)
+    grammar_pattern = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_content_pool_lookup",
+            "user_id",
+            "kind",
+            "grammar_pattern",
+            "type",
+            "sub_type",
+        ),
+    )
+
+
+class LLMCacheEntry(Base):
+    """
+    Structured LLM responses keyed on a hash of the prompt template and its
+    normalized inputs. Shared by all learners: identical inputs give identical
+    prompts whoever sends them.
+    """
+
+    __tablename__ = "llm_cache"
+    cache_key = Column(String(64), primary_key=True)
+    agent = Column(String, nullable=False)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed = Column(DateTime, default=datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
@@ -0,0 +1,41 @@
+# backend/progress_rollup.py
+"""
+Rebuilds the daily progress rollups from the attempt log.
+
+apply_evaluations appends every graded submission to `attempts` and adds it to
+`daily_progress` (one row per learner, concept and UTC day) in the same
+transaction, so the rollups never need rebuilding in normal operation. This
+recomputes them from scratch, for one learner or everyone, if they were lost
+or the way attempts roll up changes. Attempts made before the attempt log
+existed aren't in it, so they don't show in /progress.
+
+Usage (from the repository root):
+    python -m backend.progress_rollup --user-id 1
+"""
+
+import argparse
+import time
+
+from . import crud
+from .database import SessionLocal, init_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--user-id", type=int, help="Only this learner's rollups (default: all)."
+    )
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        rolled_up = crud.rebuild_daily_progress(db, args.user_id)
+    finally:
+        db.close()
+    print(f"Rolled up {rolled_up} attempts in {time.perf_counter() - started:.3f}s.")
+
+
+if __name__ == "__main__":
+    main()
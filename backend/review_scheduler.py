@@ -0,0 +1,225 @@
+# backend/review_scheduler.py
+"""
+Spaced-repetition scheduling over the mastery tables.
+
+Each item's memory stability grows exponentially with its mastery score, and
+its predicted recall decays with the time since `last_reviewed`:
+
+    stability = MIN_STABILITY_DAYS * (MAX_STABILITY_DAYS / MIN_STABILITY_DAYS) ** score
+    recall    = exp(-days_since_review / stability)
+
+An item is due once recall drops below TARGET_RECALL, and the due-queue is
+ordered by how far below it has fallen. Recall is recomputed for the whole
+table at once with NumPy on a per-learner in-memory snapshot of
+(id, score, last_reviewed), which is reloaded every SNAPSHOT_TTL_SECONDS and
+patched in place as evaluations come in. Snapshots for at most
+MAX_CACHED_LEARNERS learners are kept, least recently used first out.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+MIN_STABILITY_DAYS = float(os.getenv("SRS_MIN_STABILITY_DAYS", "0.5"))
+MAX_STABILITY_DAYS = float(os.getenv("SRS_MAX_STABILITY_DAYS", "60"))
+TARGET_RECALL = float(os.getenv("SRS_TARGET_RECALL", "0.9"))
+SNAPSHOT_TTL_SECONDS = float(os.getenv("SRS_SNAPSHOT_TTL_SECONDS", "300"))
+MAX_CACHED_LEARNERS = int(os.getenv("SRS_MAX_CACHED_LEARNERS", "1000"))
+# Vocabulary below this score hasn't been learned yet, so it is never "due";
+# lessons introduce it instead (crud.get_new_vocabulary).
+NEW_ITEM_THRESHOLD = 0.2
+
+_SECONDS_PER_DAY = 86400.0
+
+
+def predicted_recall(
+    scores: np.ndarray, reviewed_at: np.ndarray, now: float
+) -> np.ndarray:
+    """
+    Vectorized recall probability for items with the given mastery scores and
+    last-review times (epoch seconds).
+    """
+    stability = MIN_STABILITY_DAYS * np.power(
+        MAX_STABILITY_DAYS / MIN_STABILITY_DAYS, np.clip(scores, 0.0, 1.0)
+    )
+    elapsed_days = np.maximum(now - reviewed_at, 0.0) / _SECONDS_PER_DAY
+    return np.exp(-elapsed_days / stability)
+
+
+class _Snapshot:
+    def __init__(self, rows):
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        self.keys = [r[1] for r in rows]
+        self.scores = np.fromiter(
+            (r[2] or 0.0 for r in rows), dtype=np.float64, count=len(rows)
+        )
+        self.reviewed_at = np.fromiter(
+            (r[3].timestamp() if r[3] else 0.0 for r in rows),
+            dtype=np.float64,
+            count=len(rows),
+        )
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        self.loaded_at = time.monotonic()
+
+
+class ReviewScheduler:
+    """
+    Due-queues for one mastery table, one per learner, keyed by its concept column.
+    """
+
+    def __init__(self, model, key_column, min_score: float = 0.0):
+        self.model = model
+        self.key_column = key_column
+        self.min_score = min_score
+        self._snapshots: OrderedDict[int, _Snapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session, user_id: int) -> _Snapshot:
+        rows = db.execute(
+            select(
+                self.model.mastery_id,
+                self.key_column,
+                self.model.mastery_score,
+                self.model.last_reviewed,
+            ).where(self.model.user_id == user_id)
+        ).all()
+        snapshot = _Snapshot(rows)
+        with self._lock:
+            self._snapshots[user_id] = snapshot
+            self._snapshots.move_to_end(user_id)
+            while len(self._snapshots) > MAX_CACHED_LEARNERS:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def _current(self, db: Session, user_id: int) -> _Snapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(user_id)
+        if (
+            snapshot is None
+            or time.monotonic() - snapshot.loaded_at > SNAPSHOT_TTL_SECONDS
+        ):
+            snapshot = self.refresh(db, user_id)
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._snapshots.pop(user_id, None)
+
+    def note_reviewed(
+        self, user_id: int, updates: list[schemas.MasteryUpdate], at: datetime
+    ):
+        """
+        Patches the learner's snapshot with freshly written scores so the queue
+        reflects an evaluation without a reload. Unknown concepts are ignored.
+        """
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None:
+            return
+        for update in updates:
+            i = snapshot.positions.get(update.concept)
+            if i is not None:
+                snapshot.scores[i] = update.new_score
+                snapshot.reviewed_at[i] = at.timestamp()
+
+    def due_queue(
+        self, db: Session, user_id: int, count: int, due_only: bool = True
+    ) -> list[int]:
+        """
+        Returns up to `count` mastery_ids, most urgent first. With due_only=False
+        the most urgent items are returned even if none is due yet.
+        """
+        snapshot, top = self._queue(db, user_id, count, due_only)
+        return snapshot.ids[top].tolist()
+
+    def due_keys(
+        self, db: Session, user_id: int, count: int, due_only: bool = True
+    ) -> list[str]:
+        """
+        The concepts of `due_queue`, read from the snapshot without loading rows.
+        """
+        snapshot, top = self._queue(db, user_id, count, due_only)
+        return [snapshot.keys[i] for i in top]
+
+    def _queue(self, db: Session, user_id: int, count: int, due_only: bool):
+        snapshot = self._current(db, user_id)
+        if not len(snapshot.ids):
+            return snapshot, np.empty(0, dtype=np.int64)
+
+        urgency = TARGET_RECALL - predicted_recall(
+            snapshot.scores, snapshot.reviewed_at, datetime.utcnow().timestamp()
+        )
+        eligible = snapshot.scores >= self.min_score
+        if due_only:
+            eligible &= urgency > 0
+        candidates = np.flatnonzero(eligible)
+        if not len(candidates):
+            return snapshot, candidates
+
+        count = min(count, len(candidates))
+        top = candidates[np.argpartition(-urgency[candidates], count - 1)[:count]]
+        return snapshot, top[np.argsort(-urgency[top], kind="stable")]
+
+    def next_items(
+        self, db: Session, user_id: int, count: int, due_only: bool = True
+    ) -> list:
+        """
+        Loads the mastery rows for `due_queue`, in queue order.
+        """
+        ids = self.due_queue(db, user_id, count, due_only)
+        if not ids:
+            return []
+        rows = db.query(self.model).filter(self.model.mastery_id.in_(ids)).all()
+        by_id = {row.mastery_id: row for row in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+
+grammar_scheduler = ReviewScheduler(
+    models.GrammarMastery, models.GrammarMastery.pattern
+)
+vocab_scheduler = ReviewScheduler(
+    models.VocabularyMastery,
+    models.VocabularyMastery.word_korean,
+    min_score=NEW_ITEM_THRESHOLD,
+)
+
+
+def get_target_grammar(db: Session, user_id: int) -> models.GrammarMastery | None:
+    """
+    The grammar pattern lessons, exercises and evaluations should focus on:
+    the learner's pattern whose predicted recall has fallen furthest.
+    """
+    items = grammar_scheduler.next_items(db, user_id, 1, due_only=False)
+    return items[0] if items else None
+
+
+def get_target_grammar_pattern(db: Session, user_id: int) -> str | None:
+    """
+    The pattern of get_target_grammar, for callers that need only its name.
+    """
+    keys = grammar_scheduler.due_keys(db, user_id, 1, due_only=False)
+    return keys[0] if keys else None
+
+
+def get_due_vocabulary(
+    db: Session, user_id: int, count: int = 5
+) -> list[models.VocabularyMastery]:
+    """
+    The learner's vocabulary that is due for review, most urgent first.
+    """
+    return vocab_scheduler.next_items(db, user_id, count, due_only=True)
+
+
+def note_evaluation(user_id: int, evaluation: schemas.EvaluationResult):
+    now = datetime.utcnow()
+    grammar_scheduler.note_reviewed(user_id, evaluation.mastery_updates, now)
+    vocab_scheduler.note_reviewed(user_id, evaluation.mastery_updates, now)
@@ -1,14 +1,16 @@
 # backend/schemas.py
-from pydantic import BaseModel, RootModel
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, RootModel
+from typing import Dict, List, Optional
+from datetime import date, datetime
 
 
 # Dashboard
 class UserStatusSummary(BaseModel):
     level: str
     known_vocab: int
+    grammar_mastered: int = 0
     weak_focus: str
+    recent_average_grade: Optional[float] = None
 
 
 # Lessons
@@ -38,6 +40,20 @@ class ExerciseDetails(BaseModel):
     sub_type: str
     question_text: str
     expected_format: str
+    # Only set for short-answer exercises; kept server-side for local grading.
+    expected_answer: Optional[str] = None
+    target_concept: Optional[str] = None
+
+
+class ExerciseSetRequest(BaseModel):
+    count: int = Field(default=10, ge=1, le=50)
+    # Relative share of each exercise type, e.g. {"Flashcards": 3, "Writing": 1}.
+    # Left empty, the agent picks the type as for a single exercise.
+    type_mix: Dict[str, float] = {}
+
+
+class ExerciseSet(BaseModel):
+    exercises: List[ExerciseDetails]
 
 
 class Submission(BaseModel):
@@ -57,6 +73,24 @@ class EvaluationResult(BaseModel):
     mastery_updates: List[MasteryUpdate]
 
 
+class BatchSubmission(BaseModel):
+    submissions: List[Submission] = Field(min_length=1, max_length=100)
+
+
+class BatchItemResult(BaseModel):
+    exercise_id: int
+    # Exactly one of these is set.
+    result: Optional[EvaluationResult] = None
+    error: Optional[str] = None
+
+
+class BatchEvaluationResult(BaseModel):
+    # In the order the submissions were sent.
+    results: List[BatchItemResult]
+    graded: int
+    failed: int
+
+
 class ExerciseListItem(BaseModel):
     exercise_id: int
     grade: int
@@ -68,6 +102,16 @@ class ExerciseList(RootModel[List[ExerciseListItem]]):
     pass
 
 
+# Progress
+class ProgressPoint(BaseModel):
+    day: date
+    attempts: int
+    mean_grade: float
+    score_delta: float
+    # The concept's mastery score at the end of the day; series of one concept only.
+    score: Optional[float] = None
+
+
 # Mastery
 class GrammarMasteryItem(BaseModel):
     pattern: str
@@ -83,7 +127,40 @@ class VocabularyMasteryItem(BaseModel):
     word_korean: str
     mastery_score: float
     times_incorrect: int
+    english: Optional[str] = None
 
 
 class VocabularyMasteryList(RootModel[List[VocabularyMasteryItem]]):
     pass
+
+
+# LLM Cache
+class LLMCacheAgentStats(BaseModel):
+    agent: str
+    hits: int
+    misses: int
+    bypassed: int
+    entries: int
+
+
+# LLM Scheduler
+class LLMSchedulerStats(BaseModel):
+    calls: int = 0
+    upstream_calls: int = 0
+    coalesced: int = 0
+    retries: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    active: int = 0
+    queued: int = 0
+    inflight_keys: int = 0
+
+
+# Deck Import
+class DeckImportResult(BaseModel):
+    rows: int = 0
+    vocabulary_added: int = 0
+    grammar_added: int = 0
+    # Rows with neither a word_korean nor a pattern.
+    invalid: int = 0
+    seconds: float = 0.0
@@ -0,0 +1,261 @@
+# backend/sql_profiler.py
+"""
+Opt-in SQL statement profiling: which code ran which queries, and how often.
+
+While a QueryProfile is active (profile(), query_budget(), or every request
+with SQL_PROFILE_ENABLED), each statement the instrumented engines execute is
+recorded under its shape (the SQL with literals and IN-lists collapsed) and
+its call site (the innermost backend function outside the database plumbing).
+A shape run SQL_PROFILE_REPEAT_THRESHOLD or more times within one profile is
+reported as repeated: the usual sign of a per-item lookup (N+1) that should
+be one query.
+
+Outside a profile the engine hooks only check a contextvar, so they are left
+installed. Use query_budget() to pin an endpoint's statement count, e.g.:
+
+    with sql_profiler.query_budget(6, max_repeats=0):
+        client.post("/exercises/submit", json=...)
+"""
+
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+SQL_PROFILE_ENABLED = os.getenv("SQL_PROFILE_ENABLED", "false").lower() == "true"
+# Executions of one shape within a profile at which it is reported.
+SQL_PROFILE_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "3"))
+# Requests running at least this many statements are reported even without
+# repeated shapes (0: only report repeats).
+SQL_PROFILE_STATEMENT_WARNING = int(os.getenv("SQL_PROFILE_STATEMENT_WARNING", "0"))
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames in these files are plumbing, not call sites.
+_SKIPPED_FILES = {
+    os.path.join(_BACKEND_DIR, name)
+    for name in ("sql_profiler.py", "metrics.py", "database.py")
+}
+# Backend frames kept per call site, innermost first.
+_SITE_DEPTH = 3
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(
+    r"\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*\)"
+)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+
+
+def statement_shape(statement: str) -> str:
+    """`statement` with whitespace normalized and values collapsed to `?`."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _IN_LIST.sub("(?, ...)", shape)
+
+
+def _call_site() -> str:
+    """The innermost backend frames (outside the plumbing) on this thread."""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < _SITE_DEPTH:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_BACKEND_DIR) and filename not in _SKIPPED_FILES:
+            module = os.path.relpath(filename, _BACKEND_DIR)
+            frames.append(f"{module}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return " <- ".join(frames) or "<outside backend>"
+
+
+# =================================================================
+# Profiles
+# =================================================================
+
+
+@dataclass
+class ShapeStats:
+    shape: str
+    count: int = 0
+    seconds: float = 0.0
+    sites: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class QueryProfile:
+    label: str = ""
+    statements: int = 0
+    seconds: float = 0.0
+    shapes: dict[str, ShapeStats] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, seconds: float, site: str):
+        shape = statement_shape(statement)
+        # Statements run in worker threads, possibly several at once.
+        with self._lock:
+            self.statements += 1
+            self.seconds += seconds
+            stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = ShapeStats(shape)
+            stats.count += 1
+            stats.seconds += seconds
+            stats.sites[site] = stats.sites.get(site, 0) + 1
+
+    def by_site(self) -> dict[str, tuple[int, float]]:
+        """(statements, seconds) per call site, busiest first."""
+        sites: dict[str, list] = {}
+        for stats in self.shapes.values():
+            for site, count in stats.sites.items():
+                totals = sites.setdefault(site, [0, 0.0])
+                totals[0] += count
+                totals[1] += stats.seconds * count / stats.count
+        return {
+            site: (count, seconds)
+            for site, (count, seconds) in sorted(
+                sites.items(), key=lambda item: -item[1][0]
+            )
+        }
+
+    def repeated(
+        self, threshold: int = SQL_PROFILE_REPEAT_THRESHOLD
+    ) -> list[ShapeStats]:
+        """Shapes executed at least `threshold` times, most repeated first."""
+        return sorted(
+            (stats for stats in self.shapes.values() if stats.count >= threshold),
+            key=lambda stats: -stats.count,
+        )
+
+    def report(self, threshold: int = SQL_PROFILE_REPEAT_THRESHOLD) -> str:
+        header = (
+            f"{self.label or 'profile'}: {self.statements} statements"
+            f" in {self.seconds * 1000:.1f} ms"
+        )
+        lines = [header]
+        for site, (count, seconds) in self.by_site().items():
+            lines.append(f"  {count:>4}x {seconds * 1000:>7.1f} ms  {site}")
+        for stats in self.repeated(threshold):
+            shape = stats.shape
+            if len(shape) > 160:
+                # Keep the FROM/WHERE end, where shapes differ.
+                shape = shape[:60] + " ... " + shape[-95:]
+            lines.append(f"  repeated {stats.count}x: {shape}")
+            for site, count in stats.sites.items():
+                lines.append(f"      {count:>4}x from {site}")
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[QueryProfile | None] = contextvars.ContextVar(
+    "query_profile", default=None
+)
+
+
+@contextmanager
+def profile(label: str = ""):
+    """
+    Records the statements run in this context, including in worker threads
+    and tasks started from it, into the QueryProfile it yields. An inner
+    profile takes the statements over until it ends.
+    """
+    query_profile = QueryProfile(label)
+    token = _current.set(query_profile)
+    try:
+        yield query_profile
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(
+    max_statements: int,
+    max_repeats: int | None = None,
+    threshold: int = SQL_PROFILE_REPEAT_THRESHOLD,
+    label: str = "",
+):
+    """
+    profile() that raises QueryBudgetExceeded, with the profile's report, if
+    the context ran more than `max_statements` statements or more than
+    `max_repeats` shapes repeated `threshold` times.
+    """
+    with profile(label) as query_profile:
+        yield query_profile
+    problems = []
+    if query_profile.statements > max_statements:
+        problems.append(
+            f"{query_profile.statements} statements (budget {max_statements})"
+        )
+    repeated = query_profile.repeated(threshold)
+    if max_repeats is not None and len(repeated) > max_repeats:
+        problems.append(f"{len(repeated)} repeated query shapes (budget {max_repeats})")
+    if problems:
+        raise QueryBudgetExceeded(
+            "; ".join(problems) + "\n" + query_profile.report(threshold)
+        )
+
+
+def instrument_engine(engine):
+    """Records every statement `engine` executes into the active profile."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        pending = conn.info.get("profile_started")
+        if not pending:
+            return
+        seconds = time.perf_counter() - pending.pop()
+        query_profile = _current.get()
+        if query_profile is not None:
+            query_profile.record(statement, seconds, _call_site())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            pending = context.connection.info.get("profile_started")
+            if pending:
+                pending.pop()
+
+
+# =================================================================
+# Request hook
+# =================================================================
+
+
+class SQLProfilerMiddleware:
+    """
+    ASGI middleware that profiles each HTTP request and prints the report of
+    those with repeated query shapes (or more than
+    SQL_PROFILE_STATEMENT_WARNING statements).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile() as query_profile:
+            await self.app(scope, receive, send)
+        route = scope.get("route")
+        query_profile.label = (
+            f"{scope['method']} {route.path if route is not None else scope['path']}"
+        )
+        if query_profile.repeated() or (
+            SQL_PROFILE_STATEMENT_WARNING
+            and query_profile.statements >= SQL_PROFILE_STATEMENT_WARNING
+        ):
+            print(f"[sql-profile] {query_profile.report()}")
@@ -5,7 +5,9 @@
 export interface UserStatusSummary {
   level: string;
   known_vocab: number;
+  grammar_mastered: number;
   weak_focus: string;
+  recent_average_grade: number | null;
 }
 
 // From GET /lessons/next
@@ -22,6 +24,15 @@ export interface LessonContent {
   new_vocabulary: NewVocabularyItem[];
 }
 
+// Events from GET /lessons/next/stream
+export interface LessonStreamHandlers {
+  onMeta(meta: Pick<LessonContent, 'grammar_pattern' | 'new_vocabulary'>): void;
+  onExplanation(delta: string): void;
+  onExample(sentence: string): void;
+  onDone(lesson: LessonContent): void;
+  onError(detail: string): void;
+}
+
 // From POST /exercises/generate
 export interface ExerciseRequest {
   type?: string;
@@ -35,9 +46,20 @@ export interface ExerciseDetails {
   sub_type: string;
   question_text: string;
   expected_format: string;
+  target_concept?: string;
 }
 
 // From POST /exercises/submit
+// For POST /exercises/generate/set
+export interface ExerciseSetRequest {
+  count: number;
+  type_mix?: Record<string, number>; // relative weights per exercise type
+}
+
+export interface ExerciseSet {
+  exercises: ExerciseDetails[];
+}
+
 export interface Submission {
   exercise_id: number;
   user_response: string;
@@ -55,6 +77,19 @@ export interface EvaluationResult {
   mastery_updates: MasteryUpdate[];
 }
 
+// From POST /exercises/submit/batch; each item has either result or error.
+export interface BatchItemResult {
+  exercise_id: number;
+  result: EvaluationResult | null;
+  error: string | null;
+}
+
+export interface BatchEvaluationResult {
+  results: BatchItemResult[];
+  graded: number;
+  failed: number;
+}
+
 // From GET /review/history
 export interface ExerciseListItem {
   exercise_id: number;
@@ -63,6 +98,12 @@ export interface ExerciseListItem {
   date: string; // ISO 8601 date string
 }
 
+// A keyset-paginated list; pass nextCursor back to fetch the following page.
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
 // From GET /mastery/grammar
 export interface GrammarMasteryItem {
   pattern: string;
@@ -5,21 +5,39 @@ import type {
   LessonContent,
   ExerciseRequest,
   ExerciseDetails,
+  ExerciseSetRequest,
+  ExerciseSet,
   Submission,
   EvaluationResult,
+  BatchEvaluationResult,
   ExerciseListItem,
   GrammarMasteryItem,
-  VocabularyMasteryItem
+  VocabularyMasteryItem,
+  LessonStreamHandlers,
+  Page
 } from './api-schemas'; // We will create this file next
 
+// The learner this browser acts for; the backend defaults to learner 1.
+const userId = localStorage.getItem('userId') ?? '1';
+
 // Configure axios instance
 const apiClient = axios.create({
   baseURL: 'http://127.0.0.1:8000', // The address of the FastAPI backend
   headers: {
     'Content-Type': 'application/json',
+    'X-User-Id': userId,
   },
 });
 
+// List endpoints return the next page's cursor in the X-Next-Cursor header.
+function getPage<T>(url: string, limit: number, cursor?: string | null): Promise<Page<T>> {
+  const params = cursor ? { limit, cursor } : { limit };
+  return apiClient.get(url, { params }).then(res => ({
+    items: res.data,
+    nextCursor: res.headers['x-next-cursor'] ?? null,
+  }));
+}
+
 // Service methods
 export const apiService = {
   getDashboardStatus(): Promise<UserStatusSummary> {
@@ -30,23 +48,56 @@ export const apiService = {
     return apiClient.get('/lessons/next').then(res => res.data);
   },
 
+  // Returns the EventSource so the caller can close it early.
+  streamNextLesson(handlers: LessonStreamHandlers): EventSource {
+    // EventSource can't send headers, so the learner goes in the query string.
+    const source = new EventSource(
+      `${apiClient.defaults.baseURL}/lessons/next/stream?user_id=${encodeURIComponent(userId)}`
+    );
+    source.addEventListener('meta', (e) => handlers.onMeta(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener('explanation', (e) =>
+      handlers.onExplanation(JSON.parse((e as MessageEvent).data).delta)
+    );
+    source.addEventListener('example', (e) =>
+      handlers.onExample(JSON.parse((e as MessageEvent).data).sentence)
+    );
+    source.addEventListener('done', (e) => {
+      source.close();
+      handlers.onDone(JSON.parse((e as MessageEvent).data));
+    });
+    source.addEventListener('error', (e) => {
+      source.close();
+      const data = (e as MessageEvent).data;
+      handlers.onError(data ? JSON.parse(data).detail : 'Connection lost.');
+    });
+    return source;
+  },
+
   generateExercise(request: ExerciseRequest): Promise<ExerciseDetails> {
     return apiClient.post('/exercises/generate', request).then(res => res.data);
   },
 
+  generateExerciseSet(request: ExerciseSetRequest): Promise<ExerciseSet> {
+    return apiClient.post('/exercises/generate/set', request).then(res => res.data);
+  },
+
   submitExercise(submission: Submission): Promise<EvaluationResult> {
     return apiClient.post('/exercises/submit', submission).then(res => res.data);
   },
 
-  getReviewHistory(skip: number = 0, limit: number = 10): Promise<ExerciseListItem[]> {
-    return apiClient.get(`/review/history?skip=${skip}&limit=${limit}`).then(res => res.data);
+  submitExerciseBatch(submissions: Submission[]): Promise<BatchEvaluationResult> {
+    return apiClient.post('/exercises/submit/batch', { submissions }).then(res => res.data);
+  },
+
+  getReviewHistory(limit: number = 10, cursor?: string | null): Promise<Page<ExerciseListItem>> {
+    return getPage('/review/history', limit, cursor);
   },
 
-  getGrammarMastery(): Promise<GrammarMasteryItem[]> {
-    return apiClient.get('/mastery/grammar').then(res => res.data);
+  getGrammarMastery(limit: number = 100, cursor?: string | null): Promise<Page<GrammarMasteryItem>> {
+    return getPage('/mastery/grammar', limit, cursor);
   },
 
-  getVocabularyMastery(): Promise<VocabularyMasteryItem[]> {
-    return apiClient.get('/mastery/vocab').then(res => res.data);
+  getVocabularyMastery(limit: number = 100, cursor?: string | null): Promise<Page<VocabularyMasteryItem>> {
+    return getPage('/mastery/vocab', limit, cursor);
   },
 };